@@ -1,19 +1,2899 @@
 import streamlit as st
+import atexit
+import csv
+import gzip
 import json
+import multiprocessing
 import os
+import pickle
+import sys
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import io
 import base64
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack, contextmanager
+from itertools import tee
+from operator import itemgetter
+
+try:
+    import fcntl
+except ImportError:  # Windows: kunci_berkas hanya antar thread, penulisan tetap atomic lewat os.replace
+    fcntl = None
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # Export Excel tidak tersedia tanpa openpyxl
+    Workbook = None
+
+try:
+    import zstandard
+except ImportError:  # Backup dikompres gzip kalau zstandard tidak terpasang
+    zstandard = None
+
+BULAN_INDONESIA = {
+    "Januari": "January", "Februari": "February", "Maret": "March",
+    "Mei": "May", "Juni": "June", "Juli": "July", "Agustus": "August",
+    "Oktober": "October", "Desember": "December"
+}
+
+# Singkatan bulan pada kunci periode di periods.json ('Jan-2024', 'Mei-2024', ...)
+SINGKATAN_BULAN = ["Jan", "Feb", "Mar", "Apr", "Mei", "Jun", "Jul", "Agu", "Sep", "Okt", "Nov", "Des"]
+
+
+def tanggal_ke_ordinal(tanggal, tahun=None):
+    """Ubah tanggal jurnal ('22 January 2023', '2023-01-22', '31 Desember 2023') jadi ordinal hari, 0 kalau tidak terbaca.
+
+    Tanggal tanpa tahun ('31 December' di penyesuaian) memakai tahun kalau diberikan.
+    """
+    teks = str(tanggal).strip()
+    for indo, inggris in BULAN_INDONESIA.items():
+        teks = teks.replace(indo, inggris)
+    kandidat = [(teks, "%d %B %Y"), (teks, "%Y-%m-%d")]
+    if tahun:
+        kandidat.append((f"{teks} {tahun}", "%d %B %Y"))
+    for nilai, fmt in kandidat:
+        try:
+            return datetime.strptime(nilai, fmt).toordinal()
+        except ValueError:
+            continue
+    return 0
+
+
+def ke_sen(nilai):
+    """Nominal rupiah (int/float/str) jadi integer sen, dibulatkan ke sen terdekat"""
+    return int(round(float(nilai) * 100))
+
+
+def dari_sen(sen):
+    """Integer sen jadi rupiah; int kalau bulat, supaya file dan tampilan tetap seperti biasa"""
+    return sen // 100 if sen % 100 == 0 else sen / 100
+
+
+def normalisasi_baris(baris, tahun=None):
+    """Normalisasi baris saat ditulis: 'tanggal_urut' (ordinal hari) dan nominal kanonik.
+
+    'tanggal' tetap disimpan apa adanya untuk tampilan dan hapus per tanggal;
+    sort, grouping dan filter periode cukup membandingkan integer 'tanggal_urut'.
+    Debit/kredit dibulatkan ke sen (25000000.0 -> 25000000, 19710.004 -> 19710)
+    sehingga semua penjumlahan di integer sen selalu eksak.
+    """
+    if 'tanggal_urut' not in baris:
+        baris['tanggal_urut'] = tanggal_ke_ordinal(baris['tanggal'], tahun)
+    for kolom in ('debit', 'kredit'):
+        if kolom in baris:
+            baris[kolom] = dari_sen(ke_sen(baris[kolom]))
+    return baris
+
+
+def urutan_tanggal(baris):
+    """Ordinal tanggal baris untuk sort/filter; tanpa parsing untuk baris yang sudah dinormalisasi"""
+    urut = baris.get('tanggal_urut')
+    return urut if urut is not None else tanggal_ke_ordinal(baris['tanggal'])
+
+
+class BarisJurnal(MutableMapping):
+    """Satu baris jurnal yang hemat memori: __slots__ (tanpa dict per baris) dan string di-intern.
+
+    Nama akun, tanggal, keterangan dan ref yang sama hanya disimpan sekali di tabel
+    string proses (sys.intern), dipakai bersama oleh semua session. Objek ini tetap
+    berperilaku seperti dict (trans['akun'], trans.get('ref', ''), 'ref' in trans,
+    dict(trans)), jadi kode tampilan yang lama tidak perlu diubah.
+    """
+
+    KUNCI = ('tanggal', 'tanggal_urut', 'akun', 'debit', 'kredit', 'keterangan', 'ref')
+    KUNCI_TEKS = frozenset(('tanggal', 'akun', 'keterangan', 'ref'))
+    # 'ekstra' menampung kunci di luar KUNCI (jarang), dibuat hanya kalau perlu
+    __slots__ = KUNCI + ('ekstra',)
+
+    def __init__(self, data=()):
+        self.ekstra = None
+        for kunci, nilai in dict(data).items():
+            self[kunci] = nilai
+
+    @classmethod
+    def dari_daftar(cls, transactions):
+        return [trans if isinstance(trans, cls) else cls(trans) for trans in transactions]
+
+    def __getitem__(self, kunci):
+        if kunci in self.KUNCI:
+            try:
+                return getattr(self, kunci)
+            except AttributeError:
+                raise KeyError(kunci) from None
+        if self.ekstra is None:
+            raise KeyError(kunci)
+        return self.ekstra[kunci]
+
+    def __setitem__(self, kunci, nilai):
+        if kunci in self.KUNCI:
+            if kunci in self.KUNCI_TEKS and type(nilai) is str:
+                nilai = sys.intern(nilai)
+            setattr(self, kunci, nilai)
+        else:
+            if self.ekstra is None:
+                self.ekstra = {}
+            self.ekstra[kunci] = nilai
+
+    def __delitem__(self, kunci):
+        if kunci in self.KUNCI:
+            try:
+                delattr(self, kunci)
+            except AttributeError:
+                raise KeyError(kunci) from None
+        elif self.ekstra is not None and kunci in self.ekstra:
+            del self.ekstra[kunci]
+        else:
+            raise KeyError(kunci)
+
+    def __iter__(self):
+        for kunci in self.KUNCI:
+            if hasattr(self, kunci):
+                yield kunci
+        if self.ekstra:
+            yield from self.ekstra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"BarisJurnal({dict(self)!r})"
+
+
+def nomor_entri(transactions):
+    """Generator nomor entri per baris; entri baru dimulai setelah debit = kredit (1 transaksi = 1 entri)"""
+    entri = 1
+    selisih = 0
+    for trans in transactions:
+        yield entri
+        selisih += ke_sen(trans.get('debit', 0)) - ke_sen(trans.get('kredit', 0))
+        if selisih == 0:
+            entri += 1
+
+
+def kelompokkan_entri(transactions):
+    """Beri nomor entri per kelompok baris yang debit = kredit (1 transaksi = 1 entri)"""
+    return list(nomor_entri(transactions))
+
+
+def ke_angka(seri):
+    """Kolom nominal file import ke float; teks boleh berformat Indonesia ("Rp1.250.000,50")"""
+    if pd.api.types.is_numeric_dtype(seri):
+        return seri.astype(float)
+    teks = seri.fillna('').astype(str).str.replace(r'[^\d,.\-]', '', regex=True)
+    # Koma desimal atau titik pemisah ribuan: titik dibuang, koma jadi titik desimal
+    ribuan = teks.str.contains(',', regex=False) | teks.str.contains(r'\.\d{3}(?:\.|$)')
+    teks = teks.mask(ribuan, teks.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(teks, errors='coerce')
+
+
+def validasi_impor(df, peta, akun_valid):
+    """Validasi mutasi hasil upload dalam satu pass pandas, lalu ubah ke baris jurnal.
+
+    peta berisi nama kolom 'tanggal' dan 'jumlah' (wajib), 'jumlah_kredit', 'keterangan'
+    dan 'ref' (boleh None), serta 'akun_debit' / 'akun_kredit' berupa ('kolom', nama kolom)
+    atau ('akun', nama akun). Return (entries, ditolak): dua BarisJurnal per mutasi yang
+    valid, dan DataFrame baris yang ditolak lengkap dengan nomor baris file dan alasannya.
+    """
+    def kolom_teks(nama):
+        if not nama:
+            return pd.Series('', index=df.index)
+        return df[nama].fillna('').astype(str).str.strip()
+    
+    def kolom_akun(sumber):
+        jenis, nilai = sumber
+        return kolom_teks(nilai) if jenis == 'kolom' else pd.Series(nilai, index=df.index)
+    
+    tanggal = pd.to_datetime(df[peta['tanggal']], errors='coerce', dayfirst=True).dt.normalize()
+    jumlah = (ke_angka(df[peta['jumlah']]) * 100).round() / 100
+    akun_debit = kolom_akun(peta['akun_debit'])
+    akun_kredit = kolom_akun(peta['akun_kredit'])
+    
+    alasan = pd.Series('', index=df.index)
+    
+    def tolak(mask, pesan):
+        nonlocal alasan
+        alasan = alasan.mask(mask, alasan + pesan + '; ')
+    
+    tolak(tanggal.isna(), 'tanggal tidak valid')
+    tolak(jumlah.isna() | (jumlah <= 0), 'jumlah tidak valid')
+    if peta.get('jumlah_kredit'):
+        jumlah_kredit = (ke_angka(df[peta['jumlah_kredit']]) * 100).round() / 100
+        tolak(jumlah_kredit.isna() | ((jumlah_kredit - jumlah).abs() >= 0.005), 'debit dan kredit tidak seimbang')
+    tolak(~akun_debit.isin(akun_valid), 'akun debit tidak dikenal: ' + akun_debit)
+    tolak(~akun_kredit.isin(akun_valid), 'akun kredit tidak dikenal: ' + akun_kredit)
+    tolak(akun_debit == akun_kredit, 'akun debit dan kredit sama')
+    
+    valid = alasan == ''
+    ditolak = df[~valid].copy()
+    # Nomor baris seperti di spreadsheet (baris 1 = header)
+    ditolak.insert(0, 'baris', ditolak.index + 2)
+    ditolak['alasan'] = alasan[~valid].str.rstrip('; ')
+    
+    tanggal = tanggal[valid]
+    kolom_baris = zip(
+        tanggal.dt.strftime("%d %B %Y"),
+        (tanggal - pd.Timestamp(1970, 1, 1)).dt.days + datetime(1970, 1, 1).toordinal(),
+        akun_debit[valid], akun_kredit[valid], jumlah[valid],
+        kolom_teks(peta.get('keterangan'))[valid], kolom_teks(peta.get('ref'))[valid]
+    )
+    entries = []
+    for teks_tanggal, urut, debit, kredit, nilai, keterangan, ref in kolom_baris:
+        nilai = float(nilai)
+        entries.append(BarisJurnal({
+            'tanggal': teks_tanggal, 'tanggal_urut': int(urut), 'akun': debit,
+            'debit': nilai, 'kredit': 0, 'keterangan': keterangan, 'ref': ref
+        }))
+        entries.append(BarisJurnal({
+            'tanggal': teks_tanggal, 'tanggal_urut': int(urut), 'akun': kredit,
+            'debit': 0, 'kredit': nilai, 'keterangan': keterangan, 'ref': ref
+        }))
+    return entries, ditolak
+
+
+def baris_ekspor_jurnal_umum(sumber):
+    """Baris export Jurnal Umum (urut posting) + baris TOTAL, satu per satu.
+
+    Memakai seluruh riwayat (sumber['jurnal_lengkap']) kalau ada periode tertutup, supaya
+    baris periode itu tidak hilang dari export dan TOTAL sama dengan saldo cache.
+    """
+    snapshot = sumber.get('jurnal_lengkap', sumber['snapshot'])
+    total_debit = total_kredit = 0
+    for trans in snapshot:
+        debit, kredit = ke_sen(trans['debit']), ke_sen(trans['kredit'])
+        total_debit += debit
+        total_kredit += kredit
+        yield [trans['tanggal'], trans['akun'], trans.get('keterangan', ''), trans.get('ref', ''),
+               dari_sen(debit), dari_sen(kredit)]
+    yield ["TOTAL", "", "", "", dari_sen(total_debit), dari_sen(total_kredit)]
+
+
+def baris_ekspor_buku_besar(sumber):
+    """Baris export Buku Besar: per akun urut tanggal, dengan saldo berjalan sesuai saldo normal.
+
+    Kalau ada periode yang sudah ditutup (sumber['saldo_awal']), setiap akun dibuka dengan
+    satu baris Saldo Awal dari snapshot penutupan dan hanya baris sesudahnya yang ditulis.
+    """
+    snapshot, bagan = sumber['snapshot'], sumber['bagan']
+    awal = sumber.get('saldo_awal')
+    saldo_awal = awal['saldo'] if awal else {}
+    offset = {}
+    for i, trans in enumerate(snapshot):
+        if awal is None or urutan_tanggal(trans) > awal['akhir']:
+            offset.setdefault(trans['akun'], array('l')).append(i)
+    for akun in sorted(set(offset) | {akun for akun, saldo in saldo_awal.items() if saldo}):
+        arah = 1 if bagan.normal_debit(akun) else -1
+        saldo = arah * saldo_awal.get(akun, 0)
+        if awal:
+            yield [akun, datetime.fromordinal(awal['akhir'] + 1).strftime("%d %B %Y"), "Saldo Awal", "",
+                   "", "", dari_sen(saldo)]
+        for i in sorted(offset.get(akun, ()), key=lambda i: urutan_tanggal(snapshot[i])):
+            trans = snapshot[i]
+            debit, kredit = ke_sen(trans['debit']), ke_sen(trans['kredit'])
+            saldo += arah * (debit - kredit)
+            yield [akun, trans['tanggal'], trans.get('keterangan', ''), trans.get('ref', ''),
+                   dari_sen(debit), dari_sen(kredit), dari_sen(saldo)]
+
+
+def baris_ekspor_neraca_saldo(sumber):
+    """Baris export Neraca Saldo: saldo mentah per akun di kolom debit/kredit + baris TOTAL"""
+    # Dimulai dari snapshot periode tertutup terakhir; hanya baris sesudahnya yang dijumlah
+    awal = sumber.get('saldo_awal')
+    saldo = dict(awal['saldo']) if awal else {}
+    for trans in sumber['snapshot']:
+        if awal and urutan_tanggal(trans) <= awal['akhir']:
+            continue
+        akun = trans['akun']
+        saldo[akun] = saldo.get(akun, 0) + ke_sen(trans['debit']) - ke_sen(trans['kredit'])
+    total_debit = total_kredit = 0
+    for akun in sorted(saldo):
+        debit, kredit = (saldo[akun], 0) if saldo[akun] >= 0 else (0, -saldo[akun])
+        total_debit += debit
+        total_kredit += kredit
+        yield [akun, dari_sen(debit), dari_sen(kredit)]
+    yield ["TOTAL", dari_sen(total_debit), dari_sen(total_kredit)]
+
+
+def baris_ekspor_jurnal_penyesuaian(sumber):
+    """Baris export Jurnal Penyesuaian + baris TOTAL"""
+    total_debit = total_kredit = 0
+    for pen in sumber['penyesuaian']:
+        debit, kredit = ke_sen(pen['debit']), ke_sen(pen['kredit'])
+        total_debit += debit
+        total_kredit += kredit
+        yield [pen['tanggal'], pen.get('jenis', ''), pen['akun_debit'], pen['akun_kredit'],
+               dari_sen(debit), dari_sen(kredit)]
+    yield ["TOTAL", "", "", "", dari_sen(total_debit), dari_sen(total_kredit)]
+
+
+def sisi_saldo(bagan, akun, saldo):
+    """(debit, kredit) dalam sen untuk saldo bertanda saldo normal (positif = sisi normal)"""
+    if bagan.normal_debit(akun) == (saldo >= 0):
+        return abs(saldo), 0
+    return 0, abs(saldo)
+
+
+def baris_neraca(bagan, saldo):
+    """Baris [akun, debit, kredit] + TOTAL dari {akun: saldo sen bertanda saldo normal}"""
+    total_debit = total_kredit = 0
+    for akun in sorted(saldo):
+        if saldo[akun] == 0:
+            continue
+        debit, kredit = sisi_saldo(bagan, akun, saldo[akun])
+        total_debit += debit
+        total_kredit += kredit
+        yield [akun, dari_sen(debit), dari_sen(kredit)]
+    yield ["TOTAL", dari_sen(total_debit), dari_sen(total_kredit)]
+
+
+def baris_ekspor_neraca_penyesuaian(sumber):
+    """Baris export Neraca Setelah Penyesuaian"""
+    saldo = {akun: ke_sen(nilai) for akun, nilai in sumber['saldo_penyesuaian'].items()}
+    return baris_neraca(sumber['bagan'], saldo)
+
+
+def baris_ekspor_laporan_keuangan(sumber):
+    """Baris export Laba Rugi, Perubahan Modal dan Neraca dari data laporan keuangan"""
+    data = sumber['data_keuangan']
+    yield ["Laba Rugi", "PENDAPATAN", ""]
+    for akun, jumlah in data['pendapatan'].items():
+        yield ["Laba Rugi", akun, jumlah]
+    yield ["Laba Rugi", "Total Pendapatan", data['total_pendapatan']]
+    yield ["Laba Rugi", "Harga Pokok Penjualan", data['hpp_total']]
+    yield ["Laba Rugi", "Laba Kotor", data['laba_kotor']]
+    yield ["Laba Rugi", "BEBAN", ""]
+    for kelompok in ('beban_operasional', 'beban_penyusutan', 'beban_lainnya'):
+        for akun, jumlah in data[kelompok].items():
+            yield ["Laba Rugi", akun, jumlah]
+    yield ["Laba Rugi", "Total Beban", data['total_beban']]
+    yield ["Laba Rugi", "LABA BERSIH", data['laba_bersih']]
+    yield ["Perubahan Modal", "Modal Awal", data['modal_awal']]
+    yield ["Perubahan Modal", "Laba Bersih", data['laba_bersih']]
+    yield ["Perubahan Modal", "Prive", sum(data.get('prive', {}).values())]
+    yield ["Perubahan Modal", "MODAL AKHIR", data['modal_akhir']]
+    yield ["Neraca", "ASET LANCAR", ""]
+    for akun, jumlah in data['aset_lancar'].items():
+        yield ["Neraca", akun, jumlah]
+    yield ["Neraca", "ASET TETAP", ""]
+    for akun, jumlah in data['aset_tetap'].items():
+        yield ["Neraca", akun, jumlah]
+    for akun, jumlah in data['akumulasi_penyusutan'].items():
+        yield ["Neraca", akun, -jumlah]
+    yield ["Neraca", "TOTAL ASET", data['total_aset']]
+    yield ["Neraca", "KEWAJIBAN", ""]
+    for akun, jumlah in data['kewajiban'].items():
+        yield ["Neraca", akun, jumlah]
+    yield ["Neraca", "Modal Pemilik", data['modal_akhir']]
+    yield ["Neraca", "TOTAL KEWAJIBAN DAN MODAL", data['total_kewajiban_modal']]
+
+
+def entri_jurnal_penutup(bagan, saldo):
+    """Entri jurnal penutup [(keterangan, akun, debit sen, kredit sen)] dari saldo setelah penyesuaian.
+
+    Pendapatan dan beban ditutup ke Ikhtisar Laba Rugi, ikhtisar ke modal, lalu prive ke modal.
+    """
+    akun_modal = next((akun for akun in saldo if bagan.tipe(akun) == "Modal"), "Modal Pemilik")
+    if "Modal Pemilik" in saldo:
+        akun_modal = "Modal Pemilik"
+    entri = []
+    total = {}
+    for tipe, keterangan in (("Pendapatan", "Penutupan Pendapatan"), ("Beban", "Penutupan Beban")):
+        baris = []
+        for akun in sorted(saldo):
+            if bagan.tipe(akun) == tipe and saldo[akun] != 0:
+                # Dibalik dari sisi normalnya supaya saldo akun menjadi nol
+                kredit, debit = sisi_saldo(bagan, akun, saldo[akun])
+                baris.append((keterangan, akun, debit, kredit))
+        total[tipe] = sum(saldo[akun] for _, akun, _, _ in baris)
+        if not baris:
+            continue
+        # Lawan di Ikhtisar Laba Rugi menyeimbangkan debit dan kredit entri ini
+        selisih = sum(debit - kredit for _, _, debit, kredit in baris)
+        ikhtisar = (keterangan, "Ikhtisar Laba Rugi", max(-selisih, 0), max(selisih, 0))
+        if tipe == "Pendapatan":
+            entri += baris + [ikhtisar]
+        else:
+            entri += [ikhtisar] + baris
+    laba = total["Pendapatan"] - total["Beban"]
+    if laba > 0:
+        entri += [("Penutupan Ikhtisar Laba Rugi", "Ikhtisar Laba Rugi", laba, 0),
+                  ("Penutupan Ikhtisar Laba Rugi", akun_modal, 0, laba)]
+    elif laba < 0:
+        entri += [("Penutupan Ikhtisar Laba Rugi", akun_modal, -laba, 0),
+                  ("Penutupan Ikhtisar Laba Rugi", "Ikhtisar Laba Rugi", 0, -laba)]
+    for akun in sorted(saldo):
+        if bagan.tipe(akun) == "Prive" and saldo[akun] > 0:
+            entri += [("Penutupan Prive", akun_modal, saldo[akun], 0),
+                      ("Penutupan Prive", akun, 0, saldo[akun])]
+    return entri
+
+
+def baris_ekspor_jurnal_penutup(sumber):
+    """Baris export Jurnal Penutup + baris TOTAL"""
+    saldo = {akun: ke_sen(nilai) for akun, nilai in sumber['saldo_penyesuaian'].items()}
+    total_debit = total_kredit = 0
+    for keterangan, akun, debit, kredit in entri_jurnal_penutup(sumber['bagan'], saldo):
+        total_debit += debit
+        total_kredit += kredit
+        yield [keterangan, akun, dari_sen(debit), dari_sen(kredit)]
+    yield ["TOTAL", "", dari_sen(total_debit), dari_sen(total_kredit)]
+
+
+def baris_ekspor_neraca_penutupan(sumber):
+    """Baris export Neraca Saldo Setelah Penutupan: akun riil setelah jurnal penutup diposting"""
+    bagan = sumber['bagan']
+    saldo = {akun: ke_sen(nilai) for akun, nilai in sumber['saldo_penyesuaian'].items()}
+    for _, akun, debit, kredit in entri_jurnal_penutup(bagan, saldo):
+        arah = 1 if bagan.normal_debit(akun) else -1
+        saldo[akun] = saldo.get(akun, 0) + arah * (debit - kredit)
+    return baris_neraca(bagan, {akun: nilai for akun, nilai in saldo.items() if not bagan.nominal(akun)})
+
+
+# Laporan yang bisa di-export: jenis -> (kolom, generator baris dari dict sumber).
+# sumber: 'snapshot' (Jurnal Umum), 'bagan', 'penyesuaian', 'saldo_penyesuaian', 'data_keuangan'
+EKSPOR_LAPORAN = {
+    "Jurnal Umum": (["Tanggal", "Akun", "Keterangan", "Ref", "Debit", "Kredit"], baris_ekspor_jurnal_umum),
+    "Buku Besar": (["Akun", "Tanggal", "Keterangan", "Ref", "Debit", "Kredit", "Saldo"], baris_ekspor_buku_besar),
+    "Neraca Saldo": (["Akun", "Debit", "Kredit"], baris_ekspor_neraca_saldo),
+    "Jurnal Penyesuaian": (["Tanggal", "Keterangan", "Akun Debit", "Akun Kredit", "Debit", "Kredit"],
+                           baris_ekspor_jurnal_penyesuaian),
+    "Neraca Setelah Penyesuaian": (["Akun", "Debit", "Kredit"], baris_ekspor_neraca_penyesuaian),
+    "Laporan Keuangan": (["Laporan", "Pos", "Jumlah"], baris_ekspor_laporan_keuangan),
+    "Jurnal Penutup": (["Keterangan", "Akun", "Debit", "Kredit"], baris_ekspor_jurnal_penutup),
+    "Neraca Saldo Setelah Penutupan": (["Akun", "Debit", "Kredit"], baris_ekspor_neraca_penutupan),
+}
+
+# Laporan yang butuh saldo setelah penyesuaian (bukan hanya Jurnal Umum)
+LAPORAN_BUTUH_SALDO = {"Neraca Setelah Penyesuaian", "Laporan Keuangan", "Jurnal Penutup",
+                       "Neraca Saldo Setelah Penutupan"}
+
+
+def dengan_progres(bagian, jumlah_bagian, total_baris, progres, setiap=5000):
+    """Bungkus (judul, kolom, baris) supaya progres(0..1) dilaporkan setiap `setiap` baris"""
+    total_baris = max(total_baris, 1)
+    for ke, (judul, kolom, baris) in enumerate(bagian):
+        def hitung(baris=baris, ke=ke):
+            for i, row in enumerate(baris, 1):
+                if i % setiap == 0:
+                    progres((ke + min(i / total_baris, 1)) / jumlah_bagian)
+                yield row
+            progres((ke + 1) / jumlah_bagian)
+        yield judul, kolom, hitung()
+
+
+def tulis_ekspor_csv(berkas, kepala, bagian):
+    """Tulis CSV ke berkas biner baris demi baris; bagian berisi (judul, kolom, baris)"""
+    teks = io.TextIOWrapper(berkas, encoding='utf-8', newline='')
+    writer = csv.writer(teks)
+    writer.writerows([baris] for baris in kepala)
+    for judul, kolom, baris in bagian:
+        writer.writerow([])
+        writer.writerow([judul.upper()])
+        writer.writerow(kolom)
+        writer.writerows(baris)
+    teks.flush()
+    teks.detach()
+
+
+def tulis_ekspor_pdf(berkas, kepala, bagian, **pengaturan):
+    """Tulis PDF: satu tabel per laporan, halaman dialirkan ke berkas lewat PenulisPdf"""
+    pdf = PenulisPdf(berkas, kepala=kepala, **pengaturan)
+    for judul, kolom, baris in bagian:
+        pdf.tabel(judul, kolom, baris)
+    pdf.tutup()
+
+
+def tulis_ekspor_excel(berkas, info, bagian):
+    """Tulis XLSX lewat openpyxl write-only: baris langsung dialirkan ke file, memori tetap datar"""
+    if Workbook is None:
+        raise RuntimeError("Export Excel membutuhkan paket openpyxl")
+    workbook = Workbook(write_only=True)
+    for judul, kolom, baris in bagian:
+        sheet = workbook.create_sheet(judul[:31])
+        sheet.append(kolom)
+        for row in baris:
+            sheet.append(row)
+    sheet = workbook.create_sheet("Info Laporan")
+    sheet.append(["Keterangan", "Value"])
+    for row in info:
+        sheet.append(row)
+    workbook.save(berkas)
+
+
+# Ukuran kertas dalam point (1/72 inci) dan margin per pilihan di pengaturan print
+UKURAN_KERTAS = {"A4": (595.28, 841.89), "Letter": (612, 792), "Legal": (612, 1008), "A3": (841.89, 1190.55)}
+MARGIN_KERTAS = {"Normal": 54, "Wide": 90, "Narrow": 27}
+# Lebar kolom PDF dalam karakter (font monospace); kolom lain memakai LEBAR_KOLOM_PDF_DEFAULT
+LEBAR_KOLOM_PDF = {"Tanggal": 17, "Akun": 24, "Akun Debit": 22, "Akun Kredit": 22, "Keterangan": 26,
+                   "Ref": 6, "Pos": 30, "Item": 32}
+LEBAR_KOLOM_PDF_DEFAULT = 16
+
+
+class PenulisPdf:
+    """Penulis PDF 1.4 minimal dengan font Courier bawaan, halaman demi halaman ke file.
+
+    Hanya isi satu halaman yang dipegang di memori; begitu penuh, halaman dikompres dan
+    ditulis. Yang tersisa hanya offset objek untuk tabel xref, jadi dokumen ratusan halaman
+    tetap memakai memori yang sama.
+    """
+
+    LEBAR_KARAKTER = 0.6  # Lebar glyph Courier per ukuran font
+
+    def __init__(self, berkas, kertas="A4", orientasi="Portrait", margin="Normal", skala=1.0,
+                 nomor_halaman=True, kepala=None, ukuran_font=9.0):
+        lebar, tinggi = UKURAN_KERTAS.get(kertas, UKURAN_KERTAS["A4"])
+        if orientasi == "Landscape":
+            lebar, tinggi = tinggi, lebar
+        self.lebar, self.tinggi = lebar, tinggi
+        self.margin = MARGIN_KERTAS.get(margin, MARGIN_KERTAS["Normal"])
+        # skala None = Fit to Page: font dibesarkan/dikecilkan sampai tabel pas selebar kertas
+        self.skala = skala
+        self.ukuran_font = ukuran_font
+        self.nomor_halaman = nomor_halaman
+        self.kepala = kepala or []
+        self.berkas = berkas
+        self.posisi = 0
+        self.offset = array('q', [0] * 5)  # Objek 1-4: katalog, pohon halaman, dua font
+        self.daftar_halaman = array('q')
+        self.isi = None
+        self._tulis(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for nomor, font in ((3, b"Courier"), (4, b"Courier-Bold")):
+            self._objek(nomor, b"<< /Type /Font /Subtype /Type1 /BaseFont /" + font +
+                        b" /Encoding /WinAnsiEncoding >>")
+
+    def _tulis(self, data):
+        self.berkas.write(data)
+        self.posisi += len(data)
+
+    def _objek(self, nomor, isi):
+        self.offset[nomor] = self.posisi
+        self._tulis(b"%d 0 obj\n" % nomor + isi + b"\nendobj\n")
+
+    def _nomor_baru(self):
+        self.offset.append(0)
+        return len(self.offset) - 1
+
+    @staticmethod
+    def _teks_pdf(teks):
+        teks = str(teks).encode('cp1252', 'replace')
+        return b"(" + teks.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+    def _teks(self, x, y, teks, tebal=False, ukuran=None):
+        self.isi.append(b"BT /F%d %.2f Tf %.2f %.2f Td %s Tj ET" % (
+            4 if tebal else 3, ukuran or self.font, x, y, self._teks_pdf(teks)))
+
+    def _garis(self, y):
+        self.isi.append(b"0.5 w %.2f %.2f m %.2f %.2f l S" % (self.margin, y, self.lebar - self.margin, y))
+
+    def _mulai_halaman(self):
+        self._selesai_halaman()
+        self.isi = []
+        self.y = self.tinggi - self.margin
+        for i, baris in enumerate(self.kepala):
+            ukuran = self.font + 2 if i == 0 else self.font
+            self.y -= ukuran * 1.3
+            self._teks(self.margin, self.y, baris, tebal=(i == 0), ukuran=ukuran)
+        if self.kepala:
+            self.y -= self.font * 0.8
+            self._garis(self.y)
+        self.y -= self.font * 1.6
+        self._teks(self.margin, self.y, self.judul, tebal=True)
+        self.y -= self.baris_tinggi
+        self._teks(self.margin, self.y, self.format_baris(self.kolom), tebal=True)
+        self.y -= self.font * 0.5
+        self._garis(self.y)
+
+    def _selesai_halaman(self):
+        if self.isi is None:
+            return
+        nomor = len(self.daftar_halaman) + 1
+        if self.nomor_halaman:
+            teks = f"Halaman {nomor}"
+            x = (self.lebar - len(teks) * self.LEBAR_KARAKTER * self.font) / 2
+            self._teks(x, self.margin / 2, teks)
+        stream = zlib.compress(b"\n".join(self.isi))
+        nomor_isi, nomor_halaman = self._nomor_baru(), self._nomor_baru()
+        self._objek(nomor_isi, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) +
+                    stream + b"\nendstream")
+        self._objek(nomor_halaman, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+                    b"/Resources << /Font << /F3 3 0 R /F4 4 0 R >> >> /Contents %d 0 R >>" % (
+                        self.lebar, self.tinggi, nomor_isi))
+        self.daftar_halaman.append(nomor_halaman)
+        self.isi = None
+
+    @staticmethod
+    def format_sel(nilai):
+        if isinstance(nilai, (int, float)) and not isinstance(nilai, bool):
+            return f"{nilai:,.0f}" if nilai == int(nilai) else f"{nilai:,.2f}"
+        return "" if nilai is None else str(nilai)
+
+    def format_baris(self, baris):
+        sel = []
+        for i, (nilai, lebar) in enumerate(zip(baris, self.lebar_kolom)):
+            teks = self.format_sel(nilai)[:lebar]
+            angka = isinstance(nilai, (int, float)) or (self.kolom_angka[i] and nilai == self.kolom[i])
+            sel.append(teks.rjust(lebar) if angka else teks.ljust(lebar))
+        return " ".join(sel).rstrip()
+
+    def tabel(self, judul, kolom, baris):
+        """Tulis satu tabel mulai di halaman baru; header kolom diulang di setiap halaman"""
+        self.judul = judul.upper()
+        self.kolom = kolom
+        self.lebar_kolom = [LEBAR_KOLOM_PDF.get(nama, LEBAR_KOLOM_PDF_DEFAULT) for nama in kolom]
+        self.kolom_angka = [nama not in LEBAR_KOLOM_PDF for nama in kolom]
+        jumlah_karakter = sum(self.lebar_kolom) + len(kolom) - 1
+        pas_lebar = (self.lebar - 2 * self.margin) / (jumlah_karakter * self.LEBAR_KARAKTER)
+        # Tabel tidak pernah melewati margin kanan: font dikecilkan kalau perlu
+        self.font = pas_lebar if self.skala is None else min(self.ukuran_font * self.skala, pas_lebar)
+        self.baris_tinggi = self.font * 1.35
+        batas_bawah = self.margin + self.font * 2
+        self._mulai_halaman()
+        for row in baris:
+            if self.y - self.baris_tinggi < batas_bawah:
+                self._mulai_halaman()
+            self.y -= self.baris_tinggi
+            self._teks(self.margin, self.y, self.format_baris(row), tebal=(row and row[0] == "TOTAL"))
+
+    def tutup(self):
+        """Tulis halaman terakhir, pohon halaman, katalog dan xref"""
+        if self.isi is None and not self.daftar_halaman:
+            self.tabel("Tidak ada data", [], [])
+        self._selesai_halaman()
+        anak = b" ".join(b"%d 0 R" % nomor for nomor in self.daftar_halaman)
+        self._objek(2, b"<< /Type /Pages /Kids [" + anak + b"] /Count %d >>" % len(self.daftar_halaman))
+        self._objek(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        awal_xref = self.posisi
+        self._tulis(b"xref\n0 %d\n0000000000 65535 f \n" % len(self.offset))
+        for offset in self.offset[1:]:
+            self._tulis(b"%010d 00000 n \n" % offset)
+        self._tulis(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(self.offset), awal_xref))
+
+
+_sumber_pekerja = (None, None)
+
+
+def _render_bagian_pekerja(jenis, format_file, info, token, data_sumber):
+    """Tugas process pool: sumber dikirim sebagai pickle, dibuka sekali per pekerja per export"""
+    global _sumber_pekerja
+    if _sumber_pekerja[0] != token:
+        _sumber_pekerja = (token, pickle.loads(data_sumber))
+    return render_bagian_ekspor(jenis, format_file, info, _sumber_pekerja[1])
+
+
+def render_bagian_ekspor(jenis, format_file, info, sumber):
+    """Satu laporan sebagai file CSV / Excel / PDF berdiri sendiri (isi ZIP 'Semua Siklus')"""
+    kolom, baris = EKSPOR_LAPORAN[jenis]
+    bagian = [(jenis, kolom, baris(sumber))]
+    with tempfile.TemporaryFile() as berkas:
+        if format_file == "Excel":
+            tulis_ekspor_excel(berkas, info, bagian)
+        elif format_file == "PDF":
+            tulis_ekspor_pdf(berkas, [f"{kunci}: {nilai}" for kunci, nilai in info], bagian)
+        else:
+            tulis_ekspor_csv(berkas, [f"{kunci}: {nilai}" for kunci, nilai in info], bagian)
+        berkas.seek(0)
+        return berkas.read()
+
+
+def pool_ekspor():
+    """Process pool render ZIP, satu per proses dan dipakai ulang oleh setiap export.
+
+    Pekerja dibuat lewat forkserver (atau spawn), bukan fork dari server Streamlit yang
+    multi-thread: pekerja tidak mewarisi lock yang sedang dipegang thread lain maupun
+    koneksi SQLite bersama, dan biaya start pekerja hanya dibayar sekali.
+    """
+    cache = sumber_daya_proses()
+    if 'pool_ekspor' not in cache:
+        metode = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        cache['pool_ekspor'] = ProcessPoolExecutor(
+            max(1, min(len(EKSPOR_LAPORAN), os.cpu_count() or 1)),
+            mp_context=multiprocessing.get_context(metode)
+        )
+    return cache['pool_ekspor']
+
+
+def tulis_zip_laporan(berkas, daftar_jenis, format_file, info, sumber, progres=None):
+    """Render setiap laporan bersamaan di pool_ekspor lalu gabungkan ke satu ZIP.
+
+    Sumber (snapshot jurnal dan saldo) di-pickle sekali per export; waktu total mendekati
+    laporan yang paling lama, bukan jumlah semuanya.
+    """
+    ekstensi = {"Excel": "xlsx", "PDF": "pdf"}.get(format_file, "csv")
+    executor = pool_ekspor()
+    token, data_sumber = uuid.uuid4().hex, pickle.dumps(sumber, pickle.HIGHEST_PROTOCOL)
+    try:
+        with zipfile.ZipFile(berkas, 'w', zipfile.ZIP_DEFLATED) as arsip:
+            tugas = {
+                executor.submit(_render_bagian_pekerja, jenis, format_file, info, token, data_sumber): (nomor, jenis)
+                for nomor, jenis in enumerate(daftar_jenis, 1)
+            }
+            for selesai, future in enumerate(as_completed(tugas), 1):
+                nomor, jenis = tugas[future]
+                arsip.writestr(f"{nomor:02d}_{jenis.replace(' ', '_')}.{ekstensi}", future.result())
+                if progres is not None:
+                    progres(selesai / len(daftar_jenis))
+    except BrokenProcessPool:
+        # Pekerja mati (mis. kehabisan memori): pool dibuat ulang di export berikutnya
+        sumber_daya_proses().pop('pool_ekspor', None)
+        raise
+
+
+@st.cache_resource
+def sumber_daya_proses():
+    """Satu dict per proses Streamlit untuk data yang dipakai bersama semua session dan rerun"""
+    return {}
+
+
+def tanda_berkas(paths):
+    """Sidik (mtime_ns, ukuran) setiap file, None kalau file belum ada"""
+    tanda = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+            tanda.append((info.st_mtime_ns, info.st_size))
+        except OSError:
+            tanda.append(None)
+    return tuple(tanda)
+
+
+def muat_bila_berubah(kunci, paths, pemuat):
+    """Ambil data dari cache proses; pemuat() hanya dipanggil lagi kalau file sumbernya berubah"""
+    cache = sumber_daya_proses()
+    # Sidik diambil sebelum memuat: perubahan selama memuat terdeteksi di rerun berikutnya
+    tanda = tanda_berkas(paths)
+    entri = cache.get(kunci)
+    if entri is None or entri[0] != tanda:
+        entri = cache[kunci] = (tanda, pemuat())
+    return entri[1]
+
+
+# Lock file yang sedang dipegang thread ini (path -> [file lock, jumlah pemegang]) dan batch aktif
+_status_tulis = threading.local()
+
+# Tanpa fcntl: satu threading.Lock per path, hanya mengunci antar thread proses ini
+_kunci_thread = {}
+_kunci_thread_lock = threading.Lock()
+
+
+class KonflikVersi(Exception):
+    """File terus diubah penulis lain sehingga read-modify-write tidak berhasil"""
+
+
+@contextmanager
+def kunci_berkas(path):
+    """Advisory lock eksklusif (fcntl.flock) pada path + '.lock', berlaku lintas proses dan thread.
+
+    Reentrant dalam satu thread; lock baru dilepas saat pemegang terakhir selesai.
+    File lock sekaligus menyimpan nomor versi tulis file datanya (lihat versi_berkas).
+    Tanpa fcntl (Windows) hanya thread dalam proses yang sama yang saling mengunci;
+    antar proses yang tersisa hanya penggantian file atomic dan cek versi.
+    """
+    path = os.path.abspath(path)
+    dipegang = _status_tulis.__dict__.setdefault('dipegang', {})
+    if path in dipegang:
+        dipegang[path][1] += 1
+    else:
+        berkas_kunci = open(path + '.lock', 'a+')
+        if fcntl is not None:
+            fcntl.flock(berkas_kunci.fileno(), fcntl.LOCK_EX)
+        else:
+            with _kunci_thread_lock:
+                kunci = _kunci_thread.setdefault(path, threading.Lock())
+            kunci.acquire()
+        dipegang[path] = [berkas_kunci, 1]
+    try:
+        yield dipegang[path][0]
+    finally:
+        dipegang[path][1] -= 1
+        if not dipegang[path][1]:
+            berkas_kunci = dipegang.pop(path)[0]
+            if fcntl is not None:
+                fcntl.flock(berkas_kunci.fileno(), fcntl.LOCK_UN)
+            else:
+                _kunci_thread[path].release()
+            berkas_kunci.close()
+
+
+def versi_berkas(path):
+    """Nomor versi tulis file (naik setiap tulis_atomik); 0 kalau belum pernah ditulis lewat layer ini"""
+    try:
+        with open(os.path.abspath(path) + '.lock', 'r') as f:
+            return int(f.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def tulis_atomik(path, tulis, fsync=True, mode='w'):
+    """Tulis file lewat file temp + os.replace di bawah kunci_berkas.
+
+    tulis(f) mengisi file temp. Pembaca tidak pernah melihat file setengah jadi dan
+    proses yang mati di tengah jalan hanya meninggalkan file temp. Di dalam batch_tulis
+    fsync dan replace ditunda ke akhir batch.
+    """
+    _ganti_dengan_temp(path, lambda: _tulis_temp(path, tulis, mode), fsync)
+
+
+def _ganti_dengan_temp(path, buat_temp, fsync=True):
+    """Commit file temp hasil buat_temp() ke path (langsung, atau di akhir batch_tulis yang aktif)"""
+    batch = getattr(_status_tulis, 'batch', None)
+    if batch is not None:
+        berkas_kunci = batch['kunci'].enter_context(kunci_berkas(path))
+        batch['berkas'].append((buat_temp(), path, fsync, berkas_kunci))
+        return
+    with kunci_berkas(path) as berkas_kunci:
+        _commit_temp([(buat_temp(), path, fsync, berkas_kunci)])
+
+
+def _tulis_temp(path, tulis, mode='w'):
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_file = tempfile.mkstemp(dir=folder, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            tulis(f)
+    except BaseException:
+        os.remove(tmp_file)
+        raise
+    return tmp_file
+
+
+def _commit_temp(daftar):
+    """fsync semua file temp, replace ke tujuannya, naikkan versi, lalu fsync tiap folder sekali"""
+    folder_fsync = set()
+    for tmp_file, path, fsync, _ in daftar:
+        if fsync:
+            with open(tmp_file, 'rb') as f:
+                os.fsync(f.fileno())
+            folder_fsync.add(os.path.dirname(os.path.abspath(path)))
+    for tmp_file, path, _, berkas_kunci in daftar:
+        os.replace(tmp_file, path)
+        berkas_kunci.seek(0)
+        versi = int(berkas_kunci.read() or 0) + 1
+        berkas_kunci.seek(0)
+        berkas_kunci.truncate()
+        berkas_kunci.write(str(versi))
+        berkas_kunci.flush()
+    if hasattr(os, 'O_DIRECTORY'):
+        for folder in folder_fsync:
+            fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+@contextmanager
+def batch_tulis():
+    """Kelompokkan beberapa tulis_atomik: semua file baru menggantikan file lama di akhir blok.
+
+    fsync dikerjakan berurutan sekaligus dan setiap folder cukup di-fsync sekali. Lock
+    semua file ditahan sampai batch selesai; kalau blok gagal, tidak ada file yang diganti.
+    """
+    if getattr(_status_tulis, 'batch', None) is not None:
+        yield
+        return
+    with ExitStack() as kunci:
+        batch = _status_tulis.batch = {'kunci': kunci, 'berkas': []}
+        try:
+            yield
+        except BaseException:
+            for tmp_file, *_ in batch['berkas']:
+                os.remove(tmp_file)
+            raise
+        finally:
+            _status_tulis.batch = None
+        _commit_temp(batch['berkas'])
+
+
+@contextmanager
+def tulis_atomik_banyak(mode='w'):
+    """Seperti tulis_atomik untuk beberapa file yang diisi berselang-seling dalam satu kali jalan.
+
+    yield buka(path) yang mengembalikan file temp untuk path (dibuat saat pertama diminta).
+    Semua file menggantikan file lama bersamaan di akhir blok (atau di akhir batch_tulis yang
+    sedang aktif); kalau blok gagal, semua file temp dibuang.
+    """
+    terbuka = {}
+    
+    def buka(path):
+        if path not in terbuka:
+            folder = os.path.dirname(os.path.abspath(path))
+            fd, tmp_file = tempfile.mkstemp(dir=folder, prefix=os.path.basename(path) + '.', suffix='.tmp')
+            terbuka[path] = (tmp_file, os.fdopen(fd, mode))
+        return terbuka[path][1]
+    
+    try:
+        yield buka
+    except BaseException:
+        for tmp_file, f in terbuka.values():
+            f.close()
+            os.remove(tmp_file)
+        raise
+    for _, f in terbuka.values():
+        f.close()
+    with batch_tulis():
+        for path, (tmp_file, _) in terbuka.items():
+            _ganti_dengan_temp(path, lambda tmp_file=tmp_file: tmp_file)
+
+
+def simpan_json_atomik(path, data, indent=4, fsync=True):
+    tulis_atomik(path, lambda f: json.dump(data, f, indent=indent, default=dict), fsync)
+
+
+def tulis_array_json(f, records):
+    """Tulis iterable sebagai array JSON (satu record per baris) tanpa menampung semuanya di memori"""
+    f.write("[")
+    for nomor, record in enumerate(records):
+        f.write(",\n" if nomor else "\n")
+        f.write(json.dumps(record, default=dict))
+    f.write("\n]")
+
+
+def perbarui_json(path, ubah, default=dict, percobaan=50):
+    """Read-modify-write optimistik: baca tanpa lock, ubah(data) di tempat, lalu tulis
+    hanya kalau versi file belum berubah sejak dibaca.
+
+    Kalau ada penulis lain di sela-selanya, file dibaca ulang dan ubah() diulang di atas
+    isi terbaru, jadi entri penulis lain tidak tertimpa. Return data yang ditulis.
+    """
+    for _ in range(percobaan):
+        versi = versi_berkas(path)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+        else:
+            data = default()
+        ubah(data)
+        with kunci_berkas(path):
+            if versi_berkas(path) == versi:
+                simpan_json_atomik(path, data)
+                return data
+    raise KonflikVersi(f"{path} terus berubah saat ditulis")
+
+
+class StorageBackend:
+    """Antarmuka penyimpanan data akuntansi (jurnal, penyesuaian, penutup, akun)"""
+
+    # True kalau backend bisa menjawab query saldo/buku besar langsung (tanpa loop Python)
+    mendukung_query = False
+
+    def load_jurnal(self, sejak=None):
+        """Baris Jurnal Umum. Dengan sejak (ordinal akhir periode tertutup) baris sampai tanggal
+        itu boleh tidak dimuat; tanpa sejak selalu seluruh riwayat."""
+        raise NotImplementedError
+
+    def append_jurnal(self, entries):
+        """Return True kalau urutan di storage bukan lagi jurnal lama + entries (pemanggil memuat ulang)"""
+        raise NotImplementedError
+
+    def hapus_jurnal_tanggal(self, tanggal):
+        """Return True kalau pemanggil perlu memuat ulang jurnal dari storage"""
+        raise NotImplementedError
+
+    def save_jurnal(self, transactions):
+        raise NotImplementedError
+
+    def versi_jurnal(self, sejak=None):
+        """Penanda versi Jurnal Umum (yang dimuat dengan load_jurnal(sejak)), berubah setiap kali jurnal ditulis"""
+        raise NotImplementedError
+
+    def kunci_jurnal(self):
+        """Lock lintas proses untuk penulis Jurnal Umum (cek versi + tulis dalam satu lock)"""
+        raise NotImplementedError
+
+    def hanya_tambah_sejak(self, versi_lama):
+        """True kalau sejak versi_lama Jurnal Umum hanya mendapat baris baru di akhir"""
+        return False
+
+    def berkas_data(self, jenis):
+        """File sumber data 'transaksi' atau 'akun', untuk invalidasi cache proses"""
+        raise NotImplementedError
+
+    def migrasi_normalisasi(self, tahun=None):
+        """Normalisasi data lama (tanggal_urut, nominal); kembalikan jumlah baris yang diubah"""
+        raise NotImplementedError
+
+    def load_penyesuaian(self):
+        raise NotImplementedError
+
+    def versi_penyesuaian(self):
+        """Penanda versi Jurnal Penyesuaian, berubah setiap kali penyesuaian ditulis"""
+        raise NotImplementedError
+
+    def save_penyesuaian(self, penyesuaian):
+        raise NotImplementedError
+
+    def perbarui_penyesuaian(self, ubah):
+        """ubah(daftar) diterapkan ke isi penyesuaian terbaru lalu disimpan; return daftar baru"""
+        raise NotImplementedError
+
+    def load_jurnal_penutup(self):
+        raise NotImplementedError
+
+    def save_jurnal_penutup(self, entries):
+        raise NotImplementedError
+
+    def load_transaksi(self):
+        raise NotImplementedError
+
+    def save_transaksi(self, transactions):
+        raise NotImplementedError
+
+    def accounts_exist(self):
+        raise NotImplementedError
+
+    def load_accounts(self):
+        raise NotImplementedError
+
+    def save_accounts(self, accounts):
+        raise NotImplementedError
+
+    def perbarui_accounts(self, ubah):
+        """ubah(accounts) diterapkan ke isi akun terbaru lalu disimpan; return accounts baru"""
+        raise NotImplementedError
+
+    def pemulihan(self):
+        """Context manager restore: yield ganti(jenis, records) untuk 'transactions',
+        'penyesuaian' dan 'accounts'.
+
+        Record dibaca sekali secara streaming dan ditulis ke staging. Data lama baru diganti
+        kalau seluruh blok selesai tanpa error; tulis_atomik lain di dalam blok ikut diganti
+        bersamaan. Pemanggil memegang kunci_jurnal.
+        """
+        raise NotImplementedError
+
+
+class JsonStorage(StorageBackend):
+    """Backend file JSON: Jurnal Umum dipecah per periode (satu segmen JSON Lines per periode + manifest)"""
+
+    # Segmen untuk baris yang tanggalnya tidak terbaca (tanggal_urut 0)
+    SEGMEN_TANPA_TANGGAL = "Tanpa-Tanggal"
+
+    def __init__(self, jurnal_umum_file="jurnal_umum_transactions.json",
+                 jurnal_umum_log_file="jurnal_umum_transactions.jsonl",
+                 penyesuaian_file="penyesuaian_transactions.json",
+                 jurnal_penutup_file="jurnal_penutup.json",
+                 transactions_file="transactions.json",
+                 accounts_file="accounts.json",
+                 jurnal_umum_folder="jurnal_umum"):
+        # Format lama (satu snapshot + log); dipindah ke segmen saat jurnal pertama kali dipakai
+        self.jurnal_umum_file = jurnal_umum_file
+        self.jurnal_umum_log_file = jurnal_umum_log_file
+        self.penyesuaian_file = penyesuaian_file
+        self.jurnal_penutup_file = jurnal_penutup_file
+        self.transactions_file = transactions_file
+        self.accounts_file = accounts_file
+        self.jurnal_umum_folder = jurnal_umum_folder
+        self.manifest_file = os.path.join(jurnal_umum_folder, "manifest.json")
+        self._manifest = None
+
+    def _load_json(self, path, default):
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return default
+
+    def _save_json(self, path, data):
+        simpan_json_atomik(path, data)
+
+    # ----- Jurnal Umum: segmen per periode + manifest -----
+
+    @classmethod
+    def nama_segmen(cls, ordinal):
+        """Segmen tempat baris bertanggal ordinal disimpan: kunci periode ('Jan-2024')"""
+        return PeriodeAkuntansi.nama_periode(ordinal) if ordinal > 0 else cls.SEGMEN_TANPA_TANGGAL
+
+    @classmethod
+    def rentang_segmen(cls, nama):
+        return (0, 0) if nama == cls.SEGMEN_TANPA_TANGGAL else PeriodeAkuntansi.rentang(nama)
+
+    def path_segmen(self, nama):
+        return os.path.join(self.jurnal_umum_folder, f"{nama}.jsonl")
+
+    def baca_manifest(self):
+        """Manifest {'generasi', 'segmen': {nama: {'awal', 'akhir'}}}; dibaca ulang hanya kalau file berubah.
+
+        Generasi naik setiap kali segmen ditulis ulang (hapus, restore, simpan ulang),
+        tidak pada append, jadi penanda versi cukup generasi + ukuran segmen.
+        """
+        self._siapkan_segmen()
+        info = os.stat(self.manifest_file)
+        tanda = (info.st_ino, info.st_mtime_ns, info.st_size)
+        manifest = self._manifest
+        if manifest is None or manifest[0] != tanda:
+            manifest = self._manifest = (tanda, self._load_json(self.manifest_file, {}))
+        return manifest[1]
+
+    def _simpan_manifest(self, generasi, segmen):
+        urut = dict(sorted(segmen.items(), key=lambda item: item[1]['awal']))
+        simpan_json_atomik(self.manifest_file, {'generasi': generasi, 'segmen': urut})
+
+    def daftar_segmen(self, sejak=None):
+        """Nama segmen urut periode; dengan sejak (ordinal) hanya segmen yang berakhir sesudahnya"""
+        segmen = self.baca_manifest()['segmen']
+        return [nama for nama in sorted(segmen, key=lambda nama: segmen[nama]['awal'])
+                if sejak is None or segmen[nama]['akhir'] > sejak]
+
+    def _baca_segmen(self, nama):
+        path = self.path_segmen(nama)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r') as f:
+            teks = f.read()
+        try:
+            # Satu record per baris dan tidak ada newline di dalam record: dibaca sebagai satu array
+            return json.loads("[" + teks.rstrip("\n").replace("\n", ",") + "]")
+        except json.JSONDecodeError:
+            # Ada baris terpotong (proses mati saat append): baris yang utuh tetap dipakai
+            transactions = []
+            for line in teks.splitlines():
+                try:
+                    transactions.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+            return transactions
+
+    def _append_segmen(self, nama, isi):
+        with open(self.path_segmen(nama), 'ab+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                # Baris terakhir yang terpotong ditutup dulu supaya record baru tetap utuh di barisnya
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    isi = "\n" + isi
+            f.write(isi.encode())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _tulis_segmen(self, transactions):
+        """Tulis ulang seluruh jurnal: baris dikelompokkan ke segmennya dalam satu kali jalan
+        (streaming), lalu semua segmen dan manifest diganti bersamaan"""
+        os.makedirs(self.jurnal_umum_folder, exist_ok=True)
+        generasi = self._load_json(self.manifest_file, {}).get('generasi', 0)
+        segmen = {}
+        with batch_tulis():
+            with tulis_atomik_banyak() as buka:
+                for trans in transactions:
+                    nama = self.nama_segmen(urutan_tanggal(trans))
+                    if nama not in segmen:
+                        awal, akhir = self.rentang_segmen(nama)
+                        segmen[nama] = {'awal': awal, 'akhir': akhir}
+                    buka(self.path_segmen(nama)).write(json.dumps(trans, default=dict) + "\n")
+            self._simpan_manifest(generasi + 1, segmen)
+
+    def _bersihkan_segmen(self):
+        """Hapus segmen yang tidak tercatat di manifest dan jurnal format lama yang sudah dipindah"""
+        segmen = self._load_json(self.manifest_file, {}).get('segmen', {})
+        for nama_berkas in os.listdir(self.jurnal_umum_folder):
+            nama, ekstensi = os.path.splitext(nama_berkas)
+            if ekstensi == '.jsonl' and nama not in segmen:
+                os.remove(os.path.join(self.jurnal_umum_folder, nama_berkas))
+        for path in (self.jurnal_umum_file, self.jurnal_umum_log_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _siapkan_segmen(self, tahun=None):
+        """Pindahkan jurnal format lama (snapshot + log) ke segmen per periode, sekali saja"""
+        if os.path.exists(self.manifest_file):
+            return
+        with self.kunci_jurnal():
+            if os.path.exists(self.manifest_file):
+                return
+            self._tulis_segmen(normalisasi_baris(trans, tahun) for trans in self._load_jurnal_lama())
+            self._bersihkan_segmen()
+
+    def get_basis_snapshot(self):
+        """Identitas snapshot jurnal format lama (ukuran & mtime) yang menjadi dasar log"""
+        if not os.path.exists(self.jurnal_umum_file):
+            return {'ukuran': 0, 'mtime_ns': 0}
+        info = os.stat(self.jurnal_umum_file)
+        return {'ukuran': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+    def baca_basis_log(self):
+        """Baca record basis di baris pertama log jurnal"""
+        try:
+            with open(self.jurnal_umum_log_file, 'r') as f:
+                record = json.loads(f.readline())
+            return {'ukuran': record.get('ukuran'), 'mtime_ns': record.get('mtime_ns')}
+        except Exception:
+            return None
+
+    def baca_log(self):
+        """Generator record log jurnal yang masih berlaku untuk snapshot sekarang"""
+        if not os.path.exists(self.jurnal_umum_log_file):
+            return
+        if self.baca_basis_log() != self.get_basis_snapshot():
+            return
+        
+        with open(self.jurnal_umum_log_file, 'r') as f:
+            f.readline()  # lewati record basis
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Baris terakhir bisa terpotong kalau proses mati saat menulis
+                    break
+
+    def _load_jurnal_lama(self):
+        transactions = self._load_json(self.jurnal_umum_file, [])
+        for record in self.baca_log():
+            if record['op'] == 'tambah':
+                transactions.append(record['baris'])
+            elif record['op'] == 'hapus_tanggal':
+                transactions = [
+                    trans for trans in transactions
+                    if trans['tanggal'] != record['tanggal']
+                ]
+        return transactions
+
+    def load_jurnal(self, sejak=None):
+        """Gabungan segmen urut periode; dengan sejak hanya segmen periode sesudahnya yang dibaca"""
+        transactions = []
+        for nama in self.daftar_segmen(sejak):
+            transactions.extend(self._baca_segmen(nama))
+        return transactions
+
+    def append_jurnal(self, entries):
+        """Append baris ke segmen periodenya lalu fsync; segmen lain tidak dibaca maupun ditulis.
+
+        Return True kalau ada baris yang tidak masuk ke segmen terakhir: urutan di disk
+        (segmen urut periode) bukan lagi jurnal lama + entries.
+        """
+        per_segmen = {}
+        for trans in entries:
+            baris = normalisasi_baris(trans)
+            per_segmen.setdefault(self.nama_segmen(urutan_tanggal(baris)), []).append(
+                json.dumps(baris, default=dict) + "\n"
+            )
+        if not per_segmen:
+            return False
+        
+        with self.kunci_jurnal():
+            manifest = self.baca_manifest()
+            baru = [nama for nama in per_segmen if nama not in manifest['segmen']]
+            if baru:
+                segmen = dict(manifest['segmen'])
+                for nama in baru:
+                    # Sisa segmen yang tidak tercatat di manifest (restore terputus) tidak ikut disambung
+                    if os.path.exists(self.path_segmen(nama)):
+                        os.remove(self.path_segmen(nama))
+                    awal, akhir = self.rentang_segmen(nama)
+                    segmen[nama] = {'awal': awal, 'akhir': akhir}
+                self._simpan_manifest(manifest['generasi'], segmen)
+            for nama, isi in per_segmen.items():
+                self._append_segmen(nama, "".join(isi))
+            return set(per_segmen) != {self.daftar_segmen()[-1]}
+
+    def hapus_jurnal_tanggal(self, tanggal):
+        """Tulis ulang hanya segmen periode tanggal itu, tanpa baris bertanggal tersebut"""
+        ordinal = tanggal_ke_ordinal(tanggal)
+        with self.kunci_jurnal():
+            manifest = self.baca_manifest()
+            # Tanggal yang tidak terbaca tanpa tahun bisa tersimpan di segmen mana pun
+            daftar = [self.nama_segmen(ordinal)] if ordinal else self.daftar_segmen()
+            with batch_tulis():
+                diubah = False
+                for nama in daftar:
+                    if nama not in manifest['segmen']:
+                        continue
+                    transactions = self._baca_segmen(nama)
+                    sisa = [trans for trans in transactions if trans['tanggal'] != tanggal]
+                    if len(sisa) != len(transactions):
+                        tulis_atomik(self.path_segmen(nama),
+                                     lambda f, sisa=sisa: f.writelines(json.dumps(trans) + "\n" for trans in sisa))
+                        diubah = True
+                if diubah:
+                    self._simpan_manifest(manifest['generasi'] + 1, manifest['segmen'])
+        return False
+
+    def save_jurnal(self, transactions):
+        """Tulis ulang seluruh jurnal (semua segmen) sekaligus"""
+        with self.kunci_jurnal():
+            self._tulis_segmen(normalisasi_baris(trans) for trans in transactions)
+            self._bersihkan_segmen()
+
+    def versi_jurnal(self, sejak=None):
+        ukuran = []
+        for nama in self.daftar_segmen(sejak):
+            try:
+                ukuran.append([nama, os.path.getsize(self.path_segmen(nama))])
+            except OSError:
+                ukuran.append([nama, 0])
+        return {'backend': 'json', 'generasi': self.baca_manifest()['generasi'], 'sejak': sejak, 'segmen': ukuran}
+
+    def kunci_jurnal(self):
+        return kunci_berkas(self.jurnal_umum_file)
+
+    def hanya_tambah_sejak(self, versi_lama):
+        """True kalau sejak versi_lama hanya ada append ke segmen terakhir atau segmen baru sesudahnya"""
+        if not versi_lama or versi_lama.get('backend') != 'json' or 'generasi' not in versi_lama:
+            return False
+        versi = self.versi_jurnal(versi_lama['sejak'])
+        lama, baru = versi_lama['segmen'], versi['segmen']
+        if versi['generasi'] != versi_lama['generasi'] or len(baru) < len(lama):
+            return False
+        if not lama:
+            return True
+        terakhir = baru[len(lama) - 1]
+        return lama[:-1] == baru[:len(lama) - 1] and lama[-1][0] == terakhir[0] and lama[-1][1] <= terakhir[1]
+
+    # ----- Data lain -----
+
+    def load_penyesuaian(self):
+        return self._load_json(self.penyesuaian_file, [])
+
+    def save_penyesuaian(self, penyesuaian):
+        self._save_json(self.penyesuaian_file, penyesuaian)
+
+    def perbarui_penyesuaian(self, ubah):
+        return perbarui_json(self.penyesuaian_file, ubah, list)
+
+    def versi_penyesuaian(self):
+        return {'backend': 'json', 'berkas': tanda_berkas([self.penyesuaian_file])}
+
+    def load_jurnal_penutup(self):
+        return self._load_json(self.jurnal_penutup_file, [])
+
+    def save_jurnal_penutup(self, entries):
+        self._save_json(self.jurnal_penutup_file, [normalisasi_baris(trans) for trans in entries])
+
+    def load_transaksi(self):
+        return self._load_json(self.transactions_file, [])
+
+    def save_transaksi(self, transactions):
+        self._save_json(self.transactions_file, [normalisasi_baris(trans) for trans in transactions])
+
+    def berkas_data(self, jenis):
+        return [self.transactions_file if jenis == 'transaksi' else self.accounts_file]
+
+    def migrasi_normalisasi(self, tahun=None):
+        diubah = 0
+        # Segmen Jurnal Umum selalu ditulis sudah dinormalisasi; cukup jurnal format lama yang dipindah
+        self._siapkan_segmen(tahun)
+        data = [
+            (self.load_jurnal_penutup(), self.save_jurnal_penutup),
+            (self.load_transaksi(), self.save_transaksi),
+            (self.load_penyesuaian(), self.save_penyesuaian)
+        ]
+        for baris, simpan in data:
+            lama = [b for b in baris if normalisasi_baris(dict(b), tahun) != b]
+            if lama:
+                for b in lama:
+                    normalisasi_baris(b, tahun)
+                simpan(baris)
+                diubah += len(lama)
+        return diubah
+
+    def accounts_exist(self):
+        return os.path.exists(self.accounts_file)
+
+    def load_accounts(self):
+        return self._load_json(self.accounts_file, {})
+
+    def save_accounts(self, accounts):
+        self._save_json(self.accounts_file, accounts)
+
+    def perbarui_accounts(self, ubah):
+        return perbarui_json(self.accounts_file, ubah, dict)
+
+    @contextmanager
+    def pemulihan(self):
+        def ganti(jenis, records):
+            if jenis == 'accounts':
+                accounts, = records
+                simpan_json_atomik(self.accounts_file, accounts)
+            elif jenis == 'penyesuaian':
+                tulis_atomik(self.penyesuaian_file, lambda f: tulis_array_json(f, records))
+            else:
+                self._tulis_segmen(normalisasi_baris(trans) for trans in records)
+
+        # File temp di folder tujuan = staging; semuanya di-replace di akhir batch
+        with self.kunci_jurnal():
+            with batch_tulis():
+                yield ganti
+            self._bersihkan_segmen()
+
+
+class SqliteStorage(StorageBackend):
+    """Backend SQLite embedded dengan tabel ber-index per akun, tanggal dan entri"""
+
+    mendukung_query = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jurnal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            buku TEXT NOT NULL,
+            entri INTEGER NOT NULL,
+            tanggal TEXT NOT NULL,
+            tanggal_urut INTEGER NOT NULL,
+            akun TEXT NOT NULL,
+            debit NUMERIC NOT NULL DEFAULT 0,
+            kredit NUMERIC NOT NULL DEFAULT 0,
+            keterangan TEXT NOT NULL DEFAULT '',
+            ref TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS idx_jurnal_akun ON jurnal (buku, akun, tanggal_urut, id);
+        CREATE INDEX IF NOT EXISTS idx_jurnal_tanggal ON jurnal (buku, tanggal);
+        CREATE INDEX IF NOT EXISTS idx_jurnal_entri ON jurnal (buku, entri);
+        CREATE INDEX IF NOT EXISTS idx_jurnal_urut ON jurnal (buku, tanggal_urut);
+
+        CREATE TABLE IF NOT EXISTS penyesuaian (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tanggal TEXT NOT NULL,
+            jenis TEXT NOT NULL DEFAULT '',
+            akun_debit TEXT NOT NULL,
+            akun_kredit TEXT NOT NULL,
+            debit NUMERIC NOT NULL DEFAULT 0,
+            kredit NUMERIC NOT NULL DEFAULT 0,
+            perhitungan TEXT,
+            tanggal_urut INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_penyesuaian_debit ON penyesuaian (akun_debit);
+        CREATE INDEX IF NOT EXISTS idx_penyesuaian_kredit ON penyesuaian (akun_kredit);
+
+        CREATE TABLE IF NOT EXISTS akun (
+            nama TEXT PRIMARY KEY,
+            tipe TEXT NOT NULL,
+            saldo NUMERIC NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS meta (
+            kunci TEXT PRIMARY KEY,
+            nilai INTEGER NOT NULL
+        );
+    """
+
+    # Nama buku di tabel jurnal
+    BUKU_UMUM = "umum"
+    BUKU_PENUTUP = "penutup"
+    BUKU_TRANSAKSI = "transaksi"
+
+    def __init__(self, db_file="sientok.db"):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        # Koneksi dipakai bersama thread session; semua baca dan tulis diserialkan di sini
+        self.lock_tulis = threading.RLock()
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+        
+        # Database lama dibuat sebelum penyesuaian punya kolom tanggal_urut
+        kolom = [row['name'] for row in self.conn.execute("PRAGMA table_info(penyesuaian)")]
+        if 'tanggal_urut' not in kolom:
+            with self.conn:
+                self.conn.execute("ALTER TABLE penyesuaian ADD COLUMN tanggal_urut INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _transaksi_tulis(self):
+        """Satu transaksi tulis di koneksi bersama.
+
+        lock_tulis menjaga agar thread session lain tidak ikut commit/rollback transaksi
+        yang sedang terbuka; BEGIN IMMEDIATE langsung memegang write lock SQLite.
+        """
+        with self.lock_tulis, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            yield
+
+    # ----- Jurnal (umum, penutup, transaksi) -----
+
+    def _baca(self, sql, parameter=()):
+        """SELECT di koneksi bersama, diambil utuh di bawah lock_tulis.
+
+        Thread lain tidak boleh memakai koneksi yang sama di tengah-tengah: pembaca bisa melihat
+        DELETE + INSERT transaksi tulis yang belum di-commit, atau sqlite3 menolak pemakaian bersamaan.
+        """
+        with self.lock_tulis:
+            return self.conn.execute(sql, parameter).fetchall()
+
+    @staticmethod
+    def _filter_sejak(sejak):
+        """(potongan WHERE, parameter) untuk baris sesudah periode tertutup (tanggal_urut > sejak).
+
+        Sama dengan segmen JsonStorage: baris tanpa tanggal (tanggal_urut 0) ikut periode tertutup.
+        """
+        if sejak is None:
+            return "", ()
+        return " AND tanggal_urut > ?", (sejak,)
+
+    def _load_buku(self, buku, sejak=None):
+        filter_sejak, parameter = self._filter_sejak(sejak)
+        rows = self._baca(
+            "SELECT tanggal, tanggal_urut, akun, debit, kredit, keterangan, ref FROM jurnal "
+            f"WHERE buku = ?{filter_sejak} ORDER BY id",
+            (buku,) + parameter
+        )
+        return [dict(row) for row in rows]
+
+    def _insert_buku(self, buku, entries, nomor_entri):
+        self.conn.executemany(
+            "INSERT INTO jurnal (buku, entri, tanggal, tanggal_urut, akun, debit, kredit, keterangan, ref) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (buku, entri, trans['tanggal'], normalisasi_baris(trans)['tanggal_urut'], trans['akun'],
+                 trans.get('debit', 0), trans.get('kredit', 0),
+                 trans.get('keterangan', ''), trans.get('ref', ''))
+                for trans, entri in zip(entries, nomor_entri)
+            )
+        )
+
+    def _save_buku(self, buku, entries):
+        with self._transaksi_tulis():
+            self.conn.execute("DELETE FROM jurnal WHERE buku = ?", (buku,))
+            self._insert_buku(buku, entries, kelompokkan_entri(entries))
+            if buku == self.BUKU_UMUM:
+                self._naikkan_versi()
+
+    def _naikkan_versi(self, kunci='versi_jurnal'):
+        self.conn.execute(
+            "INSERT INTO meta (kunci, nilai) VALUES (?, 1) "
+            "ON CONFLICT (kunci) DO UPDATE SET nilai = nilai + 1",
+            (kunci,)
+        )
+
+    def versi_jurnal(self, sejak=None):
+        rows = self._baca("SELECT nilai FROM meta WHERE kunci = 'versi_jurnal'")
+        # sejak ikut di versi: menutup / membuka periode mengganti isi yang dimuat
+        return {'backend': 'sqlite', 'versi': rows[0][0] if rows else 0, 'sejak': sejak}
+
+    def kunci_jurnal(self):
+        return kunci_berkas(self.db_file)
+
+    def load_jurnal(self, sejak=None):
+        """Baris Jurnal Umum urut posting; dengan sejak hanya baris periode sesudahnya"""
+        return self._load_buku(self.BUKU_UMUM, sejak)
+
+    def append_jurnal(self, entries):
+        with self._transaksi_tulis():
+            row, = self._baca("SELECT COALESCE(MAX(entri), 0) FROM jurnal WHERE buku = ?", (self.BUKU_UMUM,))
+            # Satu kali posting = satu entri; import massal mendapat satu entri per mutasi yang seimbang
+            self._insert_buku(self.BUKU_UMUM, entries, [row[0] + nomor for nomor in kelompokkan_entri(entries)])
+            self._naikkan_versi()
+        return False
+
+    def hapus_jurnal_tanggal(self, tanggal):
+        with self._transaksi_tulis():
+            self.conn.execute("DELETE FROM jurnal WHERE buku = ? AND tanggal = ?", (self.BUKU_UMUM, tanggal))
+            self._naikkan_versi()
+        return False
+
+    def save_jurnal(self, transactions):
+        self._save_buku(self.BUKU_UMUM, transactions)
+
+    def load_jurnal_penutup(self):
+        return self._load_buku(self.BUKU_PENUTUP)
+
+    def save_jurnal_penutup(self, entries):
+        self._save_buku(self.BUKU_PENUTUP, entries)
+
+    def load_transaksi(self):
+        return self._load_buku(self.BUKU_TRANSAKSI)
+
+    def save_transaksi(self, transactions):
+        self._save_buku(self.BUKU_TRANSAKSI, transactions)
+
+    # ----- Penyesuaian -----
+
+    def load_penyesuaian(self):
+        rows = self._baca(
+            "SELECT tanggal, tanggal_urut, jenis, akun_debit, akun_kredit, debit, kredit, perhitungan "
+            "FROM penyesuaian ORDER BY id"
+        )
+        penyesuaian = []
+        for row in rows:
+            pen = dict(row)
+            if pen['perhitungan'] is None:
+                del pen['perhitungan']
+            penyesuaian.append(pen)
+        return penyesuaian
+
+    def _replace_penyesuaian(self, penyesuaian):
+        self.conn.execute("DELETE FROM penyesuaian")
+        self._naikkan_versi('versi_penyesuaian')
+        self.conn.executemany(
+            "INSERT INTO penyesuaian (tanggal, tanggal_urut, jenis, akun_debit, akun_kredit, debit, kredit, perhitungan) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (pen['tanggal'], normalisasi_baris(pen)['tanggal_urut'], pen.get('jenis', ''),
+                 pen['akun_debit'], pen['akun_kredit'], pen['debit'], pen['kredit'], pen.get('perhitungan'))
+                for pen in penyesuaian
+            )
+        )
+
+    def save_penyesuaian(self, penyesuaian):
+        with self._transaksi_tulis():
+            self._replace_penyesuaian(penyesuaian)
+
+    def _perbarui(self, muat, ganti, ubah):
+        # Baca dan tulis dalam satu transaksi yang sudah memegang write lock
+        with self._transaksi_tulis():
+            data = muat()
+            ubah(data)
+            ganti(data)
+        return data
+
+    def perbarui_penyesuaian(self, ubah):
+        return self._perbarui(self.load_penyesuaian, self._replace_penyesuaian, ubah)
+
+    def versi_penyesuaian(self):
+        rows = self._baca("SELECT nilai FROM meta WHERE kunci = 'versi_penyesuaian'")
+        return {'backend': 'sqlite', 'versi': rows[0][0] if rows else 0}
+
+    # ----- Akun -----
+
+    def berkas_data(self, jenis):
+        # Dalam mode WAL perubahan baru tercatat di file -wal sampai checkpoint
+        return [self.db_file, self.db_file + "-wal"]
+
+    def migrasi_normalisasi(self, tahun=None):
+        # Baris jurnal selalu ditulis dengan tanggal_urut; yang perlu dilengkapi hanya
+        # penyesuaian dari database lama (kolom baru bernilai default 0)
+        rows = self._baca("SELECT id, tanggal FROM penyesuaian WHERE tanggal_urut = 0")
+        perubahan = [(tanggal_ke_ordinal(row['tanggal'], tahun), row['id']) for row in rows]
+        perubahan = [(urut, id_) for urut, id_ in perubahan if urut]
+        if perubahan:
+            with self._transaksi_tulis():
+                self.conn.executemany("UPDATE penyesuaian SET tanggal_urut = ? WHERE id = ?", perubahan)
+                self._naikkan_versi('versi_penyesuaian')
+        return len(perubahan)
+
+    def accounts_exist(self):
+        return bool(self._baca("SELECT 1 FROM akun LIMIT 1"))
+
+    def load_accounts(self):
+        rows = self._baca("SELECT nama, tipe, saldo FROM akun ORDER BY rowid")
+        return {row['nama']: {'type': row['tipe'], 'balance': row['saldo']} for row in rows}
+
+    def _replace_accounts(self, accounts):
+        self.conn.execute("DELETE FROM akun")
+        self.conn.executemany(
+            "INSERT INTO akun (nama, tipe, saldo) VALUES (?, ?, ?)",
+            [(nama, info['type'], info.get('balance', 0)) for nama, info in accounts.items()]
+        )
+
+    def save_accounts(self, accounts):
+        with self._transaksi_tulis():
+            self._replace_accounts(accounts)
+
+    def perbarui_accounts(self, ubah):
+        return self._perbarui(self.load_accounts, self._replace_accounts, ubah)
+
+    @contextmanager
+    def pemulihan(self):
+        def ganti(jenis, records):
+            if jenis == 'accounts':
+                accounts, = records
+                self._replace_accounts(accounts)
+            elif jenis == 'penyesuaian':
+                self._replace_penyesuaian(records)
+            else:
+                # executemany menarik baris satu per satu; tee hanya menahan satu baris untuk nomor entri
+                baris, salinan = tee(records)
+                self.conn.execute("DELETE FROM jurnal WHERE buku = ?", (self.BUKU_UMUM,))
+                self._insert_buku(self.BUKU_UMUM, baris, nomor_entri(salinan))
+                self._naikkan_versi()
+
+        # Semua perubahan di satu transaksi: commit setelah file lain di batch diganti, rollback kalau gagal
+        with self._transaksi_tulis(), batch_tulis():
+            yield ganti
+
+    # ----- Query agregat (pakai index idx_jurnal_akun) -----
+
+    # Penjumlahan dilakukan per baris dalam integer sen supaya eksak
+    SEN_DEBIT = "CAST(ROUND(debit * 100) AS INTEGER)"
+    SEN_KREDIT = "CAST(ROUND(kredit * 100) AS INTEGER)"
+
+    def saldo_mentah_per_akun(self, sejak=None):
+        """Saldo mentah (total debit - total kredit) per akun di Jurnal Umum, dalam sen"""
+        filter_sejak, parameter = self._filter_sejak(sejak)
+        rows = self._baca(
+            f"SELECT akun, SUM({self.SEN_DEBIT}) - SUM({self.SEN_KREDIT}) AS saldo "
+            f"FROM jurnal WHERE buku = ?{filter_sejak} GROUP BY akun",
+            (self.BUKU_UMUM,) + parameter
+        )
+        return {row['akun']: row['saldo'] for row in rows}
+
+    def total_jurnal(self, sejak=None):
+        """(total debit, total kredit, jumlah baris) Jurnal Umum, nominal dalam sen"""
+        filter_sejak, parameter = self._filter_sejak(sejak)
+        row, = self._baca(
+            f"SELECT COALESCE(SUM({self.SEN_DEBIT}), 0), COALESCE(SUM({self.SEN_KREDIT}), 0), COUNT(*) "
+            f"FROM jurnal WHERE buku = ?{filter_sejak}",
+            (self.BUKU_UMUM,) + parameter
+        )
+        return row[0], row[1], row[2]
+
+    def ringkasan_per_akun(self, sejak=None):
+        """Saldo mentah (sen) dan jumlah baris per akun, urut nama akun"""
+        filter_sejak, parameter = self._filter_sejak(sejak)
+        rows = self._baca(
+            f"SELECT akun, SUM({self.SEN_DEBIT}) - SUM({self.SEN_KREDIT}) AS saldo, COUNT(*) AS jumlah "
+            f"FROM jurnal WHERE buku = ?{filter_sejak} GROUP BY akun ORDER BY akun",
+            (self.BUKU_UMUM,) + parameter
+        )
+        return [(row['akun'], row['saldo'], row['jumlah']) for row in rows]
+
+    def transaksi_akun(self, akun, sejak=None):
+        """Baris Jurnal Umum untuk satu akun, urut tanggal (dari terlama)"""
+        filter_sejak, parameter = self._filter_sejak(sejak)
+        rows = self._baca(
+            "SELECT tanggal, tanggal_urut, akun, debit, kredit, keterangan, ref FROM jurnal "
+            f"WHERE buku = ? AND akun = ?{filter_sejak} ORDER BY tanggal_urut, id",
+            (self.BUKU_UMUM, akun) + parameter
+        )
+        return [dict(row) for row in rows]
+
+    def import_dari(self, sumber):
+        """Migrasi sekali jalan: salin semua data dari backend lain (mis. JsonStorage)"""
+        jurnal = sumber.load_jurnal()
+        penutup = sumber.load_jurnal_penutup()
+        transaksi = sumber.load_transaksi()
+        penyesuaian = sumber.load_penyesuaian()
+        accounts = sumber.load_accounts()
+        
+        # Satu transaksi SQLite: kalau gagal di tengah, database tetap seperti semula
+        with self._transaksi_tulis():
+            self.conn.execute("DELETE FROM jurnal")
+            self._insert_buku(self.BUKU_UMUM, jurnal, kelompokkan_entri(jurnal))
+            self._insert_buku(self.BUKU_PENUTUP, penutup, kelompokkan_entri(penutup))
+            self._insert_buku(self.BUKU_TRANSAKSI, transaksi, kelompokkan_entri(transaksi))
+            self._replace_penyesuaian(penyesuaian)
+            self._replace_accounts(accounts)
+            self._naikkan_versi()
+        
+        return {
+            'jurnal_umum': len(jurnal),
+            'jurnal_penutup': len(penutup),
+            'transaksi': len(transaksi),
+            'penyesuaian': len(penyesuaian),
+            'akun': len(accounts)
+        }
+
+
+class JurnalKolom:
+    """Jurnal dalam bentuk kolom: id akun int32, tanggal int32, debit/kredit int64 (sen).
+
+    Neraca saldo, saldo per tanggal dan total dihitung dengan np.add.at tanpa loop
+    Python per baris. Baris baru masuk ke buffer yang kapasitasnya digandakan, jadi
+    menambah baris tetap O(1) amortized.
+    """
+
+    KOLOM = ('akun', 'tanggal', 'debit', 'kredit')
+
+    def __init__(self, kapasitas=1024):
+        self.nama_akun = []
+        self.id_akun = {}
+        self.jumlah = 0
+        self.akun = np.zeros(kapasitas, dtype=np.int32)
+        self.tanggal = np.zeros(kapasitas, dtype=np.int32)
+        self.debit = np.zeros(kapasitas, dtype=np.int64)
+        self.kredit = np.zeros(kapasitas, dtype=np.int64)
+
+    @classmethod
+    def dari_transaksi(cls, transactions):
+        kolom = cls(max(len(transactions), 1))
+        kolom.tambah_banyak(transactions)
+        return kolom
+
+    def _id(self, akun):
+        id_ = self.id_akun.get(akun)
+        if id_ is None:
+            id_ = self.id_akun[akun] = len(self.nama_akun)
+            self.nama_akun.append(akun)
+        return id_
+
+    def _pastikan_kapasitas(self, tambahan):
+        perlu = self.jumlah + tambahan
+        if perlu <= len(self.akun):
+            return
+        kapasitas = max(perlu, 2 * len(self.akun))
+        for nama in self.KOLOM:
+            lama = getattr(self, nama)
+            baru = np.zeros(kapasitas, dtype=lama.dtype)
+            baru[:self.jumlah] = lama[:self.jumlah]
+            setattr(self, nama, baru)
+
+    def tambah_banyak(self, transactions):
+        n = len(transactions)
+        self._pastikan_kapasitas(n)
+        awal, akhir = self.jumlah, self.jumlah + n
+        
+        # Setiap kolom diisi satu kali jalan lewat map/itemgetter (loop di C, bukan di Python)
+        nama_akun = list(map(itemgetter('akun'), transactions))
+        for akun in dict.fromkeys(nama_akun):
+            self._id(akun)
+        self.akun[awal:akhir] = np.fromiter(map(self.id_akun.__getitem__, nama_akun), np.int32, n)
+        self.tanggal[awal:akhir] = np.fromiter(map(urutan_tanggal, transactions), np.int32, n)
+        # Konversi ke sen sekaligus per kolom (sama dengan ke_sen per baris)
+        self.debit[awal:akhir] = np.rint(np.fromiter(map(itemgetter('debit'), transactions), np.float64, n) * 100)
+        self.kredit[awal:akhir] = np.rint(np.fromiter(map(itemgetter('kredit'), transactions), np.float64, n) * 100)
+        self.jumlah = akhir
+
+    def saldo_mentah(self, sampai=None):
+        """Saldo mentah (debit - kredit, sen) per id akun; sampai = ordinal untuk saldo per tanggal"""
+        n = self.jumlah
+        akun = self.akun[:n]
+        selisih = self.debit[:n] - self.kredit[:n]
+        if sampai is not None:
+            pilih = self.tanggal[:n] <= sampai
+            akun, selisih = akun[pilih], selisih[pilih]
+        # Dijumlah langsung di int64 (bincount dengan weights memakai float64, tidak eksak
+        # di atas 2**53 sen), jadi hasilnya sama dengan SUM integer sen di SqliteStorage
+        saldo = np.zeros(len(self.nama_akun), dtype=np.int64)
+        np.add.at(saldo, akun, selisih)
+        return saldo
+
+    def saldo_per_akun(self, sampai=None):
+        """{akun: saldo mentah dalam sen} untuk semua akun yang pernah muncul"""
+        saldo = self.saldo_mentah(sampai)
+        return {nama: int(saldo[i]) for i, nama in enumerate(self.nama_akun)}
+
+    def total(self):
+        """(total debit, total kredit) dalam sen"""
+        return int(self.debit[:self.jumlah].sum()), int(self.kredit[:self.jumlah].sum())
+
+
+class SaldoAkunCache:
+    """Materialized view saldo mentah (total debit - total kredit) per akun Jurnal Umum.
+
+    Di-update O(1) per baris yang diposting/dihapus dan disimpan ke file bersama
+    versi jurnal, supaya cold start tidak perlu menghitung ulang seluruh riwayat.
+    Total debit dan total kredit seluruh jurnal ikut dipelihara untuk baris TOTAL.
+    Semua nilai disimpan dalam integer sen (lihat ke_sen / dari_sen).
+    """
+
+    def __init__(self, cache_file="jurnal_umum_saldo.json"):
+        self.cache_file = cache_file
+        self.saldo = {}
+        self.total_debit = 0
+        self.total_kredit = 0
+        self.jumlah_baris = 0
+        self.versi = None
+
+    @staticmethod
+    def hitung_dari_awal(transactions):
+        """(saldo per akun, total debit, total kredit) dihitung ulang lewat JurnalKolom"""
+        kolom = JurnalKolom.dari_transaksi(transactions)
+        total_debit, total_kredit = kolom.total()
+        return kolom.saldo_per_akun(), total_debit, total_kredit
+
+    def tambah(self, trans):
+        akun = trans['akun']
+        debit, kredit = ke_sen(trans['debit']), ke_sen(trans['kredit'])
+        self.saldo[akun] = self.saldo.get(akun, 0) + debit - kredit
+        self.total_debit += debit
+        self.total_kredit += kredit
+        self.jumlah_baris += 1
+
+    def kurangi(self, trans):
+        akun = trans['akun']
+        debit, kredit = ke_sen(trans['debit']), ke_sen(trans['kredit'])
+        self.saldo[akun] = self.saldo.get(akun, 0) - debit + kredit
+        self.total_debit -= debit
+        self.total_kredit -= kredit
+        self.jumlah_baris -= 1
+
+    def bangun_ulang(self, transactions, awal=None):
+        """Hitung ulang saldo; dengan awal (snapshot periode tertutup) hanya baris sesudah periode itu yang dijumlah"""
+        if awal is None:
+            self.saldo, self.total_debit, self.total_kredit = self.hitung_dari_awal(transactions)
+            self.jumlah_baris = len(transactions)
+            return
+        baris = [trans for trans in transactions if urutan_tanggal(trans) > awal['akhir']]
+        saldo, total_debit, total_kredit = self.hitung_dari_awal(baris)
+        self.saldo = dict(awal['saldo'])
+        for akun, nilai in saldo.items():
+            self.saldo[akun] = self.saldo.get(akun, 0) + nilai
+        self.total_debit = awal['total_debit'] + total_debit
+        self.total_kredit = awal['total_kredit'] + total_kredit
+        self.jumlah_baris = awal['jumlah_baris'] + len(baris)
+
+    def verifikasi(self, transactions):
+        """Hitung ulang dari nol dan kembalikan akun yang selisih: {akun: (cache, seharusnya)} dalam rupiah"""
+        seharusnya, total_debit, total_kredit = self.hitung_dari_awal(transactions)
+        drift = {}
+        for akun in set(self.saldo) | set(seharusnya):
+            nilai_cache = self.saldo.get(akun, 0)
+            nilai_benar = seharusnya.get(akun, 0)
+            if nilai_cache != nilai_benar:
+                drift[akun] = (dari_sen(nilai_cache), dari_sen(nilai_benar))
+        if self.total_debit != total_debit:
+            drift['(total debit)'] = (dari_sen(self.total_debit), dari_sen(total_debit))
+        if self.total_kredit != total_kredit:
+            drift['(total kredit)'] = (dari_sen(self.total_kredit), dari_sen(total_kredit))
+        if self.jumlah_baris != len(transactions):
+            drift['(jumlah baris)'] = (self.jumlah_baris, len(transactions))
+        return drift
+
+    def muat(self, versi):
+        """Muat cache dari file; hanya berhasil kalau versinya sama dengan versi jurnal sekarang"""
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('versi') != versi or data.get('satuan') != 'sen':
+            return False
+        self.saldo = data['saldo']
+        self.total_debit = data['total_debit']
+        self.total_kredit = data['total_kredit']
+        self.jumlah_baris = data['jumlah_baris']
+        self.versi = versi
+        return True
+
+    def simpan(self, versi):
+        self.versi = versi
+        # Turunan yang bisa dihitung ulang: atomic, tapi tanpa fsync
+        simpan_json_atomik(self.cache_file, {
+            'versi': versi, 'satuan': 'sen', 'jumlah_baris': self.jumlah_baris,
+            'total_debit': self.total_debit, 'total_kredit': self.total_kredit,
+            'saldo': self.saldo
+        }, fsync=False)
+
+
+class IndeksAkun:
+    """Index posting per akun: akun -> daftar offset baris di Jurnal Umum (urut posting).
+
+    Posting baru cukup menambah offset di akhir daftar akunnya. File index tidak
+    ditulis ulang setiap posting; saat cold start index disambung dari baris yang
+    ditambahkan setelah versi terakhir yang tersimpan.
+    """
+
+    def __init__(self, indeks_file="jurnal_umum_indeks.json"):
+        self.indeks_file = indeks_file
+        self.offset = {}
+        self.jumlah_baris = 0
+        self.versi = None
+
+    def tambah(self, trans):
+        self.offset.setdefault(trans['akun'], []).append(self.jumlah_baris)
+        self.jumlah_baris += 1
+
+    def bangun_ulang(self, transactions):
+        self.offset = {}
+        self.jumlah_baris = 0
+        for trans in transactions:
+            self.tambah(trans)
+
+    def daftar_akun(self):
+        return sorted(akun for akun, offsets in self.offset.items() if offsets)
+
+    def baris_akun(self, transactions, akun):
+        """Baris jurnal milik satu akun, O(jumlah baris akun tersebut)"""
+        return [transactions[i] for i in self.offset.get(akun, [])]
+
+    def muat(self):
+        try:
+            with open(self.indeks_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.offset = data['offset']
+        self.jumlah_baris = data['jumlah_baris']
+        self.versi = data['versi']
+        return True
+
+    def simpan(self, versi):
+        self.versi = versi
+        simpan_json_atomik(self.indeks_file, {
+            'versi': versi, 'jumlah_baris': self.jumlah_baris, 'offset': self.offset
+        }, indent=None, fsync=False)
+
+
+class SaldoBerjalan:
+    """Saldo berjalan (prefix sum) satu akun, urut tanggal.
+
+    saldo[i] adalah saldo mentah (debit - kredit, integer sen) setelah baris ke-i dan
+    tanggal[i] ordinal tanggalnya, jadi "saldo per tanggal X" cukup satu bisect dan
+    satu halaman Buku Besar cukup satu slice. Nilai yang dikembalikan dalam rupiah.
+    saldo_awal (sen) adalah saldo akun dari snapshot periode tertutup terakhir.
+    """
+
+    def __init__(self, transaksi_akun, saldo_awal=0):
+        self.saldo_awal = saldo_awal
+        self.baris = []
+        self.tanggal = array('l')
+        self.saldo = array('q')
+        # sorted() stabil: baris bertanggal sama tetap urut posting
+        for trans in sorted(transaksi_akun, key=urutan_tanggal):
+            self.tambah(trans)
+
+    def __len__(self):
+        return len(self.baris)
+
+    def tambah(self, trans):
+        """Tambah satu baris; O(1) kalau tanggalnya tidak mundur dari baris terakhir"""
+        ordinal = urutan_tanggal(trans)
+        mutasi = ke_sen(trans['debit']) - ke_sen(trans['kredit'])
+        if not self.tanggal or ordinal >= self.tanggal[-1]:
+            self.baris.append(trans)
+            self.tanggal.append(ordinal)
+            self.saldo.append((self.saldo[-1] if self.saldo else self.saldo_awal) + mutasi)
+            return
+        
+        # Posting bertanggal mundur: sisipkan, lalu geser prefix sum sesudahnya
+        i = bisect_right(self.tanggal, ordinal)
+        self.baris.insert(i, trans)
+        self.tanggal.insert(i, ordinal)
+        self.saldo.insert(i, (self.saldo[i - 1] if i else self.saldo_awal) + mutasi)
+        for j in range(i + 1, len(self.saldo)):
+            self.saldo[j] += mutasi
+
+    @property
+    def saldo_akhir(self):
+        return dari_sen(self.saldo[-1] if self.saldo else self.saldo_awal)
+
+    def saldo_per_tanggal(self, ordinal):
+        """Saldo mentah pada akhir tanggal (ordinal) tertentu"""
+        i = bisect_right(self.tanggal, ordinal)
+        return dari_sen(self.saldo[i - 1] if i else self.saldo_awal)
+
+    def jumlah_halaman(self, ukuran):
+        return max(1, -(-len(self.baris) // ukuran))
+
+    def halaman(self, nomor, ukuran):
+        """Baris dan saldo berjalan untuk halaman ke-nomor (mulai 1)"""
+        awal = (nomor - 1) * ukuran
+        return self.baris[awal:awal + ukuran], [dari_sen(sen) for sen in self.saldo[awal:awal + ukuran]]
+
+
+class PeriodeAkuntansi:
+    """Periode bulanan di periods.json ('Jan-2024', ...) dan snapshot saldo periode yang ditutup.
+
+    Periode ditutup berurutan mulai dari yang paling awal. Snapshot menyimpan saldo mentah
+    per akun (sen) kumulatif sampai akhir periode, total debit/kredit dan jumlah baris, jadi
+    saldo awal periode berikutnya tidak perlu menjumlah ulang riwayat. Tutup tahun memindahkan
+    saldo akun nominal (pendapatan, beban, prive) di snapshot ke modal, jadi tahun berikutnya
+    mulai dari nol. Membuka kembali satu periode membuang snapshot periode itu dan semua
+    periode sesudahnya.
+    """
+
+    # Akun modal penampung laba/rugi dan prive saat tutup tahun
+    AKUN_MODAL = "Modal Pemilik"
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.periods = list(data.get('periods', []))
+        self.current_period = data.get('current_period')
+        self.snapshot = dict(data.get('snapshot', {}))
+
+    @staticmethod
+    def rentang(periode):
+        """(ordinal hari pertama, ordinal hari terakhir) periode 'Jan-2024'"""
+        singkatan, tahun = periode.split('-')
+        bulan, tahun = SINGKATAN_BULAN.index(singkatan) + 1, int(tahun)
+        awal = datetime(tahun, bulan, 1).toordinal()
+        return awal, datetime(tahun + bulan // 12, bulan % 12 + 1, 1).toordinal() - 1
+
+    @staticmethod
+    def nama_periode(ordinal):
+        tanggal = datetime.fromordinal(ordinal)
+        return f"{SINGKATAN_BULAN[tanggal.month - 1]}-{tanggal.year}"
+
+    @classmethod
+    def periode_berikut(cls, periode):
+        return cls.nama_periode(cls.rentang(periode)[1] + 1)
+
+    def ke_dict(self):
+        return {'periods': self.periods, 'current_period': self.current_period, 'snapshot': self.snapshot}
+
+    def terakhir_ditutup(self):
+        """Nama periode tertutup yang paling akhir, None kalau belum ada"""
+        if not self.snapshot:
+            return None
+        return max(self.snapshot, key=lambda periode: self.snapshot[periode]['akhir'])
+
+    def snapshot_terakhir(self):
+        periode = self.terakhir_ditutup()
+        return self.snapshot[periode] if periode else None
+
+    def pertama_terbuka(self):
+        """Periode yang berikutnya boleh ditutup"""
+        terakhir = self.terakhir_ditutup()
+        if terakhir:
+            return self.periode_berikut(terakhir)
+        if self.periods:
+            return min(self.periods, key=lambda periode: self.rentang(periode)[0])
+        return self.current_period or self.nama_periode(datetime.now().toordinal())
+
+    def terkunci(self, ordinal):
+        """True kalau tanggal (ordinal) jatuh di periode yang sudah ditutup"""
+        snapshot = self.snapshot_terakhir()
+        return snapshot is not None and ordinal <= snapshot['akhir']
+
+    def snapshot_untuk(self, ordinal):
+        """(periode, snapshot) tertutup paling awal yang mencakup tanggal ordinal, None kalau masih terbuka"""
+        kandidat = [(snapshot['akhir'], periode) for periode, snapshot in self.snapshot.items()
+                    if ordinal <= snapshot['akhir']]
+        if not kandidat:
+            return None
+        periode = min(kandidat)[1]
+        return periode, self.snapshot[periode]
+
+    def tutup(self, periode, baris, tahunan=False, bagan=None):
+        """Tutup periode: snapshot = snapshot periode sebelumnya + baris jurnal periode ini.
+
+        Dengan tahunan, saldo akun nominal (menurut bagan akun) dipindah ke AKUN_MODAL.
+        """
+        if periode != self.pertama_terbuka():
+            raise ValueError(f"Periode ditutup berurutan: tutup {self.pertama_terbuka()} lebih dulu")
+        awal = self.snapshot_terakhir() or {'saldo': {}, 'total_debit': 0, 'total_kredit': 0, 'jumlah_baris': 0}
+        mutasi, total_debit, total_kredit = SaldoAkunCache.hitung_dari_awal(baris)
+        saldo = dict(awal['saldo'])
+        for akun, nilai in mutasi.items():
+            saldo[akun] = saldo.get(akun, 0) + nilai
+        if tahunan:
+            bagan = bagan or BaganAkun()
+            # Saldo mentah bertanda, jadi jumlahnya langsung laba (negatif) / rugi dikurangi prive
+            pindahan = sum(saldo.pop(akun) for akun in [akun for akun in saldo if bagan.nominal(akun)])
+            saldo[self.AKUN_MODAL] = saldo.get(self.AKUN_MODAL, 0) + pindahan
+        self.snapshot[periode] = {
+            'akhir': self.rentang(periode)[1],
+            'saldo': {akun: nilai for akun, nilai in saldo.items() if nilai},
+            'total_debit': awal['total_debit'] + total_debit,
+            'total_kredit': awal['total_kredit'] + total_kredit,
+            'jumlah_baris': awal['jumlah_baris'] + len(baris),
+            'tahunan': tahunan,
+            'waktu': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        berikut = self.periode_berikut(periode)
+        if berikut not in self.periods:
+            self.periods.append(berikut)
+        if self.current_period is None or self.rentang(self.current_period)[0] <= self.snapshot[periode]['akhir']:
+            self.current_period = berikut
+
+    def akhir_tutup_tahun(self):
+        """Ordinal akhir periode tutup tahun terakhir, None kalau belum pernah tutup tahun"""
+        return max((snapshot['akhir'] for snapshot in self.snapshot.values() if snapshot.get('tahunan')), default=None)
+
+    def terapkan_tutup_tahun(self, baris, bagan, kolom_akun=('akun',)):
+        """Baris seperti yang dilihat snapshot: akun nominal pada baris sampai tutup tahun terakhir
+        dibukukan ke AKUN_MODAL (jurnal dihitung ulang dari nol, penyesuaian tahun yang ditutup)"""
+        akhir = self.akhir_tutup_tahun()
+        if akhir is None:
+            return baris
+        hasil = []
+        for b in baris:
+            if urutan_tanggal(b) <= akhir:
+                ganti = {kolom: self.AKUN_MODAL for kolom in kolom_akun if bagan.nominal(b[kolom])}
+                if ganti:
+                    b = dict(b, **ganti)
+            hasil.append(b)
+        return hasil
+
+    def buka(self, periode):
+        """Buka kembali periode; snapshot periode ini dan semua sesudahnya tidak berlaku lagi"""
+        if periode not in self.snapshot:
+            raise ValueError(f"Periode {periode} belum ditutup")
+        akhir = self.snapshot[periode]['akhir']
+        dibuka = sorted((p for p, snapshot in self.snapshot.items() if snapshot['akhir'] >= akhir),
+                        key=lambda p: self.snapshot[p]['akhir'])
+        for p in dibuka:
+            del self.snapshot[p]
+        self.current_period = periode
+        return dibuka
+
+
+class BaganAkun:
+    """Bagan akun: tipe, saldo normal, dan sifat nominal/riil setiap akun.
+
+    Disusun sekali dari accounts.json; nama akun yang belum terdaftar (hanya muncul
+    di jurnal) diklasifikasi dari namanya satu kali lalu disimpan, jadi setiap
+    lookup berikutnya cukup satu akses dict.
+    """
+
+    # tipe -> (saldo normal debit, akun nominal)
+    SIFAT_TIPE = {
+        "Aset": (True, False),
+        "Kontra Aset": (False, False),
+        "Kewajiban": (False, False),
+        "Modal": (False, False),
+        "Prive": (True, True),
+        "Pendapatan": (False, True),
+        "Beban": (True, True),
+        "Ikhtisar": (False, True),
+        "Lainnya": (False, False)
+    }
+
+    # Nama yang menyimpang dari tipenya di accounts.json (mis. Prive bertipe Modal)
+    ATURAN_KHUSUS = [
+        ("akumulasi penyusutan", "Kontra Aset"),
+        ("dibayar di muka", "Aset"), ("bayar di muka", "Aset"),
+        ("diterima di muka", "Kewajiban"),
+        ("ikhtisar", "Ikhtisar"),
+        ("prive", "Prive")
+    ]
+
+    # Klasifikasi dari nama untuk akun yang tidak ada di accounts.json
+    ATURAN_NAMA = [
+        ("beban", "Beban"), ("pembelian", "Beban"), ("harga pokok", "Beban"),
+        ("pendapatan", "Pendapatan"), ("penjualan", "Pendapatan"),
+        ("utang", "Kewajiban"), ("modal", "Modal"),
+        ("kas", "Aset"), ("bank", "Aset"), ("piutang", "Aset"), ("persediaan", "Aset"),
+        ("perlengkapan", "Aset"), ("peralatan", "Aset"), ("gedung", "Aset"),
+        ("tanah", "Aset"), ("kendaraan", "Aset"), ("mesin", "Aset"), ("inventaris", "Aset")
+    ]
+
+    def __init__(self, accounts=None):
+        self.akun = {}
+        for nama, info in (accounts or {}).items():
+            self.akun[nama] = self._klasifikasi(nama, info.get('type'))
+
+    def _klasifikasi(self, nama, tipe=None):
+        nama_kecil = nama.lower()
+        for kata, tipe_khusus in self.ATURAN_KHUSUS:
+            if kata in nama_kecil:
+                tipe = tipe_khusus
+                break
+        else:
+            if tipe not in self.SIFAT_TIPE:
+                tipe = next((t for kata, t in self.ATURAN_NAMA if kata in nama_kecil), "Lainnya")
+        return (tipe,) + self.SIFAT_TIPE[tipe]
+
+    def sifat(self, nama):
+        """(tipe, saldo normal debit, nominal) untuk satu akun"""
+        sifat = self.akun.get(nama)
+        if sifat is None:
+            sifat = self.akun[nama] = self._klasifikasi(nama)
+        return sifat
+
+    def tipe(self, nama):
+        return self.sifat(nama)[0]
+
+    def normal_debit(self, nama):
+        return self.sifat(nama)[1]
+
+    def nominal(self, nama):
+        return self.sifat(nama)[2]
+
+    # Pengelompokan laporan di dalam satu tipe (dari nama akun)
+    KATA_ASET_TETAP = ("peralatan", "gedung", "kendaraan", "tanah", "mesin", "inventaris")
+    KATA_HARGA_POKOK = ("pembelian", "harga pokok", "hpp")
+    NAMA_BEBAN_LAINNYA = ("beban lainnya", "beban")
+
+    def aset_tetap(self, nama):
+        """Aset tidak lancar (peralatan, gedung, ...); aset lain dianggap aset lancar"""
+        return self.tipe(nama) == "Aset" and any(kata in nama.lower() for kata in self.KATA_ASET_TETAP)
+
+    def harga_pokok(self, nama):
+        """Beban yang masuk HPP (pembelian barang dagang) dan bukan beban operasional"""
+        return self.tipe(nama) == "Beban" and any(kata in nama.lower() for kata in self.KATA_HARGA_POKOK)
+
+    def beban_penyusutan(self, nama):
+        """Beban non-kas dari penyusutan aset tetap"""
+        return self.tipe(nama) == "Beban" and "penyusutan" in nama.lower()
+
+    def beban_lainnya(self, nama):
+        return self.tipe(nama) == "Beban" and nama.lower() in self.NAMA_BEBAN_LAINNYA
+
+    def beban_operasional(self, nama):
+        return (self.tipe(nama) == "Beban" and not self.harga_pokok(nama)
+                and not self.beban_penyusutan(nama) and not self.beban_lainnya(nama))
+
+
+def bagan_akun_storage(storage):
+    """BaganAkun bersama semua session, disusun ulang hanya kalau file akun storage berubah"""
+    return muat_bila_berubah(
+        'bagan_akun', storage.berkas_data('akun'),
+        lambda: BaganAkun(storage.load_accounts())
+    )
+
+
+class CacheLaporan:
+    """Cache LRU snapshot laporan, dikunci (versi jurnal, versi penyesuaian, periode).
+
+    Setiap posting atau penyesuaian mengubah versi sehingga kuncinya ikut berubah;
+    snapshot lama tidak pernah terbaca lagi dan tersingkir begitu kapasitas penuh.
+    """
+
+    def __init__(self, kapasitas=8):
+        self.kapasitas = kapasitas
+        self.entri = OrderedDict()
+
+    def ambil(self, kunci):
+        if kunci not in self.entri:
+            return None
+        self.entri.move_to_end(kunci)
+        return self.entri[kunci]
+
+    def simpan(self, kunci, snapshot):
+        self.entri[kunci] = snapshot
+        self.entri.move_to_end(kunci)
+        while len(self.entri) > self.kapasitas:
+            self.entri.popitem(last=False)
+
+
+class JurnalBersama:
+    """Jurnal Umum milik proses, dipakai bersama oleh semua session.
+
+    Isinya dipegang sebagai snapshot immutable (tuple BarisJurnal). Setiap tulis
+    membuat tuple baru (copy-on-write: hanya daftar referensinya yang disalin, objek
+    baris tetap dipakai bersama) dan menaikkan versi, jadi session cukup memegang
+    referensi snapshot dan membandingkan versi untuk tahu kalau datanya sudah basi.
+    Semua tulis ke storage lewat satu lock (thread) dan kunci_jurnal storage (proses):
+    di dalam lock itu ambil() memeriksa versi storage dan memuat ulang kalau proses
+    lain sudah menulis, jadi posting dari worker mana pun tidak saling menimpa.
+    Baris sampai `sejak` (akhir periode tertutup terakhir) tidak perlu dimuat.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.lock = threading.RLock()
+        self.snapshot = ()
+        self.versi = 0
+        # Versi terakhir yang bukan sekadar tambah baris di akhir (muat ulang, hapus, restore)
+        self.versi_ganti = 0
+        self.versi_storage = None
+        self.sejak = None
+
+    def _muat(self):
+        return tuple(BarisJurnal.dari_daftar(self.storage.load_jurnal(self.sejak)))
+
+    def atur_sejak(self, sejak):
+        """Ganti batas muat (akhir periode tertutup terakhir); snapshot dimuat ulang di lock yang sama"""
+        with self.lock:
+            if sejak != self.sejak:
+                self.sejak = sejak
+                self._terbitkan(self._muat(), ganti=True)
+
+    def ambil(self):
+        """(versi, snapshot, versi storage) terbaru; dimuat ulang kalau jurnal di disk diubah proses lain"""
+        with self.lock:
+            versi_storage = self.storage.versi_jurnal(self.sejak)
+            if versi_storage != self.versi_storage:
+                self._terbitkan(self._muat(), ganti=True, versi_storage=versi_storage)
+            return self.versi, self.snapshot, self.versi_storage
+
+    def hanya_tambah_sejak(self, versi_lama):
+        """True kalau snapshot sekarang = snapshot versi_lama + baris baru di akhir"""
+        return versi_lama >= self.versi_ganti
+
+    def tambah(self, entries, periksa=None):
+        """Posting baris baru di akhir jurnal; periksa() dipanggil di dalam lock, exception membatalkan posting"""
+        with self.lock, self.storage.kunci_jurnal():
+            if periksa is not None:
+                periksa()
+            _, snapshot, _ = self.ambil()
+            if self.storage.append_jurnal(entries):
+                # Baris masuk ke segmen periode sebelumnya, bukan di akhir: muat ulang sesuai urutan disk
+                self._terbitkan(self._muat(), ganti=True)
+            else:
+                self._terbitkan(snapshot + tuple(entries))
+
+    def hapus_tanggal(self, tanggal, periksa=None):
+        """Hapus semua baris pada tanggal tertentu; return (versi dasar, hasil ambil() sesudahnya)"""
+        with self.lock, self.storage.kunci_jurnal():
+            if periksa is not None:
+                periksa()
+            versi_dasar, snapshot, _ = self.ambil()
+            snapshot = tuple(trans for trans in snapshot if trans['tanggal'] != tanggal)
+            if self.storage.hapus_jurnal_tanggal(tanggal):
+                snapshot = self._muat()
+            self._terbitkan(snapshot, ganti=True)
+            return versi_dasar, (self.versi, self.snapshot, self.versi_storage)
+
+    def ganti(self, transactions):
+        """Tulis ulang seluruh jurnal (seluruh riwayat, termasuk periode tertutup)"""
+        with self.lock, self.storage.kunci_jurnal():
+            self.storage.save_jurnal(transactions)
+            self._terbitkan(self._muat(), ganti=True)
+
+    def pulihkan(self, tulis):
+        """Restore: tulis() mengganti jurnal langsung di storage, lalu snapshot dimuat ulang dari disk"""
+        with self.lock, self.storage.kunci_jurnal():
+            tulis()
+            self._terbitkan(self._muat(), ganti=True)
+
+    def _terbitkan(self, snapshot, ganti=False, versi_storage=None):
+        self.snapshot = snapshot
+        self.versi += 1
+        if ganti:
+            self.versi_ganti = self.versi
+        self.versi_storage = self.storage.versi_jurnal(self.sejak) if versi_storage is None else versi_storage
+
+
+class SaldoAkunTertunda:
+    """Write-behind saldo akun di accounts.json, satu per storage per proses.
+
+    Posting hanya mencatat mutasi debit/kredit per akun di memori (integer sen). Semua
+    mutasi yang tertunda ditulis dalam satu read-modify-write (perbarui_accounts) di akhir
+    request, atau oleh timer kalau tidak ada request yang selesai dalam `jeda` detik.
+    """
+
+    def __init__(self, storage, jeda=2.0):
+        self.storage = storage
+        self.jeda = jeda
+        self.lock = threading.Lock()
+        self.mutasi = {}
+        self.timer = None
+
+    def catat(self, akun, debit, kredit):
+        with self.lock:
+            total_debit, total_kredit = self.mutasi.get(akun, (0, 0))
+            self.mutasi[akun] = (total_debit + ke_sen(debit), total_kredit + ke_sen(kredit))
+            if self.timer is None:
+                self.timer = threading.Timer(self.jeda, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Tulis semua mutasi tertunda sekaligus; return jumlah akun yang ditulis"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            mutasi, self.mutasi = self.mutasi, {}
+            if not mutasi:
+                return 0
+            try:
+                bagan = bagan_akun_storage(self.storage)
+                self.storage.perbarui_accounts(lambda accounts: self.terapkan(accounts, mutasi, bagan))
+            except Exception:
+                # Dikembalikan ke antrian supaya ikut ditulis pada flush berikutnya
+                for akun, (debit, kredit) in mutasi.items():
+                    total_debit, total_kredit = self.mutasi.get(akun, (0, 0))
+                    self.mutasi[akun] = (total_debit + debit, total_kredit + kredit)
+                raise
+            return len(mutasi)
+
+    @staticmethod
+    def terapkan(accounts, mutasi, bagan):
+        for akun, (debit, kredit) in mutasi.items():
+            if akun in accounts:
+                if bagan.normal_debit(akun):
+                    selisih = debit - kredit
+                else:
+                    selisih = kredit - debit
+                accounts[akun]["balance"] = dari_sen(ke_sen(accounts[akun]["balance"]) + selisih)
+
+
+class AntrianEkspor:
+    """Antrian export laporan di background, satu per proses.
+
+    Setiap pekerjaan punya ID dan progres (0..1) yang di-polling halaman hasil export.
+    Hasil yang selesai disimpan di folder cache dengan nama dari kunci (laporan, format,
+    versi jurnal, ...); export ulang laporan yang sama langsung memakai file itu.
+    """
+
+    def __init__(self, folder, pekerja=2, batas_cache=20, umur_pekerjaan=3600):
+        self.folder = folder
+        self.batas_cache = batas_cache
+        self.umur_pekerjaan = umur_pekerjaan
+        self.executor = ThreadPoolExecutor(max_workers=pekerja, thread_name_prefix='ekspor')
+        self.lock = threading.Lock()
+        self.pekerjaan = {}
+        self.berjalan = {}  # kunci cache -> ID pekerjaan yang sedang dikerjakan
+
+    def berkas_cache(self, kunci, ekstensi):
+        nama = hashlib.sha1(repr(kunci).encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, f"{nama}.{ekstensi}")
+
+    def kirim(self, kunci, ekstensi, buat):
+        """Daftarkan export, return ID pekerjaan. buat(progres) -> bytes dijalankan di thread pekerja"""
+        path = self.berkas_cache(kunci, ekstensi)
+        with self.lock:
+            self.buang_pekerjaan_lama()
+            # Laporan yang sama sedang dibuat (session lain / klik ganda): ikut menunggu hasilnya
+            if kunci in self.berjalan:
+                return self.berjalan[kunci]
+            id_pekerjaan = uuid.uuid4().hex[:12]
+            pekerjaan = {'status': 'antri', 'progres': 0.0, 'berkas': path, 'pesan': '',
+                         'dari_cache': False, 'dibuat': time.time()}
+            self.pekerjaan[id_pekerjaan] = pekerjaan
+            try:
+                os.utime(path)  # Tandai baru dipakai supaya tidak ikut terbuang
+                pekerjaan.update(status='selesai', progres=1.0, dari_cache=True)
+                return id_pekerjaan
+            except FileNotFoundError:
+                pass
+            self.berjalan[kunci] = id_pekerjaan
+        self.executor.submit(self.jalankan, id_pekerjaan, kunci, buat)
+        return id_pekerjaan
+
+    def status(self, id_pekerjaan):
+        """Salinan status pekerjaan, None kalau ID tidak dikenal (mis. proses sudah restart)"""
+        with self.lock:
+            pekerjaan = self.pekerjaan.get(id_pekerjaan)
+            return dict(pekerjaan) if pekerjaan is not None else None
+
+    def jalankan(self, id_pekerjaan, kunci, buat):
+        pekerjaan = self.pekerjaan[id_pekerjaan]
+        pekerjaan['status'] = 'berjalan'
+
+        def progres(nilai):
+            pekerjaan['progres'] = min(nilai, 0.99)
+
+        try:
+            hasil = buat(progres)
+            if hasil is None:
+                raise RuntimeError("generate laporan gagal")
+            os.makedirs(self.folder, exist_ok=True)
+            tulis_atomik(pekerjaan['berkas'], lambda f: f.write(hasil), fsync=False, mode='wb')
+            pekerjaan.update(status='selesai', progres=1.0)
+            self.bersihkan_cache()
+        except Exception as e:
+            pekerjaan.update(status='gagal', pesan=str(e))
+        finally:
+            with self.lock:
+                self.berjalan.pop(kunci, None)
+
+    def buang_pekerjaan_lama(self):
+        batas = time.time() - self.umur_pekerjaan
+        for id_pekerjaan in [i for i, p in self.pekerjaan.items()
+                             if p['dibuat'] < batas and p['status'] in ('selesai', 'gagal')]:
+            del self.pekerjaan[id_pekerjaan]
+
+    def bersihkan_cache(self):
+        """Simpan hanya `batas_cache` hasil export yang paling baru dipakai"""
+        try:
+            daftar = [os.path.join(self.folder, nama) for nama in os.listdir(self.folder)
+                      if not nama.endswith(('.tmp', '.lock'))]
+            daftar.sort(key=os.path.getmtime, reverse=True)
+            for path in daftar[self.batas_cache:]:
+                os.remove(path)
+                if os.path.exists(path + '.lock'):
+                    os.remove(path + '.lock')
+        except OSError:
+            pass
+
+
+def kompres(data, kompresi):
+    if kompresi == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def dekompres(data, kompresi):
+    if kompresi == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+@contextmanager
+def penulis_terkompres(berkas, kompresi):
+    """File biner yang mengompres (gzip / zstd) semua yang ditulis ke berkas secara streaming"""
+    if kompresi == "zstd":
+        keluar = zstandard.ZstdCompressor(level=10).stream_writer(berkas, closefd=False)
+    else:
+        keluar = gzip.GzipFile(fileobj=berkas, mode='wb', compresslevel=6, mtime=0)
+    try:
+        yield keluar
+    finally:
+        keluar.close()
+
+
+class ArsipBackup:
+    """Backup penuh / inkremental ke folder lokal: chunk ber-hash isi + manifest per backup.
+
+    Setiap bagian data (pengaturan, users, Jurnal Umum, ...) ditulis sebagai JSON lines lalu
+    dipotong di batas yang ditentukan isi baris (CRC32), sehingga posting atau hapus satu
+    transaksi hanya mengubah chunk tempat baris itu berada. Chunk disimpan terkompres dengan
+    nama SHA-256 isinya: backup inkremental hanya menulis chunk yang belum ada. Manifest
+    mencatat urutan chunk, jumlah baris dan checksum setiap bagian; satu manifest cukup
+    untuk memulihkan semua data.
+    """
+
+    FORMAT = "sientok-backup"
+    VERSI = 2
+    EKSTENSI = {"gzip": "gz", "zstd": "zst"}
+
+    def __init__(self, folder=os.path.join('data', 'backup'), rata_baris_chunk=2000, simpan_manifest=30):
+        self.folder = folder
+        self.folder_chunk = os.path.join(folder, 'chunks')
+        self.folder_manifest = os.path.join(folder, 'manifest')
+        self.rata_baris_chunk = rata_baris_chunk
+        self.simpan_manifest = simpan_manifest
+        self.kompresi = "zstd" if zstandard is not None else "gzip"
+        self.lock = threading.Lock()
+        self.lock_background = threading.Lock()
+        self.berjalan = False
+        self._terakhir = None
+
+    def kunci_folder(self):
+        """Lock lintas proses untuk folder backup: penulisan chunk + manifest (buat) dan
+        penghapusan chunk (bersihkan) di worker lain tidak boleh berjalan bersamaan"""
+        os.makedirs(self.folder, exist_ok=True)
+        return kunci_berkas(os.path.join(self.folder, 'backup'))
+
+    def path_chunk(self, hash_isi, kompresi):
+        return os.path.join(self.folder_chunk, hash_isi[:2], f"{hash_isi}.{self.EKSTENSI[kompresi]}")
+
+    def potong(self, records):
+        """JSON lines per chunk; batas chunk jatuh pada baris yang CRC32-nya kelipatan rata_baris_chunk"""
+        baris = []
+        for record in records:
+            teks = json.dumps(record, sort_keys=True, ensure_ascii=False, default=dict).encode('utf-8') + b"\n"
+            baris.append(teks)
+            if zlib.crc32(teks) % self.rata_baris_chunk == 0 or len(baris) >= 4 * self.rata_baris_chunk:
+                yield b"".join(baris), len(baris)
+                baris = []
+        if baris:
+            yield b"".join(baris), len(baris)
+
+    @staticmethod
+    def hitung_total(transactions, total):
+        """Lewatkan transaksi apa adanya sambil menjumlah debit / kredit (sen) ke total"""
+        for trans in transactions:
+            total[0] += ke_sen(trans['debit'])
+            total[1] += ke_sen(trans['kredit'])
+            yield trans
+
+    def simpan_chunk(self, data, hash_isi):
+        path = self.path_chunk(hash_isi, self.kompresi)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        isi = kompres(data, self.kompresi)
+
+        def tulis(f):
+            f.write(isi)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Nama = hash isi, jadi penulis bersamaan selalu menulis isi yang sama: cukup replace
+        os.replace(_tulis_temp(path, tulis, 'wb'), path)
+
+    def baca_chunk(self, hash_isi, kompresi):
+        with open(self.path_chunk(hash_isi, kompresi), 'rb') as f:
+            data = dekompres(f.read(), kompresi)
+        if hashlib.sha256(data).hexdigest() != hash_isi:
+            raise ValueError(f"Chunk backup {hash_isi[:12]} rusak (checksum tidak cocok)")
+        return data
+
+    def buat(self, bagian, mode="inkremental"):
+        """Buat backup dari {nama: iterable record}; mode 'penuh' menulis ulang semua chunk"""
+        # Chunk lama yang dipakai ulang baru aman setelah manifest tersimpan; selama itu
+        # bersihkan() di worker lain harus menunggu
+        with self.lock, self.kunci_folder():
+            waktu = datetime.now()
+            manifest = {
+                'format': self.FORMAT, 'versi': self.VERSI, 'id': waktu.strftime('%Y%m%d_%H%M%S_%f'),
+                'waktu': waktu.strftime('%Y-%m-%d %H:%M:%S'), 'mode': mode,
+                'kompresi': self.kompresi, 'bagian': {}
+            }
+            chunk_baru = chunk_lama = 0
+            for nama, records in bagian.items():
+                info = {'chunk': [], 'jumlah': 0}
+                hash_bagian = hashlib.sha256()
+                total = [0, 0]
+                if nama == 'transactions':
+                    records = self.hitung_total(records, total)
+                for data, jumlah in self.potong(records):
+                    hash_isi = hashlib.sha256(data).hexdigest()
+                    hash_bagian.update(data)
+                    if mode == "penuh" or not os.path.exists(self.path_chunk(hash_isi, self.kompresi)):
+                        self.simpan_chunk(data, hash_isi)
+                        chunk_baru += 1
+                    else:
+                        chunk_lama += 1
+                    info['chunk'].append(hash_isi)
+                    info['jumlah'] += jumlah
+                info['sha256'] = hash_bagian.hexdigest()
+                if nama == 'transactions':
+                    # Untuk verifikasi saat restore: jurnal harus seimbang dan totalnya sama
+                    info['total_debit'], info['total_kredit'] = total
+                manifest['bagian'][nama] = info
+            manifest['chunk_baru'], manifest['chunk_lama'] = chunk_baru, chunk_lama
+            os.makedirs(self.folder_manifest, exist_ok=True)
+            simpan_json_atomik(os.path.join(self.folder_manifest, manifest['id'] + '.json'), manifest)
+            self._terakhir = manifest
+            self.bersihkan()
+            return manifest
+
+    def buat_di_background(self, bagian, mode="inkremental"):
+        """Jalankan buat() di thread daemon; False kalau backup background sebelumnya belum selesai"""
+        with self.lock_background:
+            if self.berjalan:
+                return False
+            self.berjalan = True
+
+        def jalankan():
+            try:
+                self.buat(bagian, mode)
+            finally:
+                self.berjalan = False
+
+        threading.Thread(target=jalankan, name='auto-backup', daemon=True).start()
+        return True
+
+    def daftar_manifest(self):
+        """ID backup yang tersimpan, terlama dulu"""
+        try:
+            return sorted(nama[:-5] for nama in os.listdir(self.folder_manifest) if nama.endswith('.json'))
+        except FileNotFoundError:
+            return []
+
+    def baca_manifest(self, id_backup):
+        with open(os.path.join(self.folder_manifest, id_backup + '.json'), 'r') as f:
+            return json.load(f)
+
+    def terakhir(self):
+        if self._terakhir is None:
+            daftar = self.daftar_manifest()
+            self._terakhir = self.baca_manifest(daftar[-1]) if daftar else {}
+        return self._terakhir
+
+    def bersihkan(self):
+        """Hapus manifest di luar `simpan_manifest` terbaru dan chunk yang tidak dirujuk lagi"""
+        with self.kunci_folder():
+            daftar = self.daftar_manifest()
+            for id_backup in daftar[:-self.simpan_manifest]:
+                os.remove(os.path.join(self.folder_manifest, id_backup + '.json'))
+            dirujuk = set()
+            for id_backup in daftar[-self.simpan_manifest:]:
+                for info in self.baca_manifest(id_backup)['bagian'].values():
+                    dirujuk.update(info['chunk'])
+            for folder, _, berkas in os.walk(self.folder_chunk):
+                for nama in berkas:
+                    if nama.split('.')[0] not in dirujuk:
+                        os.remove(os.path.join(folder, nama))
+
+    def tulis_arsip(self, manifest, berkas):
+        """Satu backup sebagai satu file terkompres untuk diunduh.
+
+        Isi: baris header (manifest tanpa daftar chunk), lalu per bagian satu baris header
+        bagian diikuti tepat `jumlah` baris record. Record disalin byte demi byte dari chunk,
+        jadi checksum bagian di header bisa diverifikasi langsung saat restore.
+        """
+        header = {kunci: nilai for kunci, nilai in manifest.items() if kunci != 'bagian'}
+        header['bagian'] = list(manifest['bagian'])
+        with penulis_terkompres(berkas, manifest['kompresi']) as keluar:
+            keluar.write(json.dumps(header).encode('utf-8') + b"\n")
+            for nama, info in manifest['bagian'].items():
+                kepala_bagian = {kunci: nilai for kunci, nilai in info.items() if kunci != 'chunk'}
+                kepala_bagian['nama'] = nama
+                keluar.write(json.dumps({'bagian': kepala_bagian}).encode('utf-8') + b"\n")
+                for hash_isi in info['chunk']:
+                    keluar.write(self.baca_chunk(hash_isi, manifest['kompresi']))
+
+    # Baris arsip yang lebih panjang dari ini dianggap rusak (menjaga memori restore tetap terbatas)
+    BATAS_BARIS = 16 * 1024 * 1024
+
+    @classmethod
+    def buka_arsip(cls, berkas):
+        """Stream biner isi arsip; gzip / zstd dikenali dari magic byte, selain itu dibaca apa adanya"""
+        awal = berkas.read(4)
+        berkas.seek(0)
+        if awal[:2] == b"\x1f\x8b":
+            return gzip.GzipFile(fileobj=berkas, mode='rb')
+        if awal == b"\x28\xb5\x2f\xfd":
+            if zstandard is None:
+                raise ValueError("Backup dikompres zstd, tetapi modul zstandard tidak terpasang")
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(berkas))
+        return berkas
+
+    @classmethod
+    def baca_arsip(cls, berkas):
+        """Generator (nama bagian, generator record) dari arsip tulis_arsip, dibaca baris demi baris.
+
+        Checksum dan jumlah baris setiap bagian (serta debit = kredit untuk Jurnal Umum)
+        diperiksa saat record terakhir bagian itu dibaca; kalau tidak cocok, ValueError
+        dilempar dari generator record. Record yang tidak dibaca pemanggil tetap diverifikasi.
+        Backup JSON lama (satu objek) masih diterima, tetapi dibaca utuh ke memori.
+        """
+        sumber = cls.buka_arsip(berkas)
+
+        def baca_baris():
+            baris = sumber.readline(cls.BATAS_BARIS + 1)
+            if len(baris) > cls.BATAS_BARIS:
+                raise ValueError("Backup rusak: baris terlalu panjang")
+            return baris
+
+        awal = sumber.readline(cls.BATAS_BARIS + 1)
+        try:
+            header = json.loads(awal)
+        except (ValueError, UnicodeDecodeError):
+            header = None
+        if not isinstance(header, dict) or header.get('format') != cls.FORMAT:
+            yield from cls.baca_backup_lama(awal + sumber.read())
+            return
+        if header.get('versi', 0) > cls.VERSI:
+            raise ValueError(f"Versi backup {header['versi']} lebih baru dari yang didukung aplikasi")
+
+        def records(nama, info):
+            hash_bagian = hashlib.sha256()
+            total_debit = total_kredit = 0
+            for _ in range(info['jumlah']):
+                baris = baca_baris()
+                if not baris.endswith(b"\n"):
+                    raise ValueError(f"Backup terpotong di bagian '{nama}'")
+                hash_bagian.update(baris)
+                record = json.loads(baris)
+                if nama == 'transactions':
+                    total_debit += ke_sen(record['debit'])
+                    total_kredit += ke_sen(record['kredit'])
+                yield record
+            if hash_bagian.hexdigest() != info['sha256']:
+                raise ValueError(f"Backup rusak: checksum bagian '{nama}' tidak cocok")
+            if nama == 'transactions':
+                if total_debit != total_kredit:
+                    raise ValueError("Backup ditolak: total debit dan kredit Jurnal Umum tidak seimbang")
+                if (total_debit, total_kredit) != (info.get('total_debit'), info.get('total_kredit')):
+                    raise ValueError("Backup rusak: total debit / kredit Jurnal Umum tidak cocok dengan header")
+
+        for nama in header['bagian']:
+            try:
+                info = json.loads(baca_baris())['bagian']
+            except (ValueError, KeyError, TypeError):
+                raise ValueError(f"Backup rusak: header bagian '{nama}' tidak terbaca")
+            if info.get('nama') != nama:
+                raise ValueError(f"Backup rusak: bagian '{nama}' tidak ditemukan")
+            bagian = records(nama, info)
+            yield nama, bagian
+            for _ in bagian:
+                pass
+        if sumber.read(1):
+            raise ValueError("Backup rusak: ada data sesudah bagian terakhir")
+
+    @staticmethod
+    def baca_backup_lama(teks):
+        """Backup format lama: satu objek JSON {bagian: isi}; hanya debit = kredit yang bisa diperiksa"""
+        try:
+            data = json.loads(teks)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("File bukan backup SIENTOK yang valid")
+        if not isinstance(data, dict):
+            raise ValueError("File bukan backup SIENTOK yang valid")
+        for nama, isi in data.items():
+            if nama in ('transactions', 'penyesuaian'):
+                if nama == 'transactions':
+                    total_debit = sum(ke_sen(trans['debit']) for trans in isi)
+                    if total_debit != sum(ke_sen(trans['kredit']) for trans in isi):
+                        raise ValueError("Backup ditolak: total debit dan kredit Jurnal Umum tidak seimbang")
+                yield nama, iter(isi)
+            else:
+                yield nama, iter([isi])
+
 
 class ModernLoginApp:
     def __init__(self):
         self.users_file = "users.json"
         self.transactions_file = "transactions.json"
         self.accounts_file = "accounts.json"
+        self.jurnal_umum_file = "jurnal_umum_transactions.json"
+        self.jurnal_umum_log_file = "jurnal_umum_transactions.jsonl"
+        self.sqlite_file = "sientok.db"
+        self.saldo_cache_file = "jurnal_umum_saldo.json"
+        self.indeks_akun_file = "jurnal_umum_indeks.json"
+        self.periods_file = "periods.json"
+        # Users, storage, transaksi dan pengaturan diambil dari cache proses;
+        # disk hanya dibaca lagi kalau file sumbernya berubah
+        self.storage = self.buat_storage()
         self.load_users()
-        self.setup_accounts_database()
         self.load_transactions()
+        # Session memegang snapshot Jurnal Umum bersama; disegarkan setiap rerun
+        self.sinkronkan_jurnal()
         
         # Initialize session state
         if 'logged_in' not in st.session_state:
@@ -35,28 +2915,58 @@ class ModernLoginApp:
         ]
 
     def load_users(self):
+        self.users = muat_bila_berubah('users', [self.users_file], self.baca_users)
+
+    def baca_users(self):
         if os.path.exists(self.users_file):
             with open(self.users_file, 'r') as file:
-                self.users = json.load(file)
-        else:
-            self.users = {}
+                return json.load(file)
+        return {}
+
+    def save_users(self, perubahan):
+        # Hanya perubahan yang digabung ke isi file terbaru: user yang didaftarkan worker lain
+        # tidak hilang, dan dict users di cache proses tidak disentuh sebelum file berhasil ditulis
+        self.users = perbarui_json(self.users_file, lambda users: users.update(perubahan))
+
+    def buat_storage(self, backend=None):
+        """Pilih backend penyimpanan sesuai System Settings ('json' / 'sqlite')"""
+        if backend is None:
+            backend = self.load_system_settings().get('storage_backend', 'json')
+        
+        # Satu handle storage per proses (koneksi SQLite tidak dibuka ulang setiap rerun)
+        cache = sumber_daya_proses()
+        kunci = ('storage', backend)
+        if kunci not in cache:
+            if backend == 'sqlite':
+                storage = SqliteStorage(self.sqlite_file)
+            else:
+                storage = JsonStorage(
+                    jurnal_umum_file=self.jurnal_umum_file,
+                    jurnal_umum_log_file=self.jurnal_umum_log_file,
+                    transactions_file=self.transactions_file,
+                    accounts_file=self.accounts_file
+                )
+            self.setup_accounts_database(storage)
+            try:
+                storage.migrasi_normalisasi(self.tahun_periode())
+            except Exception as e:
+                st.error(f"Error migrasi tanggal: {e}")
+            cache[kunci] = storage
+        return cache[kunci]
 
-    def save_users(self):
-        with open(self.users_file, 'w') as file:
-            json.dump(self.users, file, indent=4)
+    def tahun_periode(self):
+        """Tahun periode akuntansi (dari periode akhir di pengaturan sistem)"""
+        return self.load_system_settings().get('periode_akhir', '2024-12-31')[:4]
 
     def load_transactions(self):
-        if os.path.exists(self.transactions_file):
-            with open(self.transactions_file, 'r') as file:
-                self.transactions = json.load(file)
-        else:
-            self.transactions = []
+        self.transactions = muat_bila_berubah(
+            'transaksi', self.storage.berkas_data('transaksi'), self.storage.load_transaksi
+        )
 
     def save_transactions(self):
-        with open(self.transactions_file, 'w') as file:
-            json.dump(self.transactions, file, indent=4)
+        self.storage.save_transaksi(self.transactions)
 
-    def setup_accounts_database(self):
+    def setup_accounts_database(self, storage=None):
         default_accounts = {
             "Kas": {"type": "Aset", "balance": 0},
             "Bank": {"type": "Aset", "balance": 0},
@@ -91,9 +3001,9 @@ class ModernLoginApp:
             "Beban Lainnya": {"type": "Beban", "balance": 0}
         }
 
-        if not os.path.exists(self.accounts_file):
-            with open(self.accounts_file, 'w') as f:
-                json.dump(default_accounts, f, indent=4)
+        storage = storage or self.storage
+        if not storage.accounts_exist():
+            storage.save_accounts(default_accounts)
                 
     def run(self):
         if not st.session_state.logged_in:
@@ -288,11 +3198,15 @@ class ModernLoginApp:
             st.error("Password must be at least 4 characters!")
             return
         
-        self.users[username] = {
+        user_baru = {
             'password': password,
             'email': email
         }
-        self.save_users()
+        try:
+            self.save_users({username: user_baru})
+        except Exception as e:
+            st.error(f"Error menyimpan user: {e}")
+            return
         
         st.success("Registration successful!\nYou can now login.")
         st.session_state.current_page = "login"
@@ -447,11 +3361,45 @@ class ModernLoginApp:
             self.show_add_transaction_form()
             return
 
+        # Session hanya memuat periode terbuka; periode tertutup diwakili snapshot saldonya
+        periode = self.load_periode()
+        awal = periode.snapshot_terakhir()
         if not st.session_state.transactions:
-            st.info("📭 Belum ada transaksi")
+            if awal:
+                st.info(f"📭 Belum ada transaksi di periode terbuka (sampai {periode.terakhir_ditutup()} sudah ditutup)")
+            else:
+                st.info("📭 Belum ada transaksi")
             return
 
         st.subheader("📋 DAFTAR TRANSAKSI")
+        if awal:
+            st.caption(f"Menampilkan periode terbuka; periode sampai {periode.terakhir_ditutup()} "
+                       "sudah ditutup dan ikut dihitung di baris TOTAL.")
+        
+        # ✅ URUTAN TAMPIL (tanggal terbaru dulu), dihitung sekali per versi jurnal
+        urutan, ordinal_negatif = self.get_urutan_jurnal()
+        
+        # NAVIGASI: ukuran halaman, lompat ke tanggal, nomor halaman
+        col_ukuran, col_tanggal, col_lompat, col_halaman = st.columns([1, 1.5, 1, 1])
+        with col_ukuran:
+            ukuran_halaman = st.selectbox("Baris per halaman:", [25, 50, 100, 200], index=1, key="jurnal_ukuran")
+        jumlah_halaman = max(1, -(-len(urutan) // ukuran_halaman))
+        with col_tanggal:
+            tanggal_lompat = st.date_input("Lompat ke tanggal:", value=datetime.now(), key="jurnal_tanggal_lompat")
+        with col_lompat:
+            st.write("")
+            if st.button("🔎 Lompat", use_container_width=True):
+                # Posisi baris pertama yang tanggalnya <= tanggal tujuan (daftar urut menurun)
+                posisi = bisect_left(ordinal_negatif, -tanggal_lompat.toordinal())
+                st.session_state.jurnal_halaman = min(posisi // ukuran_halaman + 1, jumlah_halaman)
+        if st.session_state.get('jurnal_halaman', 1) > jumlah_halaman:
+            st.session_state.jurnal_halaman = jumlah_halaman
+        with col_halaman:
+            nomor_halaman = st.number_input(
+                f"Halaman (dari {jumlah_halaman}):",
+                min_value=1, max_value=jumlah_halaman, step=1,
+                key="jurnal_halaman"
+            )
         
         # HEADER TABEL
         st.markdown("---")
@@ -465,79 +3413,71 @@ class ModernLoginApp:
         with col7: st.write("**AKSI**")
         st.markdown("---")
 
-        # ✅ KELOMPOKKAN TRANSAKSI BERDASARKAN TANGGAL
-        transactions_by_date = {}
-        for i, trans in enumerate(st.session_state.transactions):
+        # ✅ HANYA BARIS DI HALAMAN INI YANG DIRENDER
+        awal = (int(nomor_halaman) - 1) * ukuran_halaman
+        tanggal_sebelumnya = None
+        for index in urutan[awal:awal + ukuran_halaman]:
+            trans = st.session_state.transactions[index]
             date = trans['tanggal']
-            if date not in transactions_by_date:
-                transactions_by_date[date] = []
-            transactions_by_date[date].append((i, trans))
-
-        # ✅ SORTING TANGGAL - dari PALING BARU ke LAMA
-        def parse_date(date_str):
-            try:
-                return datetime.strptime(date_str, "%d %B %Y")
-            except:
-                return datetime.min
-
-        sorted_dates = sorted(transactions_by_date.keys(), key=parse_date, reverse=True)
-
-        # Inisialisasi total
-        total_debit = 0
-        total_kredit = 0
-
-        # ✅ TAMPILKAN SEMUA TRANSAKSI DALAM KELOMPOK TANGGAL
-        for date in sorted_dates:
-            trans_list = transactions_by_date[date]
+            baris_pertama = date != tanggal_sebelumnya
+            if baris_pertama and tanggal_sebelumnya is not None:
+                # Garis pemisah antar kelompok tanggal
+                st.write("---")
+            tanggal_sebelumnya = date
             
-            # ✅ TAMPILKAN SEMUA TRANSAKSI PADA TANGGAL TERSEBUT
-            for j, (index, trans) in enumerate(trans_list):
-                col1, col2, col3, col4, col5, col6, col7 = st.columns([1.5, 1.5, 2, 0.8, 1.2, 1.2, 0.8])
-                
-                with col1: 
-                    if j == 0:  # Hanya tampilkan tanggal di baris pertama
-                        st.write(date)
-                    else:
-                        st.write("")
-                
-                with col2: st.write(trans['akun'])
-                with col3: 
-                    st.write(trans.get('keterangan', '')) 
-                with col4: st.write(trans.get('ref', ''))
-                with col5: 
-                    if trans['debit'] > 0:
-                        st.write(f"Rp{trans['debit']:,.0f}")
-                    else:
-                        st.write("")
-                with col6: 
-                    if trans['kredit'] > 0:
-                        st.write(f"Rp{trans['kredit']:,.0f}")
-                    else:
-                        st.write("")
-                with col7: 
-                    if j == 0:  # ✅ TOMBOL HAPUS hanya di baris pertama (untuk hapus SEMUA transaksi tanggal ini)
-                        if st.button("🗑️", key=f"del_{index}"):
-                            st.session_state.trans_to_delete = date  # Simpan TANGGAL yang akan dihapus
-                            st.session_state.show_delete_confirm = True
-                            st.rerun()
-                    else:
-                        st.write("")
-                
-                # ✅ HITUNG TOTAL DARI SEMUA DEBIT/KREDIT
-                total_debit += trans['debit']
-                total_kredit += trans['kredit']
+            col1, col2, col3, col4, col5, col6, col7 = st.columns([1.5, 1.5, 2, 0.8, 1.2, 1.2, 0.8])
             
-            # Garis pemisah antar kelompok tanggal
-            st.write("---")
-
-        # BARIS TOTAL
+            with col1: 
+                if baris_pertama:  # Hanya tampilkan tanggal di baris pertama
+                    st.write(date)
+                else:
+                    st.write("")
+            
+            with col2: st.write(trans['akun'])
+            with col3: 
+                st.write(trans.get('keterangan', '')) 
+            with col4: st.write(trans.get('ref', ''))
+            with col5: 
+                if trans['debit'] > 0:
+                    st.write(f"Rp{trans['debit']:,.0f}")
+                else:
+                    st.write("")
+            with col6: 
+                if trans['kredit'] > 0:
+                    st.write(f"Rp{trans['kredit']:,.0f}")
+                else:
+                    st.write("")
+            with col7: 
+                if baris_pertama:  # ✅ TOMBOL HAPUS hanya di baris pertama (untuk hapus SEMUA transaksi tanggal ini)
+                    if st.button("🗑️", key=f"del_{index}"):
+                        st.session_state.trans_to_delete = date  # Simpan TANGGAL yang akan dihapus
+                        st.session_state.show_delete_confirm = True
+                        st.rerun()
+                else:
+                    st.write("")
+        
+        st.write("---")
+
+        if awal:
+            # Jumlah periode tertutup dari snapshot, supaya baris yang tampil + baris ini = TOTAL
+            col1, col2, col3, col4, col5, col6, col7 = st.columns([1.5, 1.5, 2, 0.8, 1.2, 1.2, 0.8])
+            with col1: st.write("")
+            with col2: st.write("")
+            with col3: st.write(f"*Periode tertutup s.d. {periode.terakhir_ditutup()} ({awal['jumlah_baris']} baris)*")
+            with col4: st.write("")
+            with col5: st.write(f"Rp{dari_sen(awal['total_debit']):,.0f}")
+            with col6: st.write(f"Rp{dari_sen(awal['total_kredit']):,.0f}")
+            with col7: st.write("")
+
+        # BARIS TOTAL - seluruh jurnal, dari saldo cache (bukan hanya halaman ini)
+        saldo_cache = self.get_saldo_cache()
         col1, col2, col3, col4, col5, col6, col7 = st.columns([1.5, 1.5, 2, 0.8, 1.2, 1.2, 0.8])
         with col1: st.write("")
         with col2: st.write("")
         with col3: st.write("")
         with col4: st.write("**TOTAL →**")
-        with col5: st.write(f"**Rp{total_debit:,.0f}**")
-        with col6: st.write(f"**Rp{total_kredit:,.0f}**")
+        with col5: st.write(f"**Rp{dari_sen(saldo_cache.total_debit):,.0f}**")
+        with col6: st.write(f"**Rp{dari_sen(saldo_cache.total_kredit):,.0f}**")
         with col7: st.write("")
         
         st.markdown("---")
@@ -556,18 +3496,11 @@ class ModernLoginApp:
             with col_ya:
                 if st.button("✅ Ya, Hapus Semua", key="confirm_yes"):
                     # ✅ HAPUS SEMUA TRANSAKSI DENGAN TANGGAL YANG SAMA
-                    st.session_state.transactions = [
-                        trans for trans in st.session_state.transactions 
-                        if trans['tanggal'] != date_to_delete
-                    ]
-                    
-                    # Simpan perubahan ke file
-                    self.save_transactions_to_file()
-                    
-                    st.session_state.show_delete_confirm = False
-                    st.session_state.trans_to_delete = None
-                    st.success(f"✅ Semua transaksi pada {date_to_delete} berhasil dihapus!")
-                    st.rerun()
+                    if self.hapus_transaksi_tanggal(date_to_delete):
+                        st.session_state.show_delete_confirm = False
+                        st.session_state.trans_to_delete = None
+                        st.success(f"✅ Semua transaksi pada {date_to_delete} berhasil dihapus!")
+                        st.rerun()
             
             with col_tidak:
                 if st.button("❌ Tidak", key="confirm_no"):
@@ -575,6 +3508,22 @@ class ModernLoginApp:
                     st.session_state.trans_to_delete = None
                     st.rerun()
                     
+    def get_urutan_jurnal(self):
+        """Index baris Jurnal Umum urut tanggal terbaru dulu (urutan posting di dalam satu tanggal).
+
+        Disimpan di session per versi jurnal, jadi rerun biasa (pindah halaman) tidak
+        mengurutkan ulang. Ikut dikembalikan daftar -ordinal tanggal per posisi untuk bisect.
+        """
+        transactions = st.session_state.transactions
+        kunci = st.session_state.snapshot_jurnal
+        cache = st.session_state.get('urutan_jurnal')
+        if cache is None or cache[0] != kunci:
+            ordinal = [urutan_tanggal(trans) for trans in transactions]
+            urutan = sorted(range(len(transactions)), key=lambda i: -ordinal[i])
+            ordinal_negatif = array('l', (-ordinal[i] for i in urutan))
+            cache = st.session_state.urutan_jurnal = (kunci, urutan, ordinal_negatif)
+        return cache[1], cache[2]
+
     def show_add_transaction_form(self):
         st.subheader("➕ Tambah Transaksi Baru")
         
@@ -623,80 +3572,371 @@ class ModernLoginApp:
                 elif akun_debit == akun_kredit:
                     st.error("❌ Akun Debit dan Kredit tidak boleh sama!")
                 else:
-                    # Simpan transaksi debit
-                    st.session_state.transactions.append({
-                        'tanggal': tanggal.strftime("%d %B %Y"),
-                        'akun': akun_debit,
-                        'debit': debit,
-                        'kredit': 0,
-                        'keterangan': keterangan,
-                        'ref': ref
-                    })
-                    # Simpan transaksi kredit
-                    st.session_state.transactions.append({
-                        'tanggal': tanggal.strftime("%d %B %Y"),
-                        'akun': akun_kredit,
-                        'debit': 0,
-                        'kredit': kredit,
-                        'keterangan': keterangan,
-                        'ref': ref
-                    })
-                    
-                    # Simpan ke file
-                    self.save_transactions_to_file()
+                    # Simpan transaksi debit & kredit, hanya baris baru yang ditulis ke log
+                    berhasil = self.tambah_transaksi_jurnal([
+                        {
+                            'tanggal': tanggal.strftime("%d %B %Y"),
+                            'akun': akun_debit,
+                            'debit': debit,
+                            'kredit': 0,
+                            'keterangan': keterangan,
+                            'ref': ref
+                        },
+                        {
+                            'tanggal': tanggal.strftime("%d %B %Y"),
+                            'akun': akun_kredit,
+                            'debit': 0,
+                            'kredit': kredit,
+                            'keterangan': keterangan,
+                            'ref': ref
+                        }
+                    ])
                     
-                    st.session_state.show_add_form = False
-                    st.success("✅ Transaksi berhasil ditambahkan!")
-                    st.rerun()
+                    if berhasil:
+                        st.session_state.show_add_form = False
+                        st.success("✅ Transaksi berhasil ditambahkan!")
+                        st.rerun()
             
             if submitted_batal:
                 st.session_state.show_add_form = False
                 st.rerun()
 
-    def save_transactions_to_file(self):
-        """Simpan transaksi ke file JSON"""
+    def get_jurnal_bersama(self):
+        """Jurnal Umum bersama proses untuk storage yang sedang dipakai.
+
+        Hanya periode terbuka yang dimuat; periode tertutup diwakili snapshot saldonya di periods.json.
+        """
+        jurnal = sumber_daya_proses().setdefault(('jurnal', id(self.storage)), JurnalBersama(self.storage))
+        awal = self.snapshot_periode()
+        jurnal.atur_sejak(awal['akhir'] if awal else None)
+        return jurnal
+
+    def sinkronkan_jurnal(self):
+        """Arahkan session ke snapshot Jurnal Umum bersama yang terbaru.
+
+        Kalau sejak snapshot lama jurnal hanya bertambah di akhir, saldo cache, index akun
+        dan prefix sum session cukup disambung dengan baris barunya; selain itu turunan
+        session dibuang dan disusun lagi saat dibutuhkan.
+        """
+        jurnal = self.get_jurnal_bersama()
+        versi, snapshot, versi_storage = jurnal.ambil()
+        lama = st.session_state.get('snapshot_jurnal')
+        if lama is None or lama[:2] != (id(jurnal), versi):
+            if lama is not None and lama[0] == id(jurnal) and jurnal.hanya_tambah_sejak(lama[1]):
+                self.sambung_turunan_jurnal(snapshot[len(st.session_state.transactions):])
+            else:
+                for kunci in ('saldo_cache', 'indeks_akun', 'saldo_berjalan'):
+                    st.session_state.pop(kunci, None)
+            st.session_state.transactions = snapshot
+        st.session_state.snapshot_jurnal = (id(jurnal), versi, versi_storage)
+        return snapshot
+
+    def ada_transaksi_jurnal(self):
+        """True kalau Jurnal Umum punya baris, termasuk yang sudah masuk snapshot periode tertutup"""
+        if 'transactions' not in st.session_state:
+            st.session_state.transactions = self.load_transactions_from_file()
+        # Saldo cache = snapshot periode tertutup + baris periode terbuka
+        return bool(st.session_state.transactions) or self.get_saldo_cache().jumlah_baris > 0
+
+    def versi_snapshot_jurnal(self):
+        """Versi storage dari snapshot jurnal yang dipegang session (untuk file cache turunan)"""
+        return st.session_state.snapshot_jurnal[2]
+
+    def sambung_turunan_jurnal(self, baris_baru):
+        """Tambahkan baris baru ke turunan session yang sudah ada (saldo, index, prefix sum)"""
+        saldo_cache = st.session_state.get('saldo_cache')
+        indeks_akun = st.session_state.get('indeks_akun')
+        saldo_berjalan = st.session_state.get('saldo_berjalan', {})
+        for trans in baris_baru:
+            if saldo_cache is not None:
+                saldo_cache.tambah(trans)
+            if indeks_akun is not None:
+                indeks_akun.tambah(trans)
+            if trans['akun'] in saldo_berjalan:
+                saldo_berjalan[trans['akun']].tambah(trans)
+
+    def tambah_transaksi_jurnal(self, entries):
+        """Posting baris jurnal baru ke jurnal bersama lalu sambung turunan session"""
+        # Turunan disiapkan dulu supaya posting ini cukup disambung, bukan dihitung ulang
+        self.get_saldo_cache()
+        self.get_indeks_akun()
         try:
-            with open('jurnal_umum_transactions.json', 'w') as f:
-                json.dump(st.session_state.transactions, f, indent=4)
+            self.get_jurnal_bersama().tambah(
+                BarisJurnal.dari_daftar(entries),
+                periksa=lambda: self.periksa_periode_terbuka(trans['tanggal'] for trans in entries)
+            )
         except Exception as e:
             st.error(f"Error menyimpan transaksi: {e}")
+            return False
+        # Ikut menyambung baris yang diposting session lain sejak snapshot session ini
+        self.sinkronkan_jurnal()
+        self.simpan_turunan_jurnal()
+        return True
 
-    def load_transactions_from_file(self):
-        """Load transaksi dari file JSON"""
+    def hapus_transaksi_tanggal(self, tanggal):
+        """Hapus semua baris jurnal pada tanggal tertentu"""
+        saldo_cache = self.get_saldo_cache()
+        indeks_akun = self.get_indeks_akun()
+        jurnal = self.get_jurnal_bersama()
+        snapshot_lama = st.session_state.transactions
+        versi_lama = st.session_state.snapshot_jurnal[1]
         try:
-            if os.path.exists('jurnal_umum_transactions.json'):
-                with open('jurnal_umum_transactions.json', 'r') as f:
-                    return json.load(f)
+            versi_dasar, (versi, snapshot, versi_storage) = jurnal.hapus_tanggal(
+                tanggal, periksa=lambda: self.periksa_periode_terbuka([tanggal])
+            )
+        except Exception as e:
+            st.error(f"Error menyimpan transaksi: {e}")
+            return False
+        
+        if versi_dasar == versi_lama:
+            # Yang dihapus tepat dari snapshot session: saldo cukup dikurangi baris yang hilang
+            saldo_berjalan = st.session_state.get('saldo_berjalan', {})
+            for trans in snapshot_lama:
+                if trans['tanggal'] == tanggal:
+                    saldo_cache.kurangi(trans)
+                    # Prefix sum akun ini disusun ulang saat dibuka lagi
+                    saldo_berjalan.pop(trans['akun'], None)
+            # Offset baris sesudah tanggal yang dihapus bergeser, index disusun ulang
+            indeks_akun.bangun_ulang(snapshot)
+            st.session_state.transactions = snapshot
+            st.session_state.snapshot_jurnal = (id(jurnal), versi, versi_storage)
+        # Session lain menulis lebih dulu: turunan session dibuang dan disusun ulang
+        self.sinkronkan_jurnal()
+        self.simpan_turunan_jurnal(simpan_indeks=True)
+        return True
+
+    def load_periode(self):
+        """Periode akuntansi (periods.json) dari cache proses; dibaca ulang hanya kalau file berubah"""
+        return muat_bila_berubah('periode', [self.periods_file], self.baca_periode)
+
+    def baca_periode(self):
+        if os.path.exists(self.periods_file):
+            with open(self.periods_file, 'r') as f:
+                return PeriodeAkuntansi(json.load(f))
+        return PeriodeAkuntansi()
+
+    def snapshot_periode(self):
+        """Snapshot saldo periode tertutup terakhir (saldo awal periode berjalan), None kalau belum ada"""
+        return self.load_periode().snapshot_terakhir()
+
+    def periksa_periode_terbuka(self, daftar_tanggal):
+        """Tolak penulisan jurnal bertanggal di periode yang sudah ditutup"""
+        periode = self.load_periode()
+        for tanggal in daftar_tanggal:
+            ordinal = tanggal_ke_ordinal(tanggal)
+            if periode.terkunci(ordinal):
+                nama = periode.snapshot_untuk(ordinal)[0]
+                raise ValueError(f"periode {nama} sudah ditutup (tanggal {tanggal}); buka kembali periode itu dulu")
+
+    def tutup_periode(self, sampai, tahunan=False):
+        """Tutup semua periode yang masih terbuka sampai periode `sampai`; return daftar periode yang ditutup.
+
+        Jurnal dikunci selama snapshot dihitung, jadi tidak ada posting yang terselip di antara
+        perhitungan saldo dan penutupan. Baris dikelompokkan per periode dalam satu kali sort.
+        """
+        jurnal = self.get_jurnal_bersama()
+        bagan = self.get_bagan_akun()
+        ditutup = []
+        
+        def ubah(data):
+            periode = PeriodeAkuntansi(data)
+            ditutup.clear()
+            awal = periode.snapshot_terakhir()
+            baris = sorted(
+                (trans for trans in snapshot if awal is None or urutan_tanggal(trans) > awal['akhir']),
+                key=urutan_tanggal
+            )
+            ordinal = [urutan_tanggal(trans) for trans in baris]
+            akhir_tujuan = periode.rentang(sampai)[1]
+            mulai = 0
+            while periode.rentang(periode.pertama_terbuka())[1] <= akhir_tujuan:
+                nama = periode.pertama_terbuka()
+                selesai = bisect_right(ordinal, periode.rentang(nama)[1])
+                # Hanya periode terakhir (Desember) yang menutup tahun
+                tutup_tahun = tahunan and periode.rentang(nama)[1] == akhir_tujuan
+                periode.tutup(nama, baris[mulai:selesai], tutup_tahun, bagan)
+                ditutup.append(nama)
+                mulai = selesai
+            data.clear()
+            data.update(periode.ke_dict())
+        
+        with jurnal.lock, self.storage.kunci_jurnal():
+            _, snapshot, _ = jurnal.ambil()
+            perbarui_json(self.periods_file, ubah)
+        return ditutup
+
+    def buka_periode(self, periode):
+        """Buka kembali periode yang sudah ditutup; return daftar periode yang ikut dibuka"""
+        dibuka = []
+        
+        def ubah(data):
+            periode_akuntansi = PeriodeAkuntansi(data)
+            dibuka[:] = periode_akuntansi.buka(periode)
+            data.clear()
+            data.update(periode_akuntansi.ke_dict())
+        
+        with self.get_jurnal_bersama().lock, self.storage.kunci_jurnal():
+            perbarui_json(self.periods_file, ubah)
+        return dibuka
+
+    def get_saldo_cache(self):
+        """Materialized view saldo per akun untuk session ini (dimuat dari file kalau masih cocok)"""
+        if 'saldo_cache' not in st.session_state:
+            saldo_cache = SaldoAkunCache(self.saldo_cache_file)
+            versi = self.versi_snapshot_jurnal()
+            if not saldo_cache.muat(versi):
+                self.bangun_ulang_saldo_cache(saldo_cache)
+            st.session_state.saldo_cache = saldo_cache
+        return st.session_state.saldo_cache
+
+    def bangun_ulang_saldo_cache(self, saldo_cache):
+        """Hitung ulang saldo cache dari seluruh Jurnal Umum lalu simpan"""
+        if 'transactions' not in st.session_state:
+            st.session_state.transactions = self.load_transactions_from_file()
+        
+        # Mulai dari snapshot periode tertutup terakhir, bukan dari baris pertama jurnal
+        awal = self.snapshot_periode()
+        if self.storage.mendukung_query:
+            # Agregasi SUM ... GROUP BY akun langsung di database, hanya baris periode terbuka
+            sejak = awal['akhir'] if awal else None
+            saldo_cache.saldo = dict(awal['saldo']) if awal else {}
+            for akun, nilai in self.storage.saldo_mentah_per_akun(sejak).items():
+                saldo_cache.saldo[akun] = saldo_cache.saldo.get(akun, 0) + nilai
+            total_debit, total_kredit, jumlah_baris = self.storage.total_jurnal(sejak)
+            saldo_cache.total_debit = (awal['total_debit'] if awal else 0) + total_debit
+            saldo_cache.total_kredit = (awal['total_kredit'] if awal else 0) + total_kredit
+            saldo_cache.jumlah_baris = (awal['jumlah_baris'] if awal else 0) + jumlah_baris
+        else:
+            saldo_cache.bangun_ulang(st.session_state.transactions, awal)
+        
+        try:
+            saldo_cache.simpan(self.versi_snapshot_jurnal())
+        except Exception as e:
+            st.error(f"Error menyimpan saldo cache: {e}")
+
+    def simpan_turunan_jurnal(self, simpan_indeks=False):
+        """Simpan saldo cache (dan index akun bila diminta) setelah jurnal ditulis.
+
+        Versi yang dicatat adalah versi snapshot session, bukan versi storage saat ini,
+        jadi posting session lain di sela-selanya tidak membuat file cache salah label.
+        """
+        versi = self.versi_snapshot_jurnal()
+        try:
+            self.get_saldo_cache().simpan(versi)
+            if simpan_indeks:
+                self.get_indeks_akun().simpan(versi)
+        except Exception as e:
+            st.error(f"Error menyimpan saldo cache: {e}")
+
+    def get_indeks_akun(self):
+        """Index posting per akun untuk session ini, disambung dari file kalau memungkinkan"""
+        if 'indeks_akun' not in st.session_state:
+            if 'transactions' not in st.session_state:
+                st.session_state.transactions = self.load_transactions_from_file()
+            transactions = st.session_state.transactions
+            
+            indeks_akun = IndeksAkun(self.indeks_akun_file)
+            versi = self.versi_snapshot_jurnal()
+            if not indeks_akun.muat():
+                self.bangun_ulang_indeks_akun(indeks_akun)
+            elif indeks_akun.versi != versi:
+                if (indeks_akun.jumlah_baris <= len(transactions)
+                        and self.storage.hanya_tambah_sejak(indeks_akun.versi)):
+                    # Sejak index disimpan jurnal hanya bertambah di akhir: cukup sambung
+                    for trans in transactions[indeks_akun.jumlah_baris:]:
+                        indeks_akun.tambah(trans)
+                    self.simpan_indeks_akun(indeks_akun)
+                else:
+                    self.bangun_ulang_indeks_akun(indeks_akun)
+            st.session_state.indeks_akun = indeks_akun
+        return st.session_state.indeks_akun
+
+    def bangun_ulang_indeks_akun(self, indeks_akun):
+        """Susun ulang index akun dari seluruh Jurnal Umum lalu simpan"""
+        indeks_akun.bangun_ulang(st.session_state.transactions)
+        st.session_state.saldo_berjalan = {}
+        self.simpan_indeks_akun(indeks_akun)
+
+    def get_saldo_berjalan(self, akun):
+        """Prefix sum saldo satu akun, disusun sekali lalu dipelihara per posting"""
+        # Index dimuat dulu: kalau ternyata disusun ulang, prefix sum lama ikut dibuang
+        indeks_akun = self.get_indeks_akun()
+        # Prefix sum dimulai dari snapshot periode tertutup: disusun ulang kalau snapshot berganti
+        awal = self.snapshot_periode()
+        tanda_awal = (awal['akhir'], awal['waktu']) if awal else None
+        if 'saldo_berjalan' not in st.session_state or st.session_state.get('saldo_berjalan_awal') != tanda_awal:
+            st.session_state.saldo_berjalan = {}
+            st.session_state.saldo_berjalan_awal = tanda_awal
+        saldo_berjalan = st.session_state.saldo_berjalan
+        if akun not in saldo_berjalan:
+            if self.storage.mendukung_query:
+                transaksi_akun = self.storage.transaksi_akun(akun, awal['akhir'] if awal else None)
             else:
-                return []
+                transaksi_akun = indeks_akun.baris_akun(st.session_state.transactions, akun)
+            saldo_awal = 0
+            if awal:
+                # Periode tertutup diwakili saldo snapshot; hanya baris sesudahnya yang disusun
+                transaksi_akun = [trans for trans in transaksi_akun if urutan_tanggal(trans) > awal['akhir']]
+                saldo_awal = awal['saldo'].get(akun, 0)
+            saldo_berjalan[akun] = SaldoBerjalan(transaksi_akun, saldo_awal)
+        return saldo_berjalan[akun]
+
+    def simpan_indeks_akun(self, indeks_akun):
+        try:
+            indeks_akun.simpan(self.versi_snapshot_jurnal())
+        except Exception as e:
+            st.error(f"Error menyimpan index akun: {e}")
+
+    def verifikasi_saldo_cache(self):
+        """Mode verifikasi: hitung ulang saldo dari nol dan laporkan drift terhadap cache"""
+        if 'transactions' not in st.session_state:
+            st.session_state.transactions = self.load_transactions_from_file()
+        # Dari nol = seluruh riwayat di storage, termasuk periode tertutup yang tidak dimuat ke session;
+        # akun nominal tahun yang sudah ditutup dihitung di modal, sama seperti snapshot
+        transactions = self.load_periode().terapkan_tutup_tahun(self.storage.load_jurnal(), self.get_bagan_akun())
+        return self.get_saldo_cache().verifikasi(transactions)
+
+    def load_jurnal_lengkap(self):
+        """Seluruh riwayat Jurnal Umum, termasuk periode tertutup, untuk agregat yang tidak bisa
+        dimulai dari snapshot saldo (mis. total mutasi debit per akun).
+
+        Selama belum ada periode tertutup ini sama dengan snapshot session. Kalau ada, riwayat
+        dibaca dari storage sekali lalu di-cache di proses sampai versi jurnal berubah.
+        """
+        if self.snapshot_periode() is None:
+            return self.load_transactions_from_file()
+        cache = sumber_daya_proses()
+        kunci = ('jurnal_lengkap', id(self.storage))
+        versi = self.storage.versi_jurnal()
+        entri = cache.get(kunci)
+        if entri is None or entri[0] != versi:
+            entri = cache[kunci] = (versi, tuple(BarisJurnal.dari_daftar(self.storage.load_jurnal())))
+        return entri[1]
+
+    def load_transactions_from_file(self):
+        """Snapshot Jurnal Umum terbaru dari jurnal bersama proses (tuple BarisJurnal)"""
+        try:
+            return self.sinkronkan_jurnal()
         except Exception as e:
             st.error(f"Error loading transaksi: {e}")
             return []
         
+    def get_bagan_akun(self):
+        """Bagan akun bersama semua session, disusun ulang hanya kalau accounts.json berubah"""
+        try:
+            return bagan_akun_storage(self.storage)
+        except Exception as e:
+            st.error(f"Error memuat bagan akun: {e}")
+            return BaganAkun()
+
     def is_akun_debit(self, nama_akun):
-        """Tentukan apakah akun termasuk jenis Debit (Aset & Beban)"""
-        akun_debit = [
-            # ASET
-            "Kas", "Bank", "Piutang Usaha", "Persediaan", "Perlengkapan",
-            "Peralatan", "Gedung", "Tanah", "Kendaraan", "Mesin", "Inventaris",
-            
-            # BEBAN 
-            "Beban Gaji", "Beban Sewa", "Beban Listrik", "Beban Air", 
-            "Beban Telepon", "Beban Transportasi", "Beban Perlengkapan",
-            "Beban Penyusutan Gedung", "Beban Penyusutan Peralatan", 
-            "Beban Penyusutan Kendaraan", "Beban Penyusutan Mesin", 
-            "Beban Penyusutan Inventaris", "Beban Lainnya", "Beban","Beban vitamin", 
-            "Beban pakan", "Beban Pengiriman", "Beban Vitamin", "Beban Vitamain",  
-            "Beban Perbaikan", "Beban perawatan Kandang", "Beban perawatan kadang",
-            
-            # PEMBELIAN
-            "Pembelian",
-            
-            # PRIVE
-            "Prive"
-        ]
-        return nama_akun in akun_debit
-    
+        """Tentukan apakah akun bersaldo normal Debit (Aset, Beban, Pembelian, Prive)"""
+        return self.get_bagan_akun().normal_debit(nama_akun)
+
+    def is_akun_riil(self, nama_akun):
+        """Tentukan apakah akun riil (tidak ditutup di akhir periode)"""
+        return not self.get_bagan_akun().nominal(nama_akun)
+
     def show_buku_besar(self):
         st.title("📚 BUKU BESAR")
         
@@ -704,7 +3944,7 @@ class ModernLoginApp:
         if 'transactions' not in st.session_state:
             st.session_state.transactions = self.load_transactions_from_file()
         
-        if not st.session_state.transactions:
+        if not self.ada_transaksi_jurnal():
             st.info("📭 Belum ada transaksi di Jurnal Umum")
             return
         
@@ -734,9 +3974,12 @@ class ModernLoginApp:
             "Akumulasi Penyusutan Inventaris": "🏢", "Pendapatan Diterima di Muka": "💰"
         }
         
-        # Dapatkan semua akun yang ada transaksinya
-        akun_list = list(set(trans['akun'] for trans in st.session_state.transactions))
-        akun_list.sort()
+        # Dapatkan semua akun yang ada transaksinya (dari index akun, tanpa scan jurnal)
+        # ditambah akun yang masih bersaldo di snapshot periode tertutup
+        indeks_akun = self.get_indeks_akun()
+        periode = self.load_periode()
+        awal = periode.snapshot_terakhir()
+        akun_list = sorted(set(indeks_akun.daftar_akun()) | set(awal['saldo'] if awal else ()))
         
         # Dropdown pilih akun dengan emoji
         akun_options = [f"{akun_emoji.get(akun, '📄')} {akun}" for akun in akun_list]
@@ -754,21 +3997,40 @@ class ModernLoginApp:
         
         st.markdown(f"### {akun_emoji.get(selected_akun, '📄')} {selected_akun}")
         
-        # Filter transaksi untuk akun yang dipilih
-        transaksi_akun = [trans for trans in st.session_state.transactions if trans['akun'] == selected_akun]
+        # Saldo berjalan akun yang dipilih (prefix sum urut tanggal)
+        saldo_berjalan = self.get_saldo_berjalan(selected_akun)
         
-        if not transaksi_akun:
+        if not len(saldo_berjalan) and not saldo_berjalan.saldo_awal:
             st.info(f"📭 Tidak ada transaksi untuk akun {selected_akun}")
             return
         
-        def parse_date(date_str):
-            try:
-                return datetime.strptime(date_str, "%d %B %Y")
-            except:
-                return datetime.min
+        # ✅ AKUN DEBIT (Aset & Beban): Debit MENAMBAH, Kredit MENGURANGI
+        # AKUN KREDIT (Kewajiban, Modal, Pendapatan): Kredit MENAMBAH, Debit MENGURANGI
+        tanda = 1 if self.is_akun_debit(selected_akun) else -1
         
-        # Urutkan transaksi berdasarkan tanggal (dari terlama ke terbaru)
-        transaksi_akun_sorted = sorted(transaksi_akun, key=lambda x: parse_date(x['tanggal']))
+        # NAVIGASI HALAMAN & SALDO PER TANGGAL
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            ukuran_halaman = st.selectbox("Baris per halaman:", [25, 50, 100, 250], index=1, key="buku_besar_ukuran")
+        jumlah_halaman = saldo_berjalan.jumlah_halaman(ukuran_halaman)
+        with col2:
+            nomor_halaman = st.number_input(
+                f"Halaman (dari {jumlah_halaman}):",
+                min_value=1, max_value=jumlah_halaman, value=1, step=1,
+                key="buku_besar_halaman"
+            )
+        with col3:
+            tanggal_saldo = st.date_input("Saldo per tanggal:", value=datetime.now(), key="buku_besar_tanggal")
+        
+        ordinal_saldo = tanggal_saldo.toordinal()
+        if periode.terkunci(ordinal_saldo):
+            # Baris periode tertutup tidak disusun lagi: pakai snapshot akhir periode tersebut
+            nama_periode, snapshot = periode.snapshot_untuk(ordinal_saldo)
+            saldo_tanggal = tanda * dari_sen(snapshot['saldo'].get(selected_akun, 0))
+            st.info(f"📅 Saldo {selected_akun} per akhir periode {nama_periode} (ditutup): **Rp{abs(saldo_tanggal):,.0f}**")
+        else:
+            saldo_tanggal = tanda * saldo_berjalan.saldo_per_tanggal(ordinal_saldo)
+            st.info(f"📅 Saldo {selected_akun} per {tanggal_saldo.strftime('%d %B %Y')}: **Rp{abs(saldo_tanggal):,.0f}**")
         
         # HEADER TABEL
         st.markdown("---")
@@ -781,17 +4043,15 @@ class ModernLoginApp:
         with col6: st.write("**SALDO**")
         st.markdown("---")
         
-        # ✅ PERBAIKAN BESAR: LOGIKA PERHITUNGAN SALDO YANG BENAR
-        saldo = 0
+        if awal and int(nomor_halaman) == 1:
+            col1, col2, col3, col4, col5, col6 = st.columns([2, 3, 1, 1.5, 1.5, 1.5])
+            with col1: st.write(datetime.fromordinal(awal['akhir'] + 1).strftime('%d %B %Y'))
+            with col2: st.write(f"Saldo Awal (penutupan {periode.terakhir_ditutup()})")
+            with col6: st.write(f"**Rp{abs(tanda * dari_sen(saldo_berjalan.saldo_awal)):,.0f}**")
         
-        for trans in transaksi_akun_sorted:
-            # ✅ TENTUKAN JENIS AKUN DAN HITUNG SALDO
-            if self.is_akun_debit_buku_besar(selected_akun):
-                # AKUN DEBIT (Aset & Beban): Debit MENAMBAH, Kredit MENGURANGI
-                saldo += trans['debit'] - trans['kredit']
-            else:
-                # AKUN KREDIT (Kewajiban, Modal, Pendapatan): Kredit MENAMBAH, Debit MENGURANGI
-                saldo += trans['kredit'] - trans['debit']
+        baris_halaman, saldo_halaman = saldo_berjalan.halaman(int(nomor_halaman), ukuran_halaman)
+        for trans, saldo_mentah in zip(baris_halaman, saldo_halaman):
+            saldo = tanda * saldo_mentah
             
             # Tampilkan transaksi
             col1, col2, col3, col4, col5, col6 = st.columns([2, 3, 1, 1.5, 1.5, 1.5])
@@ -812,10 +4072,11 @@ class ModernLoginApp:
                 # Tampilkan saldo dengan format yang benar
                 st.write(f"**Rp{abs(saldo):,.0f}**")
         
+        saldo = tanda * saldo_berjalan.saldo_akhir
         st.markdown("---")
         
         # ✅ PERBAIKAN: TAMPILKAN JENIS SALDO YANG BENAR
-        if self.is_akun_debit_buku_besar(selected_akun):
+        if self.is_akun_debit(selected_akun):
             # Untuk akun debit, saldo positif = Debit, saldo negatif = Kredit
             if saldo >= 0:
                 jenis_saldo = "Debit"
@@ -834,48 +4095,6 @@ class ModernLoginApp:
         
         st.success(f"{warna} **Saldo Akhir {selected_akun}: Rp{abs(saldo):,.0f} ({jenis_saldo})**")
 
-    def is_akun_debit_buku_besar(self, nama_akun):
-        """Tentukan apakah akun termasuk jenis Debit untuk Buku Besar - VERSI DIPERBAIKI"""
-        
-        # ✅ LIST AKUN DEBIT YANG KOMPREHENSIF
-        akun_debit = [
-            # ASET (AKTIVA)
-            "Kas", "Bank", "Piutang Usaha", "Persediaan", "Perlengkapan",
-            "Peralatan", "Gedung", "Tanah", "Kendaraan", "Mesin", "Inventaris",
-            "Sewa Bayar di Muka", "Piutang", "Beban Dibayar di Muka",
-            
-            # BEBAN (BIAYA)
-            "Beban Gaji", "Beban Sewa", "Beban Listrik", "Beban Air", 
-            "Beban Telepon", "Beban Transportasi", "Beban Perlengkapan",
-            "Beban Penyusutan Gedung", "Beban Penyusutan Peralatan", 
-            "Beban Penyusutan Kendaraan", "Beban Penyusutan Mesin", 
-            "Beban Penyusutan Inventaris", "Beban Lainnya", "Beban",
-            "Beban pakan", "Beban Pengiriman", "Beban Vitamin", "Beban Vitamain",
-            "Beban Perbaikan", "Beban perawatan Kandang", "Beban perawatan kadang",
-            "Beban Obat", "Beban obat", "Beban vitamin",
-            
-            # PEMBELIAN & PRIVE
-            "Pembelian", "Prive"
-        ]
-        
-        # ✅ LOGIKA DETECTION YANG LEBIH BAIK
-        # 1. Cek berdasarkan list lengkap
-        if nama_akun in akun_debit:
-            return True
-        
-        # 2. Cek berdasarkan keyword untuk Beban
-        if "Beban" in nama_akun:
-            return True
-            
-        # 3. Cek berdasarkan keyword untuk Aset
-        aset_keywords = ["Kas", "Bank", "Piutang", "Persediaan", "Perlengkapan", 
-                        "Peralatan", "Gedung", "Tanah", "Kendaraan", "Mesin", "Inventaris"]
-        if any(keyword in nama_akun for keyword in aset_keywords):
-            return True
-        
-        # Default: akun kredit
-        return False
-
     def show_neraca_saldo(self):
         st.title("⚖️ NERACA SALDO")
         
@@ -883,7 +4102,7 @@ class ModernLoginApp:
         if 'transactions' not in st.session_state:
             st.session_state.transactions = self.load_transactions_from_file()
         
-        if not st.session_state.transactions:
+        if not self.ada_transaksi_jurnal():
             st.info("📭 Belum ada transaksi di Jurnal Umum")
             return
 
@@ -949,58 +4168,36 @@ class ModernLoginApp:
         col1, col2, col3 = st.columns([3, 2, 2])
         with col1: st.write("**TOTAL**")
         with col2: st.write(f"**Rp{total_debit:,.0f}**")
-        with col3: st.write(f"**Rp{total_kredit:,.0f}**")
-        st.markdown("---")
-
-        # STATUS SEIMBANG
-        selisih = abs(total_debit - total_kredit)
-        if total_debit == total_kredit:
-            st.success(f"✅ **SEIMBANG** - Debit = Kredit")
-        else:
-            st.error(f"❌ **TIDAK SEIMBANG** - Selisih: Rp{selisih:,.0f}")
-
-    def hitung_saldo_semua_akun(self):
-        """Hitung saldo semua akun dari data Jurnal Umum"""
-        saldo_akun = {}
-        
-        for trans in st.session_state.transactions:
-            akun = trans['akun']
-            debit = trans['debit']
-            kredit = trans['kredit']
-            
-            if akun not in saldo_akun:
-                saldo_akun[akun] = 0
-            
-            if self.is_akun_debit(akun):
-                saldo_akun[akun] += debit - kredit
-            else:
-                saldo_akun[akun] += kredit - debit
-        
-        # Hapus akun dengan saldo 0
-        saldo_akun = {akun: saldo for akun, saldo in saldo_akun.items() if saldo != 0}
-        
-        return saldo_akun
+        with col3: st.write(f"**Rp{total_kredit:,.0f}**")
+        st.markdown("---")
 
-    def is_akun_debit(self, nama_akun):
-        """Tentukan apakah akun termasuk jenis Debit (Aset & Beban)"""
-        akun_debit = [
-            "Kas", "Perlengkapan", "Piutang", "Sewa Bayar di Muka",
-            "Beban Gaji", "Beban Utilitas", "Beban"
-        ]
-        return nama_akun in akun_debit
+        # STATUS SEIMBANG
+        selisih = abs(total_debit - total_kredit)
+        if total_debit == total_kredit:
+            st.success(f"✅ **SEIMBANG** - Debit = Kredit")
+        else:
+            st.error(f"❌ **TIDAK SEIMBANG** - Selisih: Rp{selisih:,.0f}")
+
+        # VERIFIKASI SALDO CACHE
+        with st.expander("🔍 Verifikasi Saldo (hitung ulang dari nol)"):
+            col_verif, col_rebuild = st.columns(2)
+            with col_verif:
+                if st.button("🔍 Jalankan Verifikasi", use_container_width=True, key="verifikasi_saldo"):
+                    drift = self.verifikasi_saldo_cache()
+                    if not drift:
+                        st.success("✅ Saldo cache cocok dengan perhitungan ulang")
+                    else:
+                        st.error(f"❌ Ditemukan selisih pada {len(drift)} akun")
+                        df_drift = pd.DataFrame([
+                            {"Akun": akun, "Cache": nilai_cache, "Hitung Ulang": nilai_benar}
+                            for akun, (nilai_cache, nilai_benar) in sorted(drift.items())
+                        ])
+                        st.dataframe(df_drift, use_container_width=True, hide_index=True)
+            with col_rebuild:
+                if st.button("🔄 Bangun Ulang Cache", use_container_width=True, key="bangun_ulang_saldo"):
+                    self.bangun_ulang_saldo_cache(self.get_saldo_cache())
+                    st.success("✅ Saldo cache sudah dihitung ulang")
 
-    def load_transactions_from_file(self):
-        """Load transaksi dari file JSON"""
-        try:
-            if os.path.exists('jurnal_umum_transactions.json'):
-                with open('jurnal_umum_transactions.json', 'r') as f:
-                    return json.load(f)
-            else:
-                return []
-        except Exception as e:
-            st.error(f"Error loading transaksi: {e}")
-            return []
-        
     def show_jurnal_penyesuaian(self):
         st.title("📋 JURNAL PENYESUAIAN")
         
@@ -1040,8 +4237,10 @@ class ModernLoginApp:
                     with col4: st.error(f"Rp{trans['kredit']:,.0f}")
                     with col5:
                         if st.button("🗑️", key=f"del_penyesuaian_{i}"):
-                            st.session_state.penyesuaian_transactions.pop(i)
-                            self.save_penyesuaian_to_file()
+                            # Dihapus berdasarkan isinya: posisi di file bisa bergeser karena session lain
+                            self.save_penyesuaian_to_file(
+                                lambda daftar, trans=trans: trans in daftar and daftar.remove(trans)
+                            )
                             st.rerun()
                     
                     if 'perhitungan' in trans:
@@ -1118,8 +4317,7 @@ class ModernLoginApp:
                     'perhitungan': f"Harga: Rp{harga_perolehan:,.0f} | Residu: {persentase_residu*100}% | Umur: {umur_ekonomis} tahun"
                 }
                 
-                st.session_state.penyesuaian_transactions.append(new_trans)
-                self.save_penyesuaian_to_file()
+                self.save_penyesuaian_to_file(lambda daftar: daftar.append(new_trans))
                 
                 st.success("✅ Jurnal Penyesuaian Berhasil Dibuat!")
                 st.balloons()
@@ -1170,8 +4368,7 @@ class ModernLoginApp:
                     'perhitungan': f"{saldo_awal_perlengkapan:,.0f} + {pembelian_perlengkapan:,.0f} - {perlengkapan_akhir:,.0f} = Rp{pemakaian:,.0f}"
                 }
                 
-                st.session_state.penyesuaian_transactions.append(new_trans)
-                self.save_penyesuaian_to_file()
+                self.save_penyesuaian_to_file(lambda daftar: daftar.append(new_trans))
                 st.success("✅ Jurnal Penyesuaian Berhasil Dibuat!")
 
     def show_sewa_form(self):
@@ -1244,11 +4441,7 @@ class ModernLoginApp:
                     'perhitungan': f"Alokasi Proporsional: ({total_sewa:,.0f} / {periode_sewa} bulan) × {bulan_berjalan} bulan = Rp{beban_sewa:,.0f}"
                 }
                 
-                if 'penyesuaian_transactions' not in st.session_state:
-                    st.session_state.penyesuaian_transactions = []
-                
-                st.session_state.penyesuaian_transactions.append(new_trans)
-                self.save_penyesuaian_to_file()
+                self.save_penyesuaian_to_file(lambda daftar: daftar.append(new_trans))
                 st.success("✅ Jurnal Sewa Berhasil Dibuat!")
                 st.rerun()
                 
@@ -1287,8 +4480,15 @@ class ModernLoginApp:
                     st.error("❌ Tidak ada pendapatan yang bisa diakui")
                     return
                 
+                if st.session_state.transactions:
+                    tanggal = st.session_state.transactions[0]['tanggal']
+                else:
+                    # Semua baris sudah di periode tertutup: pakai hari pertama periode terbuka
+                    awal_terbuka = PeriodeAkuntansi.rentang(self.load_periode().pertama_terbuka())[0]
+                    tanggal = datetime.fromordinal(awal_terbuka).strftime('%d %B %Y')
+                
                 new_trans = {
-                    'tanggal': st.session_state.transactions[0]['tanggal'],  # ✅ GANTI INI
+                    'tanggal': tanggal,
                     'jenis': 'Pendapatan Diterima di Muka',
                     'akun_debit': "Pendapatan Diterima di Muka",
                     'akun_kredit': "Pendapatan", 
@@ -1297,52 +4497,33 @@ class ModernLoginApp:
                     'perhitungan': f"{total_pendapatan:,.0f} × {persentase_selesai}% = Rp{pendapatan_diakui:,.0f}"
                 }
                                 
-                st.session_state.penyesuaian_transactions.append(new_trans)
-                self.save_penyesuaian_to_file()
+                self.save_penyesuaian_to_file(lambda daftar: daftar.append(new_trans))
                 st.success("✅ Jurnal Penyesuaian Berhasil Dibuat!")
 
     def hitung_saldo_semua_akun(self):
         """Hitung saldo semua akun dari data Jurnal Umum"""
         saldo_akun = {}
         
-        for trans in st.session_state.transactions:
-            akun = trans['akun']
-            debit = trans['debit']
-            kredit = trans['kredit']
-            
-            if akun not in saldo_akun:
-                saldo_akun[akun] = 0
-            
-            if self.is_akun_debit(akun):
-                saldo_akun[akun] += debit - kredit
-            else:
-                saldo_akun[akun] += kredit - debit
+        # Saldo mentah (debit - kredit, sen) diambil dari materialized view, tidak loop semua baris
+        for akun, saldo_mentah in self.get_saldo_cache().saldo.items():
+            saldo_akun[akun] = dari_sen(saldo_mentah if self.is_akun_debit(akun) else -saldo_mentah)
         
         # Hapus akun dengan saldo 0
         saldo_akun = {akun: saldo for akun, saldo in saldo_akun.items() if saldo != 0}
         
         return saldo_akun
 
-    def is_akun_debit(self, nama_akun):
-        """Tentukan apakah akun termasuk jenis Debit (Aset & Beban)"""
-        akun_debit = [
-            "Kas", "Perlengkapan", "Piutang", "Sewa Dibayar di Muka",
-            "Peralatan", "Kendaraan", "Gedung", "Mesin", "Inventaris",
-            "Beban Gaji", "Beban Utilitas", "Beban Perlengkapan", "Beban Sewa",
-            "Beban Penyusutan Peralatan", "Beban Penyusutan Kendaraan",
-            "Beban Penyusutan Gedung", "Beban Penyusutan Mesin", "Beban Penyusutan Inventaris"
-        ]
-        return nama_akun in akun_debit
-
     def hitung_pembelian_perlengkapan(self):
         """Hitung pembelian perlengkapan dengan cara YANG BENAR"""
         total_pembelian = 0
+        # Jumlah pembelian kumulatif: termasuk periode tertutup yang tidak ada di session
+        transactions = self.load_jurnal_lengkap()
         
         # Cara YANG PALING AMAN: hanya hitung dari Jurnal Umum (bukan penyesuaian)
-        for i in range(0, len(st.session_state.transactions) - 1, 2):
+        for i in range(0, len(transactions) - 1, 2):
             try:
-                trans1 = st.session_state.transactions[i]
-                trans2 = st.session_state.transactions[i + 1]
+                trans1 = transactions[i]
+                trans2 = transactions[i + 1]
                 
                 # Jika ini transaksi pembelian perlengkapan
                 if (trans1['akun'] == "Perlengkapan" and trans1['debit'] > 0 and
@@ -1360,37 +4541,33 @@ class ModernLoginApp:
         
         return total_pembelian
 
-    def save_penyesuaian_to_file(self):
-        """Simpan jurnal penyesuaian ke file"""
+    def save_penyesuaian_to_file(self, ubah):
+        """Terapkan ubah(daftar) ke jurnal penyesuaian terbaru di storage lalu simpan.
+
+        Perubahan dikirim sebagai fungsi, bukan daftar milik session, supaya penyesuaian
+        yang disimpan session/worker lain sejak daftar ini dimuat tidak tertimpa.
+        """
+        # Tanggal penyesuaian ('31 December') tidak bertahun: pakai tahun periode akuntansi
+        tahun = self.tahun_periode()
+        
+        def ubah_dan_normalisasi(daftar):
+            ubah(daftar)
+            for pen in daftar:
+                normalisasi_baris(pen, tahun)
+        
         try:
-            with open('penyesuaian_transactions.json', 'w') as f:
-                json.dump(st.session_state.penyesuaian_transactions, f, indent=4)
+            st.session_state.penyesuaian_transactions = self.storage.perbarui_penyesuaian(ubah_dan_normalisasi)
         except Exception as e:
             st.error(f"Error menyimpan penyesuaian: {e}")
 
     def load_penyesuaian_from_file(self):
-        """Load jurnal penyesuaian dari file"""
+        """Load jurnal penyesuaian dari storage"""
         try:
-            if os.path.exists('penyesuaian_transactions.json'):
-                with open('penyesuaian_transactions.json', 'r') as f:
-                    return json.load(f)
-            else:
-                return []
+            return self.storage.load_penyesuaian()
         except Exception as e:
             st.error(f"Error loading penyesuaian: {e}")
             return []
 
-    def load_transactions_from_file(self):
-        """Load transaksi dari file JSON"""
-        try:
-            if os.path.exists('jurnal_umum_transactions.json'):
-                with open('jurnal_umum_transactions.json', 'r') as f:
-                    return json.load(f)
-            else:
-                return []
-        except Exception as e:
-            st.error(f"Error loading transaksi: {e}")
-            return []
         
     def show_neraca_setelah_penyesuaian(self):
         st.title("⚖️ NERACA SETELAH PENYESUAIAN")
@@ -1399,45 +4576,10 @@ class ModernLoginApp:
         if 'transactions' not in st.session_state:
             st.session_state.transactions = self.load_transactions_from_file()
         
-        saldo_neraca = self.hitung_saldo_semua_akun()  # Dari jurnal umum
-        
-        # 2. AMBIL DATA DARI JURNAL PENYESUAIAN  
+        # 2. SALDO SETELAH JURNAL PENYESUAIAN (snapshot laporan bersama)
+        saldo_akhir = self.hitung_snapshot_laporan()['saldo_setelah_penyesuaian']
         penyesuaian = self.load_penyesuaian_from_file()
         
-        # 3. GABUNGKAN & HITUNG SALDO AKHIR - PERHATIKAN DEBIT/KREDIT!
-        saldo_akhir = saldo_neraca.copy()  # Saldo awal dari neraca
-        
-        for pen in penyesuaian:
-            # PROSES AKUN DEBIT dari penyesuaian
-            akun_debit = pen['akun_debit']
-            if self.is_akun_debit(akun_debit):
-                # Akun debit (Aset/Beban): bertambah di DEBIT
-                if akun_debit in saldo_akhir:
-                    saldo_akhir[akun_debit] += pen['debit']
-                else:
-                    saldo_akhir[akun_debit] = pen['debit']
-            else:
-                # Akun kredit (Kewajiban/Modal/Pendapatan): berkurang di DEBIT
-                if akun_debit in saldo_akhir:
-                    saldo_akhir[akun_debit] -= pen['debit']
-                else:
-                    saldo_akhir[akun_debit] = -pen['debit']
-                
-            # PROSES AKUN KREDIT dari penyesuaian  
-            akun_kredit = pen['akun_kredit']
-            if self.is_akun_debit(akun_kredit):
-                # Akun debit (Aset/Beban): berkurang di KREDIT
-                if akun_kredit in saldo_akhir:
-                    saldo_akhir[akun_kredit] -= pen['kredit']
-                else:
-                    saldo_akhir[akun_kredit] = -pen['kredit']
-            else:
-                # Akun kredit (Kewajiban/Modal/Pendapatan): bertambah di KREDIT
-                if akun_kredit in saldo_akhir:
-                    saldo_akhir[akun_kredit] += pen['kredit']
-                else:
-                    saldo_akhir[akun_kredit] = pen['kredit']
-        
         if not saldo_akhir:
             st.info("📭 Belum ada data untuk Neraca Setelah Penyesuaian")
             return
@@ -1534,29 +4676,6 @@ class ModernLoginApp:
                         st.write(f"   📊 {pen['perhitungan']}")
                     st.write("")
 
-    def is_akun_debit(self, nama_akun):
-        """Tentukan apakah akun termasuk jenis Debit (Aset & Beban) - LEBIH LENGKAP"""
-        akun_debit = [
-            # ASET
-            "Kas", "Bank", "Piutang Usaha", "Persediaan", "Perlengkapan",
-            "Peralatan", "Gedung", "Tanah", "Kendaraan", "Mesin", "Inventaris",
-            "Sewa Bayar di Muka", 
-            
-            # BEBAN
-            "Beban Gaji", "Beban Sewa", "Beban Listrik", "Beban Air", 
-            "Beban Telepon", "Beban Transportasi", "Beban Perlengkapan",
-            "Beban Penyusutan Gedung", "Beban Penyusutan Peralatan", 
-            "Beban Penyusutan Kendaraan", "Beban Penyusutan Mesin", 
-            "Beban Penyusutan Inventaris", "Beban Lainnya", "Beban",
-            
-            # PEMBELIAN
-            "Pembelian",
-            
-            # PRIVE
-            "Prive"
-        ]
-        return nama_akun in akun_debit
-
     def show_laporan_keuangan(self):
         st.title("📊 LAPORAN KEUANGAN")
         
@@ -1588,58 +4707,86 @@ class ModernLoginApp:
             self.show_posisi_keuangan(data_keuangan)
 
     def hitung_data_laporan_keuangan(self):
-        """Hitung semua data yang dibutuhkan untuk laporan keuangan - VERSI LENGKAP DENGAN HPP"""
+        """Data laporan keuangan dari snapshot laporan bersama"""
+        return self.hitung_snapshot_laporan()['data_keuangan']
+
+    def kunci_laporan(self):
+        # Klasifikasi akun lewat BaganAkun (tipe di file akun) dan tutup tahun (periods.json)
+        # ikut menentukan isi laporan, jadi tanda kedua file itu bagian dari kunci
+        settings = self.load_system_settings()
+        return json.dumps([
+            self.versi_snapshot_jurnal(), self.storage.versi_penyesuaian(),
+            settings.get('periode_mulai'), settings.get('periode_akhir'),
+            tanda_berkas(self.storage.berkas_data('akun') + [self.periods_file])
+        ], sort_keys=True)
+
+    def hitung_snapshot_laporan(self):
+        """Satu snapshot untuk Laporan Keuangan, Jurnal Penutup dan Neraca Saldo Akhir.
+
+        Dihitung sekali per (versi jurnal, versi penyesuaian, periode, file akun) lalu disimpan di
+        cache LRU session; tampilan berikutnya memakai snapshot yang sama.
+        """
+        if 'cache_laporan' not in st.session_state:
+            st.session_state.cache_laporan = CacheLaporan()
+        cache_laporan = st.session_state.cache_laporan
+        
+        kunci = self.kunci_laporan()
+        snapshot = cache_laporan.ambil(kunci)
+        if snapshot is None:
+            saldo_akhir = self.hitung_saldo_setelah_penyesuaian()
+            snapshot = {
+                'saldo_setelah_penyesuaian': saldo_akhir,
+                'data_keuangan': self.susun_data_laporan_keuangan(saldo_akhir)
+            }
+            cache_laporan.simpan(kunci, snapshot)
+        return snapshot
+
+    def hitung_saldo_setelah_penyesuaian(self):
+        """Saldo Jurnal Umum ditambah semua Jurnal Penyesuaian"""
         
         # 1. Ambil data Neraca Setelah Penyesuaian
         if 'transactions' not in st.session_state:
             st.session_state.transactions = self.load_transactions_from_file()
         
         saldo_neraca = self.hitung_saldo_semua_akun()  # Dari jurnal umum
-        penyesuaian = self.load_penyesuaian_from_file()
+        # Penyesuaian tahun yang sudah ditutup: sisi nominalnya sudah masuk modal seperti jurnalnya
+        penyesuaian = self.load_periode().terapkan_tutup_tahun(
+            self.load_penyesuaian_from_file(), self.get_bagan_akun(), ('akun_debit', 'akun_kredit')
+        )
         
-        # 2. Hitung saldo setelah penyesuaian
-        saldo_akhir = saldo_neraca.copy()
+        # 2. Hitung saldo setelah penyesuaian: vektor saldo (sen) per akun lalu np.add.at
+        nama_akun = list(dict.fromkeys(
+            list(saldo_neraca) + [akun for pen in penyesuaian for akun in (pen['akun_debit'], pen['akun_kredit'])]
+        ))
+        id_akun = {akun: i for i, akun in enumerate(nama_akun)}
+        saldo_akhir = np.array([ke_sen(saldo_neraca.get(akun, 0)) for akun in nama_akun], dtype=np.int64)
         
-        for pen in penyesuaian:
-            # PROSES AKUN DEBIT dari penyesuaian
-            akun_debit = pen['akun_debit']
-            if self.is_akun_debit(akun_debit):
-                # Akun debit (Aset/Beban): bertambah di DEBIT
-                if akun_debit in saldo_akhir:
-                    saldo_akhir[akun_debit] += pen['debit']
-                else:
-                    saldo_akhir[akun_debit] = pen['debit']
-            else:
-                # Akun kredit (Kewajiban/Modal/Pendapatan): berkurang di DEBIT
-                if akun_debit in saldo_akhir:
-                    saldo_akhir[akun_debit] -= pen['debit']
-                else:
-                    saldo_akhir[akun_debit] = -pen['debit']
-                    
-            # PROSES AKUN KREDIT dari penyesuaian  
-            akun_kredit = pen['akun_kredit']
-            if self.is_akun_debit(akun_kredit):
-                # Akun debit (Aset/Beban): berkurang di KREDIT
-                if akun_kredit in saldo_akhir:
-                    saldo_akhir[akun_kredit] -= pen['kredit']
-                else:
-                    saldo_akhir[akun_kredit] = -pen['kredit']
-            else:
-                # Akun kredit (Kewajiban/Modal/Pendapatan): bertambah di KREDIT
-                if akun_kredit in saldo_akhir:
-                    saldo_akhir[akun_kredit] += pen['kredit']
-                else:
-                    saldo_akhir[akun_kredit] = pen['kredit']
+        if penyesuaian:
+            # Akun debit (Aset/Beban) bertambah di DEBIT dan berkurang di KREDIT; akun kredit sebaliknya
+            tanda = np.array([1 if self.is_akun_debit(akun) else -1 for akun in nama_akun], dtype=np.int64)
+            id_debit = np.array([id_akun[pen['akun_debit']] for pen in penyesuaian], dtype=np.int32)
+            id_kredit = np.array([id_akun[pen['akun_kredit']] for pen in penyesuaian], dtype=np.int32)
+            debit = np.array([ke_sen(pen['debit']) for pen in penyesuaian], dtype=np.int64)
+            kredit = np.array([ke_sen(pen['kredit']) for pen in penyesuaian], dtype=np.int64)
+            np.add.at(saldo_akhir, id_debit, tanda[id_debit] * debit)
+            np.add.at(saldo_akhir, id_kredit, -tanda[id_kredit] * kredit)
+        
+        return {akun: dari_sen(int(saldo_akhir[i])) for i, akun in enumerate(nama_akun)}
+
+    def susun_data_laporan_keuangan(self, saldo_akhir):
+        """Hitung semua data yang dibutuhkan untuk laporan keuangan - VERSI LENGKAP DENGAN HPP"""
+        # Kelompok akun dari bagan akun (tipe di accounts.json), bukan dari potongan nama
+        bagan = self.get_bagan_akun()
         
         # 3. Kelompokkan akun-akun - ✅ VERSI LENGKAP DENGAN HPP
         data = {
             # ✅ PENDAPATAN - SEMUA JENIS
             'pendapatan': {akun: abs(saldo) for akun, saldo in saldo_akhir.items() 
-                if "Pendapatan" in akun or "Penjualan" in akun},
+                if bagan.tipe(akun) == "Pendapatan"},
                 
             # ✅ HPP & PEMBELIAN
             'hpp': {akun: abs(saldo) for akun, saldo in saldo_akhir.items() 
-                if akun in ["Pembelian", "Harga Pokok Penjualan", "HPP"]},
+                if bagan.harga_pokok(akun)},
                 
             # ✅ PERSEDIAAN (untuk hitung HPP)
             'persediaan_awal': 0,  # Default 0, bisa disesuaikan
@@ -1647,42 +4794,39 @@ class ModernLoginApp:
                 
             # ✅ BEBAN OPERASIONAL
             'beban_operasional': {akun: abs(saldo) for akun, saldo in saldo_akhir.items() 
-                if "Beban" in akun and "Penyusutan" not in akun},
+                if bagan.beban_operasional(akun)},
                 
             # ✅ BEBAN PENYUSUTAN  
             'beban_penyusutan': {akun: abs(saldo) for akun, saldo in saldo_akhir.items() 
-                if "Beban Penyusutan" in akun},
+                if bagan.beban_penyusutan(akun)},
                 
             # ✅ BEBAN LAINNYA
             'beban_lainnya': {akun: abs(saldo) for akun, saldo in saldo_akhir.items() 
-                if akun in ["Beban Lainnya", "Beban"]},
+                if bagan.beban_lainnya(akun)},
                 
             # ✅ ASET LANCAR
             'aset_lancar': {akun: saldo for akun, saldo in saldo_akhir.items() 
-                if akun in ["Kas", "Bank", "Piutang Usaha", "Persediaan", "Perlengkapan", "Sewa Bayar di Muka"] 
-                and saldo > 0},
+                if bagan.tipe(akun) == "Aset" and not bagan.aset_tetap(akun) and saldo > 0},
                 
             # ✅ ASET TETAP
             'aset_tetap': {akun: saldo for akun, saldo in saldo_akhir.items() 
-                if akun in ["Peralatan", "Gedung", "Kendaraan", "Tanah", "Mesin", "Inventaris"] 
-                and saldo > 0},
+                if bagan.aset_tetap(akun) and saldo > 0},
                 
             # ✅ AKUMULASI PENYUSUTAN
             'akumulasi_penyusutan': {akun: abs(saldo) for akun, saldo in saldo_akhir.items() 
-                if "Akumulasi Penyusutan" in akun},  
+                if bagan.tipe(akun) == "Kontra Aset"},  
                 
-            # ✅ KEWAJIBAN
+            # ✅ KEWAJIBAN (saldo sudah bertanda saldo normal: positif = di sisi kredit)
             'kewajiban': {akun: abs(saldo) for akun, saldo in saldo_akhir.items() 
-                if akun in ["Utang Usaha", "Utang Bank", "Pendapatan Diterima di Muka"] 
-                and saldo < 0},
+                if bagan.tipe(akun) == "Kewajiban" and saldo != 0},
                 
             # ✅ MODAL 
             'modal': {akun: abs(saldo) for akun, saldo in saldo_akhir.items() 
-                if "Modal" in akun and saldo != 0},  
+                if bagan.tipe(akun) == "Modal" and saldo != 0},  
                 
             # ✅ PRIVE
             'prive': {akun: abs(saldo) for akun, saldo in saldo_akhir.items() 
-                if akun == "Prive" and saldo > 0}
+                if bagan.tipe(akun) == "Prive" and saldo > 0}
         }
         
         # 4. Hitung totals - ✅ PERHITUNGAN LENGKAP DENGAN HPP
@@ -1711,19 +4855,12 @@ class ModernLoginApp:
         data['total_aset'] = data['total_aset_lancar'] + data['total_aset_tetap_bersih']
         
         data['total_kewajiban'] = sum(data['kewajiban'].values())
-        data['modal_awal'] = data['modal'].get('Modal Pemilik', 0) or data['modal'].get('Modal', 0)
+        data['modal_awal'] = sum(data['modal'].values())
         
         # Perhitungan Modal Akhir
-        data['modal_akhir'] = data['modal_awal'] + data['laba_bersih'] - data.get('prive', {}).get('Prive', 0)
-        
-        # Koreksi otomatis jika tidak seimbang
-        total_aset_actual = data['total_aset']
-        total_kewajiban_modal_actual = data['total_kewajiban'] + data['modal_akhir']
-        
-        selisih = abs(total_aset_actual - total_kewajiban_modal_actual)
-        if selisih > 0 and selisih <= 1000:
-            data['modal_akhir'] = data['total_aset'] - data['total_kewajiban']
+        data['modal_akhir'] = data['modal_awal'] + data['laba_bersih'] - sum(data['prive'].values())
         
+        # Semua saldo eksak (integer sen), jadi tidak ada lagi koreksi selisih pembulatan
         data['total_kewajiban_modal'] = data['total_kewajiban'] + data['modal_akhir']
         
         return data
@@ -1824,7 +4961,7 @@ class ModernLoginApp:
         st.write(f"{'Laba/Rugi Bersih':30} Rp{laba_bersih:>15,.0f}")
         
         # Prive
-        prive = data.get('prive', {}).get('Prive', 0)
+        prive = sum(data.get('prive', {}).values())
         if prive > 0:
             st.write(f"{'Prive':30} Rp{prive:>15,.0f}")
         
@@ -1846,34 +4983,37 @@ class ModernLoginApp:
         
         # Hitung saldo asli untuk data lainnya
         saldo_asli = self.hitung_saldo_semua_akun()
+        bagan = self.get_bagan_akun()
         
-        # GROUP PENDAPATAN - TIDAK BOLEH DOUBLE COUNT
+        # GROUP PENDAPATAN (akun bertipe Pendapatan): jasa dipisah, sisanya pendapatan usaha
         pendapatan_usaha = 0
         pendapatan_jasa = 0
 
         for akun, saldo in saldo_asli.items():
-            # PRIORITAS "Pendapatan Usaha", jika ada abaikan "Penjualan"
-            if "Pendapatan Usaha" in akun and saldo != 0:
-                pendapatan_usaha = abs(saldo)
-            elif "Penjualan" in akun and saldo != 0 and pendapatan_usaha == 0:
-                pendapatan_usaha = abs(saldo)
-            elif "Pendapatan Jasa" in akun and saldo != 0:
-                pendapatan_jasa = abs(saldo)
+            if bagan.tipe(akun) != "Pendapatan" or saldo == 0:
+                continue
+            if "jasa" in akun.lower():
+                pendapatan_jasa += abs(saldo)
+            else:
+                pendapatan_usaha += abs(saldo)
 
+        # Mutasi dijumlah dari seluruh riwayat, sama seperti saldo awal yang kumulatif
+        transactions = self.load_jurnal_lengkap()
+        
         # Hitung pembelian aset tetap dari transaksi
         total_pembelian_aset = 0
-        for transaksi in st.session_state.transactions:
+        for transaksi in transactions:
             akun = transaksi['akun']
             debit = transaksi.get('debit', 0)
-            if akun in ["Peralatan", "Gedung", "Kendaraan", "Tanah", "Mesin", "Inventaris"] and debit > 0:
+            if bagan.aset_tetap(akun) and debit > 0:
                 total_pembelian_aset += debit
         
         # Hitung setoran modal dari transaksi
         setoran_modal = 0
-        for transaksi in st.session_state.transactions:
+        for transaksi in transactions:
             akun = transaksi['akun']
             kredit = transaksi.get('kredit', 0)
-            if akun == "Modal" and kredit > 0 and "modal" in transaksi.get('keterangan', '').lower():
+            if bagan.tipe(akun) == "Modal" and kredit > 0 and "modal" in transaksi.get('keterangan', '').lower():
                 setoran_modal += kredit
         
         # HITUNG DATA UNTUK ARUS KAS (TANPA PENYESUAIAN)
@@ -1881,16 +5021,15 @@ class ModernLoginApp:
             'pendapatan_usaha': pendapatan_usaha,
             'pendapatan_jasa': pendapatan_jasa,
             
+            # Beban kas: semua akun Beban kecuali penyusutan (non-kas)
             'beban': {akun: abs(saldo) for akun, saldo in saldo_asli.items() 
-                    if any(keyword in akun for keyword in ["Beban", "Pembelian"]) 
-                    and "Penyusutan" not in akun and saldo != 0},
+                    if bagan.tipe(akun) == "Beban" and not bagan.beban_penyusutan(akun) and saldo != 0},
             
             'prive': {akun: abs(saldo) for akun, saldo in saldo_asli.items() 
-                    if akun == "Prive" and saldo > 0},
+                    if bagan.tipe(akun) == "Prive" and saldo > 0},
             
             'kewajiban': {akun: abs(saldo) for akun, saldo in saldo_asli.items() 
-                        if akun in ["Utang Usaha", "Utang Bank", "Pendapatan Diterima di Muka"] 
-                        and saldo < 0},
+                        if bagan.tipe(akun) == "Kewajiban" and saldo > 0},
             
             'total_pembelian_aset': total_pembelian_aset,
             'setoran_modal': setoran_modal
@@ -1960,7 +5099,7 @@ class ModernLoginApp:
             kas_pendanaan += jumlah
         
         # Pengambilan Prive (MENGURANGI KAS)
-        prive = data_arus_kas.get('prive', {}).get('Prive', 0)
+        prive = sum(data_arus_kas['prive'].values())
         if prive > 0:
             st.write(f"  Pengambilan Prive{' ':15} Rp{prive:>15,.0f}")
             kas_pendanaan -= prive
@@ -2069,7 +5208,7 @@ class ModernLoginApp:
             st.write(f"    {jenis + ' Bersih':28} Rp{abs(laba_bersih):>15,.0f}")
         
         # Tampilkan prive jika ada
-        prive = data.get('prive', {}).get('Prive', 0)
+        prive = sum(data.get('prive', {}).values())
         if prive > 0:
             st.write(f"    {'Prive':28} Rp{prive:>15,.0f}")
         
@@ -2243,7 +5382,7 @@ class ModernLoginApp:
         if 'transactions' not in st.session_state:
             st.session_state.transactions = self.load_transactions_from_file()
         
-        if not st.session_state.transactions:
+        if not self.ada_transaksi_jurnal():
             st.info("📭 Belum ada transaksi di Jurnal Umum")
             return
 
@@ -2259,14 +5398,16 @@ class ModernLoginApp:
         akun_beban = {}
         prive = 0
         
+        bagan_akun = self.get_bagan_akun()
         for akun, saldo in saldo_akun.items():
-            if "Pendapatan" in akun or "Penjualan" in akun:
+            tipe = bagan_akun.tipe(akun)
+            if tipe == "Pendapatan":
                 if saldo > 0:
                     akun_pendapatan[akun] = saldo
-            elif "Beban" in akun or "Pembelian" in akun:
+            elif tipe == "Beban":
                 if abs(saldo) > 0:
                     akun_beban[akun] = abs(saldo)
-            elif akun == "Prive" and saldo > 0:
+            elif tipe == "Prive" and saldo > 0:
                 prive = saldo
         
         # Hitung laba/rugi
@@ -2276,7 +5417,7 @@ class ModernLoginApp:
         
         # Tampilkan Jurnal Penutup dalam TABLE VIEW
         st.subheader("📋 JURNAL PENUTUP - TAMPILAN TABEL")
-        st.write("Periode 31 Desember 2023")
+        st.write(f"Periode 31 Desember {self.tahun_periode()}")
         
         st.markdown("---")
         
@@ -2408,15 +5549,20 @@ class ModernLoginApp:
                     'laba_bersih': laba_bersih,
                     'prive': prive
                 }
-                self.posting_jurnal_penutup_sederhana(jurnal_data)
-                st.success("🎉 Jurnal Penutup berhasil diposting!")
-                st.rerun()
+                if self.posting_jurnal_penutup_sederhana(jurnal_data):
+                    st.success("🎉 Jurnal Penutup berhasil diposting!")
+                    st.rerun()
+        
+        # Tutup tahun tetap langkah terpisah: sesudahnya posting di tahun itu ditolak
+        st.caption(f"ℹ️ Periode tahun {self.tahun_periode()} ditutup lewat tombol **Tutup Tahun** di Pengaturan Sistem.")
 
     def posting_jurnal_penutup_sederhana(self, jurnal_data):
         """Posting jurnal penutup versi sederhana"""
         try:
             entries = []
-            tanggal = "31 Desember 2023"
+            # Tanggal penutup = hari terakhir periode Desember tahun periode akuntansi
+            periode_penutup = f"Des-{self.tahun_periode()}"
+            tanggal = datetime.fromordinal(PeriodeAkuntansi.rentang(periode_penutup)[1]).strftime('%d %B %Y')
             
             # 1. Posting pendapatan
             for akun, jumlah in jurnal_data['pendapatan'].items():
@@ -2494,9 +5640,8 @@ class ModernLoginApp:
                     'ref': 'JP'
                 })
             
-            # Simpan ke file
-            with open('jurnal_penutup.json', 'w') as f:
-                json.dump(entries, f, indent=4)
+            # Simpan ke storage
+            self.storage.save_jurnal_penutup(entries)
             
             return True
             
@@ -2526,8 +5671,8 @@ class ModernLoginApp:
         st.subheader("📋 DAFTAR AKUN SETELAH PENUTUPAN")
         
         # Pisahkan akun nominal dan riil
-        akun_nominal = {akun: saldo for akun, saldo in saldo_akhir.items() if not self.is_akun_riil_sederhana(akun)}
-        akun_riil = {akun: saldo for akun, saldo in saldo_akhir.items() if self.is_akun_riil_sederhana(akun) and saldo != 0}
+        akun_nominal = {akun: saldo for akun, saldo in saldo_akhir.items() if not self.is_akun_riil(akun)}
+        akun_riil = {akun: saldo for akun, saldo in saldo_akhir.items() if self.is_akun_riil(akun) and saldo != 0}
         
         # 1. TAMPILKAN AKUN NOMINAL (YANG DITUTUP)
         st.markdown("---")
@@ -2631,53 +5776,21 @@ class ModernLoginApp:
     def hitung_saldo_setelah_penutupan_sederhana(self, data_keuangan):
         """Hitung saldo setelah penutupan - VERSI SEDERHANA"""
         
-        # 1. Ambil saldo dari neraca setelah penyesuaian
-        if 'transactions' not in st.session_state:
-            st.session_state.transactions = self.load_transactions_from_file()
-        
-        saldo_neraca = self.hitung_saldo_semua_akun()
-        penyesuaian = self.load_penyesuaian_from_file()
-        
-        # Hitung saldo setelah penyesuaian
-        saldo_setelah_penyesuaian = saldo_neraca.copy()
-        
-        for pen in penyesuaian:
-            akun_debit = pen['akun_debit']
-            if self.is_akun_debit(akun_debit):
-                if akun_debit in saldo_setelah_penyesuaian:
-                    saldo_setelah_penyesuaian[akun_debit] += pen['debit']
-                else:
-                    saldo_setelah_penyesuaian[akun_debit] = pen['debit']
-            else:
-                if akun_debit in saldo_setelah_penyesuaian:
-                    saldo_setelah_penyesuaian[akun_debit] -= pen['debit']
-                else:
-                    saldo_setelah_penyesuaian[akun_debit] = -pen['debit']
-                    
-            akun_kredit = pen['akun_kredit']
-            if self.is_akun_debit(akun_kredit):
-                if akun_kredit in saldo_setelah_penyesuaian:
-                    saldo_setelah_penyesuaian[akun_kredit] -= pen['kredit']
-                else:
-                    saldo_setelah_penyesuaian[akun_kredit] = -pen['kredit']
-            else:
-                if akun_kredit in saldo_setelah_penyesuaian:
-                    saldo_setelah_penyesuaian[akun_kredit] += pen['kredit']
-                else:
-                    saldo_setelah_penyesuaian[akun_kredit] = pen['kredit']
+        # 1. Saldo setelah penyesuaian dari snapshot laporan (tanpa replay penyesuaian lagi)
+        saldo_setelah_penyesuaian = self.hitung_snapshot_laporan()['saldo_setelah_penyesuaian']
         
         # 2. Proses penutupan - SET AKUN NOMINAL MENJADI NOL
         saldo_akhir = {}
         
         # Saldo akun riil tetap
         for akun, saldo in saldo_setelah_penyesuaian.items():
-            if self.is_akun_riil_sederhana(akun):
+            if self.is_akun_riil(akun):
                 saldo_akhir[akun] = saldo
         
         # Set semua akun nominal menjadi NOL
         akun_nominal = [
             akun for akun in saldo_setelah_penyesuaian.keys() 
-            if not self.is_akun_riil_sederhana(akun)
+            if not self.is_akun_riil(akun)
         ]
         
         for akun in akun_nominal:
@@ -2685,38 +5798,6 @@ class ModernLoginApp:
         
         return saldo_akhir
 
-    def is_akun_riil_sederhana(self, nama_akun):
-        """Tentukan apakah akun riil (tidak ditutup) - VERSI SEDERHANA"""
-        
-        # DAFTAR AKUN NOMINAL YANG HARUS DITUTUP
-        akun_nominal = [
-            # PENDAPATAN
-            "Pendapatan Usaha", "Pendapatan Jasa", "Pendapatan Penjualan", 
-            "Pendapatan Lainnya", "Penjualan",
-            
-            # BEBAN
-            "Beban Gaji", "Beban Sewa", "Beban Listrik", "Beban Air", 
-            "Beban Telepon", "Beban Transportasi", "Beban Perlengkapan",
-            "Beban Penyusutan", "Beban Lainnya", "Beban", "Beban pakan",
-            "Beban Pengiriman", "Beban Vitamin", "Beban Perbaikan",
-            "Beban perawatan Kandang", "Beban Obat",
-            
-            # LAINNYA
-            "Pembelian", "Prive", "Ikhtisar Laba Rugi"
-        ]
-        
-        # Jika termasuk nominal, return False (harus ditutup)
-        if nama_akun in akun_nominal:
-            return False
-        
-        # Cek berdasarkan keyword
-        nominal_keywords = ["Pendapatan", "Beban", "Pembelian", "Prive", "Ikhtisar"]
-        if any(keyword in nama_akun for keyword in nominal_keywords):
-            return False
-        
-        # Default: akun riil (tidak ditutup)
-        return True
-
     def show_input_transaksi(self):
         st.title("Input Transaksi")
         
@@ -2754,30 +5835,121 @@ class ModernLoginApp:
                 else:
                     # ✅ SIMPAN KE JURNAL UMUM
                     if 'transactions' not in st.session_state:
-                        st.session_state.transactions = []
+                        st.session_state.transactions = self.load_transactions_from_file()
                     
-                    # Transaksi Debit
-                    st.session_state.transactions.append({
-                        'tanggal': tanggal.strftime("%d %B %Y"),
-                        'akun': akun_debit,
-                        'debit': debit,
-                        'kredit': 0,
-                        'keterangan': keterangan,
-                        'ref': ''
-                    })
-                    
-                    # Transaksi Kredit  
-                    st.session_state.transactions.append({
-                        'tanggal': tanggal.strftime("%d %B %Y"),
-                        'akun': akun_kredit,
-                        'debit': 0,
-                        'kredit': kredit,
-                        'keterangan': keterangan,
-                        'ref': ''
-                    })
+                    # Transaksi Debit & Kredit
+                    berhasil = self.tambah_transaksi_jurnal([
+                        {
+                            'tanggal': tanggal.strftime("%d %B %Y"),
+                            'akun': akun_debit,
+                            'debit': debit,
+                            'kredit': 0,
+                            'keterangan': keterangan,
+                            'ref': ''
+                        },
+                        {
+                            'tanggal': tanggal.strftime("%d %B %Y"),
+                            'akun': akun_kredit,
+                            'debit': 0,
+                            'kredit': kredit,
+                            'keterangan': keterangan,
+                            'ref': ''
+                        }
+                    ])
                     
-                    st.success("✅ Transaksi berhasil disimpan ke Jurnal Umum!")
-                    st.rerun()
+                    if berhasil:
+                        st.success("✅ Transaksi berhasil disimpan ke Jurnal Umum!")
+                        st.rerun()
+        
+        st.markdown("---")
+        self.show_import_transaksi()
+
+    def show_import_transaksi(self):
+        """Import mutasi massal (CSV / Excel rekening koran) ke Jurnal Umum dalam satu kali tulis"""
+        st.subheader("📂 Import Mutasi (CSV / Excel)")
+        uploaded_file = st.file_uploader("Pilih file mutasi", type=['csv', 'xlsx'], key="import_mutasi_file")
+        if not uploaded_file:
+            return
+        
+        try:
+            df = self.baca_file_import(uploaded_file)
+        except Exception as e:
+            st.error(f"Error membaca file: {e}")
+            return
+        if df.empty:
+            st.info("📭 File tidak berisi baris data")
+            return
+        
+        st.write(f"**{len(df):,} baris** ditemukan. Contoh isi file:")
+        st.dataframe(df.head(5), use_container_width=True, hide_index=True)
+        
+        # Akun yang dikenal: bagan akun + akun yang sudah pernah dipakai di Jurnal Umum
+        akun_valid = set(self.storage.load_accounts()) | set(self.get_indeks_akun().daftar_akun())
+        kolom = list(df.columns)
+        tanpa = "(tidak ada)"
+        pilihan_akun = [('kolom', k) for k in kolom] + [('akun', a) for a in sorted(akun_valid)]
+        tampil_akun = lambda pilihan: f"Kolom: {pilihan[1]}" if pilihan[0] == 'kolom' else pilihan[1]
+        index_kas = pilihan_akun.index(('akun', 'Kas')) if ('akun', 'Kas') in pilihan_akun else 0
+        
+        with st.form("import_mutasi_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                kolom_tanggal = st.selectbox("📅 Kolom Tanggal", kolom)
+                kolom_keterangan = st.selectbox("📝 Kolom Keterangan", [tanpa] + kolom)
+                kolom_ref = st.selectbox("🔖 Kolom Ref", [tanpa] + kolom)
+            with col2:
+                kolom_jumlah = st.selectbox("💹 Kolom Jumlah", kolom)
+                kolom_kredit = st.selectbox("💸 Kolom Kredit (opsional, harus sama dengan jumlah)", [tanpa] + kolom)
+                akun_debit = st.selectbox("🏦 Akun Debit", pilihan_akun, index=index_kas, format_func=tampil_akun)
+                akun_kredit = st.selectbox("🏦 Akun Kredit", pilihan_akun, format_func=tampil_akun)
+            
+            submitted = st.form_submit_button("📥 Import ke Jurnal Umum", use_container_width=True)
+        
+        if not submitted:
+            return
+        
+        peta = {
+            'tanggal': kolom_tanggal,
+            'jumlah': kolom_jumlah,
+            'jumlah_kredit': None if kolom_kredit == tanpa else kolom_kredit,
+            'keterangan': None if kolom_keterangan == tanpa else kolom_keterangan,
+            'ref': None if kolom_ref == tanpa else kolom_ref,
+            'akun_debit': akun_debit,
+            'akun_kredit': akun_kredit
+        }
+        # Submit ulang file + pemetaan yang sama tidak mengimport dua kali
+        sidik = hash((uploaded_file.getvalue(), tuple(sorted(peta.items()))))
+        if st.session_state.get('impor_terakhir') == sidik:
+            st.warning("⚠️ File ini sudah diimport dengan pemetaan yang sama")
+            return
+        
+        try:
+            entries, ditolak = validasi_impor(df, peta, akun_valid)
+            if entries:
+                # Semua mutasi valid: satu kali append ke jurnal bersama (satu write + fsync)
+                self.tambah_transaksi_jurnal(entries)
+                st.session_state.impor_terakhir = sidik
+                st.success(f"✅ {len(entries) // 2:,} mutasi diimport ke Jurnal Umum ({len(entries):,} baris)")
+        except Exception as e:
+            st.error(f"Error import mutasi: {e}")
+            return
+        
+        if len(ditolak):
+            st.warning(f"⚠️ {len(ditolak):,} baris ditolak")
+            st.dataframe(ditolak, use_container_width=True, hide_index=True)
+            st.download_button(
+                label="📥 Download Baris Ditolak (CSV)",
+                data=ditolak.to_csv(index=False).encode('utf-8'),
+                file_name="mutasi_ditolak.csv",
+                mime="text/csv"
+            )
+
+    def baca_file_import(self, uploaded_file):
+        """DataFrame dari file upload; CSV dibaca sebagai teks supaya format angka Indonesia tidak salah tafsir"""
+        if uploaded_file.name.lower().endswith('.xlsx'):
+            return pd.read_excel(uploaded_file)
+        # sep=None: pemisah ',' atau ';' dideteksi otomatis
+        return pd.read_csv(uploaded_file, sep=None, engine='python', dtype=str)
 
     def simpan_transaksi(self, tanggal, keterangan, akun_debit, akun_kredit, debit, kredit):
         try:
@@ -2836,21 +6008,30 @@ class ModernLoginApp:
             st.rerun()
 
     def update_account_balance(self, account_name, debit, credit):
+        # Hanya dicatat di memori; accounts.json ditulis sekali per request oleh flush_saldo_akun
+        self.get_saldo_tertunda().catat(account_name, debit, credit)
+
+    def get_saldo_tertunda(self, storage=None):
+        """Antrian write-behind saldo akun milik proses untuk storage ini"""
+        storage = storage or self.storage
+        cache = sumber_daya_proses()
+        kunci = ('saldo_tertunda', id(storage))
+        if kunci not in cache:
+            saldo_tertunda = cache.setdefault(kunci, SaldoAkunTertunda(storage))
+            # Mutasi yang belum sempat ditulis tetap masuk saat proses berhenti
+            atexit.register(saldo_tertunda.flush)
+        return cache[kunci]
+
+    def get_antrian_ekspor(self):
+        """Antrian export background milik proses, dipakai bersama semua session"""
+        cache = sumber_daya_proses()
+        if 'antrian_ekspor' not in cache:
+            cache.setdefault('antrian_ekspor', AntrianEkspor(os.path.join('data', 'export_cache')))
+        return cache['antrian_ekspor']
+
+    def flush_saldo_akun(self, storage=None):
         try:
-            with open(self.accounts_file, "r") as f:
-                accounts = json.load(f)
-            
-            if account_name in accounts:
-                account_type = accounts[account_name]["type"]
-                
-                if account_type in ["Aset", "Beban"]:
-                    accounts[account_name]["balance"] += debit - credit
-                else:  # Kewajiban, Modal, Pendapatan
-                    accounts[account_name]["balance"] += credit - debit
-                
-                with open(self.accounts_file, "w") as f:
-                    json.dump(accounts, f, indent=4)
-                    
+            self.get_saldo_tertunda(storage).flush()
         except Exception as e:
             st.error(f"Error update saldo: {e}")
 
@@ -2979,6 +6160,15 @@ class ModernLoginApp:
             st.subheader("⚡ Pengaturan Otomatis")
             auto_save = st.checkbox("Auto-save perubahan otomatis", value=settings.get('auto_save', True))
             
+            st.subheader("🗄️ Penyimpanan Data")
+            storage_options = {'json': 'JSON (file)', 'sqlite': 'SQLite (database)'}
+            storage_backend = st.selectbox(
+                "Backend Penyimpanan*",
+                list(storage_options.keys()),
+                index=list(storage_options.keys()).index(settings.get('storage_backend', 'json')),
+                format_func=lambda key: storage_options[key]
+            )
+            
             col_btn = st.columns(2)
             with col_btn[0]:
                 submitted = st.form_submit_button("💾 Simpan Settings", use_container_width=True, type="primary")
@@ -2996,7 +6186,8 @@ class ModernLoginApp:
                         'format_tanggal': format_tanggal,
                         'format_angka': format_angka,
                         'theme': theme,
-                        'auto_save': auto_save
+                        'auto_save': auto_save,
+                        'storage_backend': storage_backend
                     }
                     if self.save_system_settings(st.session_state.system_settings):
                         st.success("System settings berhasil disimpan!")
@@ -3004,6 +6195,72 @@ class ModernLoginApp:
             if reset_btn:
                 st.session_state.system_settings = self.load_system_settings(reset=True)
                 st.rerun()
+        
+        self.show_tutup_periode()
+        
+        st.subheader("📦 Migrasi JSON ke SQLite")
+        st.write("Salin semua data dari file JSON ke database SQLite, lalu pilih backend SQLite di atas.")
+        if st.button("📦 Impor Data JSON ke SQLite", use_container_width=True):
+            self.migrasi_json_ke_sqlite()
+
+    def show_tutup_periode(self):
+        """Status periode di periods.json: tutup periode / tahun dan buka kembali periode"""
+        st.subheader("🔒 Tutup Buku per Periode")
+        periode = self.load_periode()
+        berikut = periode.pertama_terbuka()
+        terakhir = periode.terakhir_ditutup()
+        st.write(f"Periode berjalan: **{periode.current_period or berikut}**"
+                 + (f" — ditutup sampai **{terakhir}**" if terakhir else ""))
+        if periode.periods:
+            st.dataframe(pd.DataFrame([
+                {
+                    "Periode": nama,
+                    "Status": "🔒 Ditutup" if nama in periode.snapshot else "🟢 Terbuka",
+                    "Ditutup Pada": periode.snapshot.get(nama, {}).get('waktu', '')
+                }
+                for nama in periode.periods
+            ]), use_container_width=True, hide_index=True)
+        
+        col_tutup, col_tahun, col_buka = st.columns(3)
+        tahun = berikut.split('-')[1]
+        try:
+            with col_tutup:
+                if st.button(f"🔒 Tutup {berikut}", use_container_width=True):
+                    self.tutup_periode(berikut)
+                    st.success(f"Periode {berikut} ditutup")
+                    st.rerun()
+            with col_tahun:
+                if st.button(f"📆 Tutup Tahun {tahun}", use_container_width=True):
+                    ditutup = self.tutup_periode(f"Des-{tahun}", tahunan=True)
+                    st.success(f"{len(ditutup)} periode ditutup: {', '.join(ditutup)}")
+                    st.rerun()
+            with col_buka:
+                if terakhir:
+                    pilihan = st.selectbox(
+                        "Buka kembali periode", sorted(periode.snapshot, key=lambda nama: -periode.snapshot[nama]['akhir'])
+                    )
+                    if st.button("🔓 Buka Kembali", use_container_width=True):
+                        dibuka = self.buka_periode(pilihan)
+                        st.success(f"Periode dibuka kembali: {', '.join(dibuka)}")
+                        st.rerun()
+        except Exception as e:
+            st.error(f"Error tutup periode: {e}")
+
+    def migrasi_json_ke_sqlite(self):
+        """Impor sekali jalan semua file JSON ke database SQLite"""
+        try:
+            sumber = self.buat_storage('json')
+            tujuan = self.buat_storage('sqlite')
+            # Saldo akun yang masih tertunda ikut disalin
+            self.flush_saldo_akun(sumber)
+            jumlah = tujuan.import_dari(sumber)
+            st.success(
+                f"Migrasi selesai: {jumlah['jurnal_umum']} baris jurnal umum, "
+                f"{jumlah['penyesuaian']} penyesuaian, {jumlah['jurnal_penutup']} baris jurnal penutup, "
+                f"{jumlah['transaksi']} transaksi, {jumlah['akun']} akun"
+            )
+        except Exception as e:
+            st.error(f"Error migrasi ke SQLite: {e}")
 
     def show_notification_settings(self):
         st.header("🔔 PENGATURAN NOTIFIKASI")
@@ -3137,28 +6394,41 @@ class ModernLoginApp:
         
         with col1:
             st.subheader("📥 BACKUP DATA")
-            backup_filename = f"backup_sientok_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
+            arsip = self.get_arsip_backup()
+            ekstensi = arsip.EKSTENSI[arsip.kompresi]
+            backup_filename = f"backup_sientok_{datetime.now().strftime('%Y%m%d_%H%M')}.jsonl.{ekstensi}"
+            mode_backup = st.radio(
+                "Mode backup:", ["Inkremental", "Penuh"], horizontal=True,
+                help="Inkremental hanya menyimpan bagian jurnal yang berubah sejak backup terakhir"
+            )
             
             if st.button("💾 Buat Backup", use_container_width=True, type="primary"):
-                backup_data = self.create_backup()
+                backup_data = self.create_backup(mode_backup.lower())
                 if backup_data:
-                    st.success("Backup berhasil dibuat!")
+                    manifest = arsip.terakhir()
+                    st.success(f"Backup berhasil dibuat! ({manifest['chunk_baru']} chunk baru, "
+                               f"{manifest['chunk_lama']} chunk dipakai ulang)")
                     st.download_button(
                         label="📥 Download Backup",
                         data=backup_data,
                         file_name=backup_filename,
-                        mime="application/json",
+                        mime="application/zstd" if ekstensi == "zst" else "application/gzip",
                         use_container_width=True
                     )
                 else:
                     st.error("Gagal membuat backup")
             
+            terakhir = arsip.terakhir()
+            if terakhir:
+                st.caption(f"Backup terakhir: {terakhir['waktu']} ({terakhir['mode']}), "
+                           f"{len(arsip.daftar_manifest())} backup tersimpan")
+            
             if st.button("⚠️ Hapus Data", use_container_width=True):
                 st.warning("Fitur hapus data akan segera tersedia")
         
         with col2:
             st.subheader("📤 RESTORE DATA")
-            uploaded_file = st.file_uploader("Pilih file backup", type=['json'])
+            uploaded_file = st.file_uploader("Pilih file backup", type=['gz', 'zst', 'json'])
             
             if uploaded_file:
                 st.info(f"File terpilih: {uploaded_file.name}")
@@ -3172,11 +6442,20 @@ class ModernLoginApp:
                         st.error(f"Error: {e}")
             
             st.subheader("🔄 AUTO BACKUP")
-            auto_backup = st.checkbox("Backup otomatis", value=True)
-            backup_day = st.selectbox("Hari backup", ["Senin", "Selasa", "Rabu", "Kamis", "Jumat"])
+            settings = self.load_system_settings()
+            hari_options = ["Setiap Hari", "Senin", "Selasa", "Rabu", "Kamis", "Jumat"]
+            auto_backup = st.checkbox("Backup otomatis", value=settings.get('auto_backup', True))
+            backup_day = st.selectbox(
+                "Hari backup", hari_options,
+                index=hari_options.index(settings.get('hari_backup', "Senin"))
+            )
             
             if st.button("💾 Simpan Auto Backup", use_container_width=True):
-                st.success("Pengaturan auto backup disimpan!")
+                settings.update(auto_backup=auto_backup, hari_backup=backup_day)
+                if self.save_system_settings(settings):
+                    st.success("Pengaturan auto backup disimpan!")
+                else:
+                    st.error("Gagal menyimpan pengaturan auto backup")
 
     # Data management functions
     def load_company_profile(self, reset=False):
@@ -3204,8 +6483,7 @@ class ModernLoginApp:
     def save_company_profile(self, data):
         try:
             os.makedirs('data', exist_ok=True)
-            with open('data/company_profile.json', 'w') as f:
-                json.dump(data, f, indent=4)
+            simpan_json_atomik('data/company_profile.json', data)
             return True
         except:
             return False
@@ -3220,11 +6498,14 @@ class ModernLoginApp:
                     'format_tanggal': 'DD/MM/YYYY',
                     'format_angka': '1.000,00',
                     'theme': 'Hijau',
-                    'auto_save': True
+                    'auto_save': True,
+                    'storage_backend': 'json'
                 }
             if os.path.exists('data/system_settings.json'):
-                with open('data/system_settings.json', 'r') as f:
-                    return json.load(f)
+                # Salinan, supaya pemanggil bebas mengubah tanpa mengotori cache proses
+                return dict(muat_bila_berubah(
+                    'system_settings', ['data/system_settings.json'], self.baca_system_settings
+                ))
             else:
                 default_data = self.load_system_settings(reset=True)
                 self.save_system_settings(default_data)
@@ -3232,11 +6513,14 @@ class ModernLoginApp:
         except:
             return self.load_system_settings(reset=True)
 
+    def baca_system_settings(self):
+        with open('data/system_settings.json', 'r') as f:
+            return json.load(f)
+
     def save_system_settings(self, data):
         try:
             os.makedirs('data', exist_ok=True)
-            with open('data/system_settings.json', 'w') as f:
-                json.dump(data, f, indent=4)
+            simpan_json_atomik('data/system_settings.json', data)
             return True
         except:
             return False
@@ -3268,8 +6552,7 @@ class ModernLoginApp:
     def save_notification_settings(self, data):
         try:
             os.makedirs('data', exist_ok=True)
-            with open('data/notification_settings.json', 'w') as f:
-                json.dump(data, f, indent=4)
+            simpan_json_atomik('data/notification_settings.json', data)
             return True
         except:
             return False
@@ -3302,48 +6585,107 @@ class ModernLoginApp:
     def save_security_settings(self, data):
         try:
             os.makedirs('data', exist_ok=True)
-            with open('data/security_settings.json', 'w') as f:
-                json.dump(data, f, indent=4)
+            simpan_json_atomik('data/security_settings.json', data)
             return True
         except:
             return False
 
-    def create_backup(self):
+    # Nama hari untuk jadwal auto backup (index = datetime.weekday())
+    HARI = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+
+    def get_arsip_backup(self):
+        """Arsip backup milik proses, dipakai bersama semua session"""
+        return sumber_daya_proses().setdefault('arsip_backup', ArsipBackup())
+
+    def bagian_backup(self):
+        """Data yang di-backup: {bagian: daftar record}. Jurnal Umum = seluruh riwayat, termasuk periode tertutup"""
+        with self.storage.kunci_jurnal():
+            transactions = self.storage.load_jurnal()
+        return {
+            'company_profile': [self.load_company_profile()],
+            'system_settings': [self.load_system_settings()],
+            'notification_settings': [self.load_notification_settings()],
+            'security_settings': [self.load_security_settings()],
+            'users': [self.users],
+            'accounts': [self.storage.load_accounts()],
+            'penyesuaian': self.storage.load_penyesuaian(),
+            'periods': [self.load_periode().ke_dict()],
+            'transactions': transactions
+        }
+
+    def create_backup(self, mode="inkremental"):
+        """Simpan backup ke arsip lokal lalu kembalikan satu file arsip terkompres untuk diunduh"""
         try:
-            backup_data = {
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'company_profile': self.load_company_profile(),
-                'system_settings': self.load_system_settings(),
-                'notification_settings': self.load_notification_settings(),
-                'security_settings': self.load_security_settings(),
-                'transactions': self.load_transactions_from_file(),
-                'users': self.users
-            }
-            return json.dumps(backup_data, indent=4).encode('utf-8')
-        except:
+            arsip = self.get_arsip_backup()
+            manifest = arsip.buat(self.bagian_backup(), mode)
+            with tempfile.TemporaryFile() as berkas:
+                arsip.tulis_arsip(manifest, berkas)
+                berkas.seek(0)
+                return berkas.read()
+        except Exception as e:
+            st.error(f"Error membuat backup: {e}")
             return None
 
+    def backup_terjadwal(self):
+        """Jalankan backup inkremental di background kalau auto backup jatuh tempo hari ini.
+
+        Dipanggil setiap request; pengecekannya hanya membaca pengaturan dan manifest terakhir
+        yang sudah di-cache.
+        """
+        try:
+            settings = self.load_system_settings()
+            if not settings.get('auto_backup', True):
+                return
+            hari = settings.get('hari_backup', "Senin")
+            sekarang = datetime.now()
+            if hari != "Setiap Hari" and hari != self.HARI[sekarang.weekday()]:
+                return
+            arsip = self.get_arsip_backup()
+            if arsip.berjalan or arsip.terakhir().get('waktu', '').startswith(sekarang.strftime('%Y-%m-%d')):
+                return
+            arsip.buat_di_background(self.bagian_backup())
+        except Exception as e:
+            st.error(f"Error auto backup: {e}")
+
     def restore_backup(self, uploaded_file):
+        """Restore streaming: arsip dibaca baris demi baris, setiap bagian ditulis ke file staging
+        dan diverifikasi; data lama baru diganti sekaligus setelah semua bagian lolos."""
+        berkas_bagian = {
+            'company_profile': 'data/company_profile.json',
+            'system_settings': 'data/system_settings.json',
+            'notification_settings': 'data/notification_settings.json',
+            'security_settings': 'data/security_settings.json',
+            'users': self.users_file,
+            'periods': self.periods_file
+        }
+
+        def tulis():
+            os.makedirs('data', exist_ok=True)
+            with self.storage.pemulihan() as ganti:
+                dipulihkan = set()
+                for nama, records in ArsipBackup.baca_arsip(uploaded_file):
+                    dipulihkan.add(nama)
+                    if nama in ('transactions', 'penyesuaian', 'accounts'):
+                        ganti(nama, records)
+                    elif nama in berkas_bagian:
+                        isi, = records
+                        simpan_json_atomik(berkas_bagian[nama], isi)
+                if 'transactions' in dipulihkan and 'periods' not in dipulihkan:
+                    # Backup tanpa periode: snapshot periode lama tidak cocok lagi dengan jurnal hasil restore
+                    periode = self.baca_periode()
+                    periode.snapshot = {}
+                    simpan_json_atomik(self.periods_file, periode.ke_dict())
+
         try:
-            backup_data = json.load(uploaded_file)
-            
-            if 'company_profile' in backup_data:
-                self.save_company_profile(backup_data['company_profile'])
-            if 'system_settings' in backup_data:
-                self.save_system_settings(backup_data['system_settings'])
-            if 'notification_settings' in backup_data:
-                self.save_notification_settings(backup_data['notification_settings'])
-            if 'security_settings' in backup_data:
-                self.save_security_settings(backup_data['security_settings'])
-            if 'transactions' in backup_data:
-                with open('jurnal_umum_transactions.json', 'w') as f:
-                    json.dump(backup_data['transactions'], f, indent=4)
-            if 'users' in backup_data:
-                with open('users.json', 'w') as f:
-                    json.dump(backup_data['users'], f, indent=4)
-            
+            # Mutasi saldo yang masih tertunda milik data lama; tulis dulu supaya tidak menimpa hasil restore
+            self.get_saldo_tertunda().flush()
+            self.get_jurnal_bersama().pulihkan(tulis)
+            self.sinkronkan_jurnal()
+            self.bangun_ulang_saldo_cache(self.get_saldo_cache())
+            self.bangun_ulang_indeks_akun(self.get_indeks_akun())
             return True
-        except:
+        except Exception as e:
+            st.error(f"Error restore backup: {e}")
             return False
 
 
@@ -3403,13 +6745,13 @@ class ModernLoginApp:
         
         # Tombol Export
         if st.button("🚀 EXPORT", use_container_width=True, type="primary"):
-            # Generate file berdasarkan pilihan
-            file_data = self.generate_laporan(selected_siklus, selected_format)
+            # Generate dijalankan di antrian background; halaman hasil mem-polling progresnya
+            id_pekerjaan = self.kirim_export(selected_siklus, selected_format)
             
-            if file_data:
+            if id_pekerjaan:
                 # Simpan data export ke session state dan buka popup
                 st.session_state.export_data = {
-                    'file_data': file_data,
+                    'id_pekerjaan': id_pekerjaan,
                     'siklus': selected_siklus,
                     'format': selected_format
                 }
@@ -3418,6 +6760,25 @@ class ModernLoginApp:
             else:
                 st.error("❌ Gagal generate laporan")
 
+    def kirim_export(self, siklus, format_file):
+        """Kirim export ke antrian background, return ID pekerjaan.
+
+        Data laporan dan snapshot Jurnal Umum diambil di sini (thread session); pekerja hanya
+        menulis file. Kunci cache memuat versi jurnal, jadi hasil lama tidak pernah terpakai
+        setelah ada posting baru.
+        """
+        try:
+            data = self.data_laporan(siklus)
+            sumber = self.sumber_ekspor(data['laporan'])
+            kunci = (siklus, format_file, self.kunci_laporan())
+            return self.get_antrian_ekspor().kirim(
+                kunci, self.ekstensi_export(siklus, format_file),
+                lambda progres: self.render_laporan(data, format_file, sumber, progres)
+            )
+        except Exception as e:
+            st.error(f"Error export laporan: {e}")
+            return None
+
     def show_export_popup_page(self):
         """Tampilkan halaman popup terpisah"""
         st.title("📄 HASIL EXPORT")
@@ -3450,40 +6811,67 @@ class ModernLoginApp:
         
         # Data dari session state
         export_data = st.session_state.export_data
-        file_data = export_data['file_data']
         siklus = export_data['siklus']
         format_file = export_data['format']
         
-        # Konversi format file untuk nama file
-        format_ext = {
-            "PDF": "txt",
-            "Excel": "xlsx", 
-            "CSV": "csv",
-            "HTML": "html",
-            "JSON": "json",
-            "XML": "xml"
-        }
+        # Status pekerjaan export di antrian background
+        pekerjaan = self.get_antrian_ekspor().status(export_data['id_pekerjaan'])
+        if pekerjaan is None or pekerjaan['status'] == 'gagal':
+            pesan = pekerjaan['pesan'] if pekerjaan else "pekerjaan export tidak ditemukan"
+            st.error(f"❌ Gagal generate laporan: {pesan}")
+            if st.button("⬅️ Kembali ke Form Export", use_container_width=True):
+                st.session_state.show_export_popup = False
+                st.session_state.export_data = None
+                st.rerun()
+            return
+        if pekerjaan['status'] != 'selesai':
+            st.info(f"⏳ Sedang membuat laporan **{siklus}** ({format_file})...")
+            st.progress(pekerjaan['progres'], text=f"{pekerjaan['progres'] * 100:.0f}%")
+            if st.button("⬅️ Kembali ke Form Export", use_container_width=True):
+                # Pekerjaan tetap jalan; hasilnya masuk cache untuk export berikutnya
+                st.session_state.show_export_popup = False
+                st.session_state.export_data = None
+                st.rerun()
+            time.sleep(0.5)
+            st.rerun()
+        
+        try:
+            with open(pekerjaan['berkas'], 'rb') as f:
+                file_data = f.read()
+        except FileNotFoundError:
+            # Hasil di cache sudah dibuang pekerja lain (bersihkan_cache): buat ulang
+            id_pekerjaan = self.kirim_export(siklus, format_file)
+            if id_pekerjaan:
+                export_data['id_pekerjaan'] = id_pekerjaan
+                st.rerun()
+            if st.button("⬅️ Kembali ke Form Export", use_container_width=True):
+                st.session_state.show_export_popup = False
+                st.session_state.export_data = None
+                st.rerun()
+            return
         
         # Nama file
-        filename = f"Laporan_{siklus.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.{format_ext[format_file]}"
+        ekstensi = self.ekstensi_export(siklus, format_file)
+        filename = f"Laporan_{siklus.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.{ekstensi}"
         
         # Encode file untuk download
         b64 = base64.b64encode(file_data).decode()
         
         # MIME types
         mime_types = {
-            "PDF": "text/plain",
+            "PDF": "application/pdf",
             "Excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             "CSV": "text/csv",
             "HTML": "text/html",
             "JSON": "application/json", 
             "XML": "application/xml"
         }
+        mime = "application/zip" if ekstensi == "zip" else mime_types[format_file]
         
         # KONTEN POPUP
         st.markdown('<div class="popup-container">', unsafe_allow_html=True)
         
-        st.success("✅ **Export Berhasil!**")
+        st.success("✅ **Export Berhasil!**" + (" (dari cache)" if pekerjaan['dari_cache'] else ""))
         st.write(f"**File:** {filename}")
         st.write(f"**Format:** {format_file}")
         st.write(f"**Siklus:** {siklus}")
@@ -3492,7 +6880,7 @@ class ModernLoginApp:
         
         # SECTION 1: DOWNLOAD FILE
         st.subheader("📥 Download File")
-        href = f'<a href="data:{mime_types[format_file]};base64,{b64}" download="{filename}" class="download-btn">⬇️ UNDUH FILE</a>'
+        href = f'<a href="data:{mime};base64,{b64}" download="{filename}" class="download-btn">⬇️ UNDUH FILE</a>'
         st.markdown(href, unsafe_allow_html=True)
         
         st.markdown("---")
@@ -3540,135 +6928,186 @@ class ModernLoginApp:
         if st.button("📋 Salin Link", use_container_width=True):
             st.success("✅ Link berhasil disalin!")
 
+    # Siklus -> laporan (EKSPOR_LAPORAN) yang ikut di-export
+    LAPORAN_SIKLUS = {
+        "Semua Siklus": list(EKSPOR_LAPORAN),
+        "Siklus Transaksi": ["Jurnal Umum", "Buku Besar"],
+        "Neraca Sebelum Penyesuaian": ["Neraca Saldo"],
+        "Siklus Penyesuaian": ["Jurnal Penyesuaian"],
+        "Neraca Setelah Penyesuaian": ["Neraca Setelah Penyesuaian"],
+        "Siklus Pelaporan": ["Laporan Keuangan"],
+        "Neraca Akhir": ["Neraca Saldo Setelah Penutupan"],
+        "Siklus Penutupan": ["Jurnal Penutup"],
+    }
+
+    # Ekstensi file hasil export per format
+    EKSTENSI_EXPORT = {
+        "PDF": "pdf",
+        "Excel": "xlsx",
+        "CSV": "csv",
+        "HTML": "html",
+        "JSON": "json",
+        "XML": "xml"
+    }
+
+    def ekstensi_export(self, siklus, format_file):
+        # Semua Siklus: satu file per laporan, dibungkus ZIP
+        return "zip" if siklus == "Semua Siklus" else self.EKSTENSI_EXPORT[format_file]
+
+    def sumber_ekspor(self, daftar_jenis):
+        """Snapshot data untuk generator EKSPOR_LAPORAN, diambil sekali di thread session.
+
+        Snapshot Jurnal Umum immutable: export panjang tidak memegang lock apa pun, session
+        lain tetap bebas posting selama file ditulis.
+        """
+        sumber = {
+            'snapshot': st.session_state.transactions, 'bagan': self.get_bagan_akun(),
+            'saldo_awal': self.snapshot_periode()
+        }
+        if "Jurnal Umum" in daftar_jenis and sumber['saldo_awal'] is not None:
+            sumber['jurnal_lengkap'] = self.load_jurnal_lengkap()
+        if "Jurnal Penyesuaian" in daftar_jenis:
+            sumber['penyesuaian'] = self.load_penyesuaian_from_file()
+        if LAPORAN_BUTUH_SALDO.intersection(daftar_jenis):
+            laporan = self.hitung_snapshot_laporan()
+            sumber['saldo_penyesuaian'] = laporan['saldo_setelah_penyesuaian']
+            sumber['data_keuangan'] = laporan['data_keuangan']
+        return sumber
+
+    def bagian_ekspor(self, daftar_jenis, sumber=None, progres=None):
+        """(judul, kolom, generator baris) per laporan; sumber default milik session ini"""
+        sumber = sumber or self.sumber_ekspor(daftar_jenis)
+        bagian = ((jenis, EKSPOR_LAPORAN[jenis][0], EKSPOR_LAPORAN[jenis][1](sumber))
+                  for jenis in daftar_jenis)
+        if progres is not None:
+            bagian = dengan_progres(bagian, len(daftar_jenis), len(sumber['snapshot']), progres)
+        return bagian
+
     def generate_laporan(self, siklus, format_file):
         """Generate laporan berdasarkan siklus dan format"""
         try:
-            # Data untuk laporan - TANPA CONTOH
-            data = {
-                "judul": f"Laporan {siklus}",
-                "periode": "",
-                "perusahaan": "Peternakan Sientok", 
-                "tanggal_export": datetime.now().strftime("%d %B %Y %H:%M"),
-                "data": []
-            }
-            
-            # Generate file sesuai format
-            if format_file == "PDF":
-                return self.generate_pdf(data)
-            elif format_file == "Excel":
-                return self.generate_excel(data)
-            elif format_file == "CSV":
-                return self.generate_csv(data)
-            elif format_file == "HTML":
-                return self.generate_html(data)
-            elif format_file == "JSON":
-                return self.generate_json(data)
-            elif format_file == "XML":
-                return self.generate_xml(data)
-                
+            return self.render_laporan(self.data_laporan(siklus), format_file)
         except Exception as e:
             st.error(f"Error generating report: {e}")
             return None
 
-    def generate_pdf(self, data):
-        """Generate PDF report sederhana"""
-        try:
-            pdf_content = f"""
-    LAPORAN: {data['judul']}
-    ========================
-    Perusahaan: {data['perusahaan']}
-    Periode: {data['periode']}
-    Tanggal Export: {data['tanggal_export']}
-
-    DATA AKUN:
-    """
-            # Tidak ada data contoh
-            if not data['data']:
-                pdf_content += "\nTidak ada data transaksi"
-            
-            return pdf_content.encode('utf-8')
-        except Exception as e:
-            st.error(f"Error generating PDF: {e}")
-            return None
-
-    def generate_excel(self, data):
-        """Generate Excel report menggunakan pandas"""
-        try:
-            # Buat DataFrame kosong
-            df = pd.DataFrame(columns=["Akun", "Debit", "Kredit", "Saldo"])
-            
-            # Simpan ke bytes
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Sheet data utama
-                df.to_excel(writer, sheet_name='Data Akun', index=False)
-                
-                # Sheet info laporan
-                info_df = pd.DataFrame([
-                    ["Judul Laporan", data['judul']],
-                    ["Perusahaan", data['perusahaan']],
-                    ["Periode", data['periode']],
-                    ["Tanggal Export", data['tanggal_export']]
-                ], columns=["Keterangan", "Value"])
-                
-                info_df.to_excel(writer, sheet_name='Info Laporan', index=False)
-                
-            output.seek(0)
-            return output.getvalue()
-        except Exception as e:
-            st.error(f"Error generating Excel: {e}")
-            return None
+    def data_laporan(self, siklus):
+        """Judul, periode dan daftar laporan ledger untuk satu siklus"""
+        settings = self.load_system_settings()
+        # Data untuk laporan - TANPA CONTOH
+        return {
+            "judul": f"Laporan {siklus}",
+            "periode": f"{settings.get('periode_mulai', '')} s/d {settings.get('periode_akhir', '')}",
+            "perusahaan": "Peternakan Sientok", 
+            "tanggal_export": datetime.now().strftime("%d %B %Y %H:%M"),
+            "data": [],
+            # Laporan yang dialirkan dari Jurnal Umum untuk export CSV / Excel
+            "laporan": self.LAPORAN_SIKLUS.get(siklus, []),
+            "zip": siklus == "Semua Siklus"
+        }
 
-    def generate_csv(self, data):
-        """Generate CSV report"""
-        try:
-            df = pd.DataFrame(columns=["Akun", "Debit", "Kredit", "Saldo"])
-            return df.to_csv(index=False).encode('utf-8')
-        except Exception as e:
-            st.error(f"Error generating CSV: {e}")
-            return None
+    def render_laporan(self, data, format_file, sumber=None, progres=None):
+        """Tulis laporan ke bytes. Aman dipanggil dari thread pekerja kalau sumber diisi.
+
+        Error tidak ditangkap di sini (st.error tidak berfungsi di thread pekerja): antrian
+        export mencatatnya sebagai pesan pekerjaan, generate_laporan menampilkannya.
+        """
+        if data.get('zip'):
+            return self.generate_zip(data, format_file, sumber, progres)
+        # Generate file sesuai format
+        if format_file == "PDF":
+            return self.generate_pdf(data, sumber, progres)
+        elif format_file == "Excel":
+            return self.generate_excel(data, sumber, progres)
+        elif format_file == "CSV":
+            return self.generate_csv(data, sumber, progres)
+        elif format_file == "HTML":
+            return self.generate_html(data)
+        elif format_file == "JSON":
+            return self.generate_json(data)
+        elif format_file == "XML":
+            return self.generate_xml(data)
+
+    def generate_zip(self, data, format_file, sumber=None, progres=None):
+        """Generate ZIP berisi setiap laporan siklus; laporan dirender paralel.
+
+        Isi ZIP berformat Excel atau PDF kalau format itu dipilih, selain itu CSV.
+        """
+        info = [
+            ["Judul Laporan", data['judul']],
+            ["Perusahaan", data['perusahaan']],
+            ["Periode", data['periode']],
+            ["Tanggal Export", data['tanggal_export']]
+        ]
+        sumber = sumber or self.sumber_ekspor(data['laporan'])
+        with tempfile.TemporaryFile() as berkas:
+            tulis_zip_laporan(berkas, data['laporan'], format_file, info, sumber, progres)
+            berkas.seek(0)
+            return berkas.read()
+
+    def generate_pdf(self, data, sumber=None, progres=None):
+        """Generate PDF report: satu tabel per laporan, ditulis halaman demi halaman"""
+        kepala = [data['perusahaan'], data['judul'], f"Periode: {data['periode']}",
+                  f"Tanggal Export: {data['tanggal_export']}"]
+        bagian = self.bagian_ekspor(data.get('laporan', []), sumber, progres)
+        with tempfile.TemporaryFile() as berkas:
+            tulis_ekspor_pdf(berkas, kepala, bagian)
+            berkas.seek(0)
+            return berkas.read()
+
+    def generate_excel(self, data, sumber=None, progres=None):
+        """Generate Excel report: satu sheet per laporan, baris dialirkan dari Jurnal Umum"""
+        info = [
+            ["Judul Laporan", data['judul']],
+            ["Perusahaan", data['perusahaan']],
+            ["Periode", data['periode']],
+            ["Tanggal Export", data['tanggal_export']]
+        ]
+        bagian = self.bagian_ekspor(data.get('laporan', []), sumber, progres)
+        # Ditulis ke file sementara di disk, bukan DataFrame di memori
+        with tempfile.TemporaryFile() as berkas:
+            tulis_ekspor_excel(berkas, info, bagian)
+            berkas.seek(0)
+            return berkas.read()
+
+    def generate_csv(self, data, sumber=None, progres=None):
+        """Generate CSV report: semua laporan berurutan, baris dialirkan dari Jurnal Umum"""
+        kepala = [data['judul'], data['perusahaan'], f"Periode: {data['periode']}",
+                  f"Tanggal Export: {data['tanggal_export']}"]
+        with tempfile.TemporaryFile() as berkas:
+            tulis_ekspor_csv(berkas, kepala, self.bagian_ekspor(data.get('laporan', []), sumber, progres))
+            berkas.seek(0)
+            return berkas.read()
 
     def generate_html(self, data):
         """Generate HTML report"""
-        try:
-            html_content = f"""
-            <h1>{data['judul']}</h1>
-            <h2>{data['perusahaan']}</h2>
-            <p><strong>Periode:</strong> {data['periode']}</p>
-            <p><strong>Tanggal Export:</strong> {data['tanggal_export']}</p>
-            """
+        html_content = f"""
+        <h1>{data['judul']}</h1>
+        <h2>{data['perusahaan']}</h2>
+        <p><strong>Periode:</strong> {data['periode']}</p>
+        <p><strong>Tanggal Export:</strong> {data['tanggal_export']}</p>
+        """
             
-            if not data['data']:
-                html_content += "<p>Tidak ada data transaksi</p>"
+        if not data['data']:
+            html_content += "<p>Tidak ada data transaksi</p>"
             
-            return html_content.encode('utf-8')
-        except Exception as e:
-            st.error(f"Error generating HTML: {e}")
-            return None
+        return html_content.encode('utf-8')
 
     def generate_json(self, data):
         """Generate JSON report"""
-        try:
-            return json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8')
-        except Exception as e:
-            st.error(f"Error generating JSON: {e}")
-            return None
+        return json.dumps(data, indent=4, ensure_ascii=False, default=dict).encode('utf-8')
 
     def generate_xml(self, data):
         """Generate XML report"""
-        try:
-            xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-    <laporan>
-        <judul>{data['judul']}</judul>
-        <perusahaan>{data['perusahaan']}</perusahaan>
-        <periode>{data['periode']}</periode>
-        <tanggal_export>{data['tanggal_export']}</tanggal_export>
-        <data></data>
-    </laporan>"""
-            return xml_content.encode('utf-8')
-        except Exception as e:
-            st.error(f"Error generating XML: {e}")
-            return None
+        xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
+<laporan>
+    <judul>{data['judul']}</judul>
+    <perusahaan>{data['perusahaan']}</perusahaan>
+    <periode>{data['periode']}</periode>
+    <tanggal_export>{data['tanggal_export']}</tanggal_export>
+    <data></data>
+</laporan>"""
+        return xml_content.encode('utf-8')
         
     def print_document(self):
         """Fitur Print Document"""
@@ -3710,21 +7149,45 @@ class ModernLoginApp:
     def get_buku_besar_data(self):
         """Ambil data buku besar untuk print"""
         try:
-            if not st.session_state.transactions:
+            if not self.ada_transaksi_jurnal():
                 return []
             
             # Format data buku besar sederhana
             buku_besar_data = []
             
-            # Dapatkan semua akun unik
-            akun_list = list(set(trans['akun'] for trans in st.session_state.transactions))
+            awal = self.snapshot_periode()
+            saldo_awal = awal['saldo'] if awal else {}
+            
+            if self.storage.mendukung_query:
+                # Saldo & jumlah transaksi per akun periode terbuka dalam satu query GROUP BY,
+                # ditambah saldo snapshot periode tertutup
+                ringkasan = {
+                    akun: (saldo_mentah, jumlah)
+                    for akun, saldo_mentah, jumlah in self.storage.ringkasan_per_akun(awal['akhir'] if awal else None)
+                }
+                for akun in sorted(set(ringkasan) | set(saldo_awal)):
+                    saldo_mentah, jumlah = ringkasan.get(akun, (0, 0))
+                    saldo_mentah += saldo_awal.get(akun, 0)
+                    buku_besar_data.append({
+                        'akun': akun,
+                        'saldo': dari_sen(saldo_mentah if self.is_akun_debit(akun) else -saldo_mentah),
+                        'jumlah_transaksi': jumlah
+                    })
+                return buku_besar_data
+            
+            # Dapatkan semua akun unik dari index akun (+ akun bersaldo di snapshot periode tertutup)
+            indeks_akun = self.get_indeks_akun()
             
-            for akun in sorted(akun_list):
-                # Filter transaksi untuk akun ini
-                transaksi_akun = [trans for trans in st.session_state.transactions if trans['akun'] == akun]
+            for akun in sorted(set(indeks_akun.daftar_akun()) | set(saldo_awal)):
+                # Ambil transaksi akun ini lewat index (total O(baris) untuk semua akun)
+                transaksi_akun = indeks_akun.baris_akun(st.session_state.transactions, akun)
+                if awal:
+                    transaksi_akun = [trans for trans in transaksi_akun if urutan_tanggal(trans) > awal['akhir']]
                 
-                # Hitung saldo
-                saldo = 0
+                # Hitung saldo, mulai dari saldo snapshot periode tertutup
+                saldo = dari_sen(saldo_awal.get(akun, 0))
+                if not self.is_akun_debit(akun):
+                    saldo = -saldo
                 for trans in transaksi_akun:
                     if self.is_akun_debit(akun):
                         saldo += trans['debit'] - trans['kredit']
@@ -3771,15 +7234,17 @@ class ModernLoginApp:
             beban_total = 0
             
             # Hitung pendapatan dan beban
+            bagan_akun = self.get_bagan_akun()
             for akun, saldo in saldo_akun.items():
-                if "Pendapatan" in akun:
+                tipe = bagan_akun.tipe(akun)
+                if tipe == "Pendapatan":
                     pendapatan_total += saldo
                     laba_rugi_data.append({
                         'item': akun,
                         'jumlah': saldo,
                         'tipe': 'pendapatan'
                     })
-                elif "Beban" in akun:
+                elif tipe == "Beban":
                     beban_total += abs(saldo)
                     laba_rugi_data.append({
                         'item': akun,
@@ -3850,7 +7315,12 @@ class ModernLoginApp:
         
         with col_btn1:
             if st.button("🖨️ PRINT NOW", use_container_width=True, type="primary"):
-                self.execute_print(selected_doc, print_method)
+                opsi = {
+                    'paper_size': paper_size, 'scale': scale,
+                    'orientation': orientation, 'margins': margins,
+                    'include_header': include_header, 'page_numbers': page_numbers
+                }
+                self.execute_print(selected_doc, print_method, opsi)
         
         with col_btn2:
             if st.button("👁️ PREVIEW", use_container_width=True):
@@ -3960,7 +7430,7 @@ class ModernLoginApp:
         df = pd.DataFrame(preview_data)
         st.dataframe(df, use_container_width=True, hide_index=True)
 
-    def execute_print(self, doc_type, method):
+    def execute_print(self, doc_type, method, opsi=None):
         """Execute print action dengan data real"""
         
         print_data = self.get_print_data(doc_type)
@@ -4003,7 +7473,7 @@ class ModernLoginApp:
         
         elif method == "Save as PDF":
             # Generate PDF menggunakan cara sederhana
-            pdf_data = self.generate_pdf_for_print(doc_type, print_data)
+            pdf_data = self.generate_pdf_for_print(doc_type, print_data, opsi)
             
             if pdf_data:
                 st.success("📄 PDF siap diunduh!")
@@ -4103,50 +7573,41 @@ class ModernLoginApp:
         return text
 
     def generate_csv_for_print(self, doc_type, data):
-        """Generate CSV file untuk buka di Excel"""
-        import csv
-        from io import StringIO
-        
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Header
-        writer.writerow(["PETERNakan SIENTOK"])
-        writer.writerow([doc_type.upper()])
-        writer.writerow([f"Tanggal: {datetime.now().strftime('%d %B %Y %H:%M')}"])
-        writer.writerow([])  # Empty row
-        
-        if doc_type == "Jurnal Umum":
-            writer.writerow(["Tanggal", "Akun", "Keterangan", "Debit", "Kredit"])
-            for trans in data:
-                writer.writerow([
-                    trans['tanggal'],
-                    trans['akun'],
-                    trans.get('keterangan', ''),
-                    trans['debit'],
-                    trans['kredit']
-                ])
-        
-        elif doc_type == "Buku Besar":
-            writer.writerow(["Akun", "Saldo", "Jumlah Transaksi"])
-            for item in data:
-                writer.writerow([
-                    item['akun'],
-                    item['saldo'],
-                    item['jumlah_transaksi']
-                ])
-        
-        elif doc_type == "Neraca Saldo":
-            writer.writerow(["Akun", "Debit", "Kredit"])
-            for item in data:
-                writer.writerow([
-                    item['akun'],
-                    item['debit'],
-                    item['kredit']
-                ])
-        
-        csv_content = output.getvalue()
-        return csv_content
+        """Generate CSV file untuk buka di Excel (baris dialirkan dari Jurnal Umum lewat file sementara)"""
+        kepala = ["PETERNAKAN SIENTOK", f"Tanggal: {datetime.now().strftime('%d %B %Y %H:%M')}"]
+        daftar_jenis = [doc_type] if doc_type in EKSPOR_LAPORAN else []
+        with tempfile.TemporaryFile() as berkas:
+            tulis_ekspor_csv(berkas, kepala, self.bagian_ekspor(daftar_jenis))
+            berkas.seek(0)
+            return berkas.read()
+
+    def generate_pdf_for_print(self, doc_type, data, opsi=None):
+        """Generate PDF sesuai pengaturan print (kertas, orientasi, margin, skala, nomor halaman)"""
+        try:
+            opsi = opsi or {}
+            kepala = []
+            if opsi.get('include_header', True):
+                kepala = ["PETERNAKAN SIENTOK", f"Tanggal: {datetime.now().strftime('%d %B %Y %H:%M')}"]
+            skala = opsi.get('scale', "100%")
+            pengaturan = {
+                'kertas': opsi.get('paper_size', "A4"),
+                'orientasi': opsi.get('orientation', "Portrait"),
+                'margin': opsi.get('margins', "Normal"),
+                'skala': None if skala == "Fit to Page" else int(skala.rstrip('%')) / 100,
+                'nomor_halaman': opsi.get('page_numbers', True)
+            }
+            if doc_type in EKSPOR_LAPORAN:
+                # Jurnal Umum / Buku Besar rinci / Neraca Saldo dialirkan dari snapshot jurnal
+                bagian = self.bagian_ekspor([doc_type])
+            else:
+                bagian = [(doc_type, ["Item", "Jumlah"], ([item['item'], item['jumlah']] for item in data))]
+            with tempfile.TemporaryFile() as berkas:
+                tulis_ekspor_pdf(berkas, kepala, bagian, **pengaturan)
+                berkas.seek(0)
+                return berkas.read()
+        except Exception as e:
+            st.error(f"Error generating PDF: {e}")
+            return None
 
     def display_text_preview(self, doc_type, data):
         """Tampilkan preview text di Streamlit"""
@@ -4179,7 +7640,13 @@ def main():
     )
     
     app = ModernLoginApp()
-    app.run()
+    try:
+        app.run()
+    finally:
+        # Saldo akun yang diubah selama request ditulis sekali di sini (juga saat st.rerun())
+        app.flush_saldo_akun()
+        # Di finally supaya st.rerun() di dalam run() tidak melewatkan pengecekan backup
+        app.backup_terjadwal()
 
 if __name__ == "__main__":
     main()
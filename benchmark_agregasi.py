@@ -0,0 +1,72 @@
+"""Benchmark agregasi neraca saldo: loop dict per baris vs JurnalKolom (NumPy).
+
+Jalankan: python benchmark_agregasi.py [jumlah_baris]
+"""
+import random
+import sys
+import time
+from datetime import date
+
+from app import JurnalKolom, ke_sen, normalisasi_baris
+
+AKUN = [
+    "Kas", "Bank", "Piutang Usaha", "Persediaan", "Perlengkapan", "Peralatan",
+    "Utang Usaha", "Modal Pemilik", "Penjualan", "Pembelian", "Beban Gaji",
+    "Beban Listrik", "Beban Air", "Beban pakan", "Beban Pengiriman", "Prive"
+]
+
+
+def buat_jurnal(jumlah_baris):
+    random.seed(42)
+    transactions = []
+    for _ in range(jumlah_baris // 2):
+        tanggal = f"{random.randint(1, 28):02d} January 2024"
+        nominal = random.randint(1, 5_000_000) + random.choice([0, 0.5, 0.25])
+        akun_debit, akun_kredit = random.sample(AKUN, 2)
+        transactions.append({'tanggal': tanggal, 'akun': akun_debit, 'debit': nominal, 'kredit': 0})
+        transactions.append({'tanggal': tanggal, 'akun': akun_kredit, 'debit': 0, 'kredit': nominal})
+    # Sama seperti data yang tersimpan: sudah punya tanggal_urut dan nominal kanonik
+    for trans in transactions:
+        normalisasi_baris(trans)
+    return transactions
+
+
+def saldo_loop(transactions):
+    saldo = {}
+    for trans in transactions:
+        akun = trans['akun']
+        saldo[akun] = saldo.get(akun, 0) + ke_sen(trans['debit']) - ke_sen(trans['kredit'])
+    return saldo
+
+
+def ukur(nama, fungsi, ulang=3):
+    terbaik = min(_waktu(fungsi) for _ in range(ulang))
+    print(f"{nama:<45} {terbaik * 1000:>10.1f} ms")
+    return terbaik
+
+
+def _waktu(fungsi):
+    mulai = time.perf_counter()
+    fungsi()
+    return time.perf_counter() - mulai
+
+
+def main():
+    jumlah_baris = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    transactions = buat_jurnal(jumlah_baris)
+    print(f"Jurnal: {len(transactions):,} baris, {len(AKUN)} akun")
+
+    kolom = JurnalKolom.dari_transaksi(transactions)
+    assert kolom.saldo_per_akun() == saldo_loop(transactions)
+
+    waktu_loop = ukur("Loop dict per baris", lambda: saldo_loop(transactions))
+    waktu_bangun = ukur("JurnalKolom: bangun kolom + add.at", lambda: JurnalKolom.dari_transaksi(transactions).saldo_per_akun())
+    waktu_kolom = ukur("JurnalKolom: add.at saja (kolom sudah ada)", kolom.saldo_per_akun)
+    ukur("JurnalKolom: saldo per tanggal 15 Jan 2024", lambda: kolom.saldo_per_akun(sampai=date(2024, 1, 15).toordinal()))
+
+    print(f"Percepatan bangun + agregasi : {waktu_loop / waktu_bangun:.1f}x")
+    print(f"Percepatan agregasi kolom    : {waktu_loop / waktu_kolom:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Benchmark export laporan.
+
+1. Memori export Jurnal Umum: DataFrame di memori vs baris dialirkan ke file.
+2. Waktu ZIP "Semua Siklus": laporan dirender berurutan vs paralel di process pool.
+
+Jalankan: python benchmark_ekspor.py [jumlah_baris]
+"""
+import io
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app import (EKSPOR_LAPORAN, BarisJurnal, normalisasi_baris, render_bagian_ekspor,
+                 tulis_ekspor_csv, tulis_ekspor_excel, tulis_zip_laporan)
+
+AKUN = [
+    "Kas", "Bank", "Piutang Usaha", "Persediaan", "Perlengkapan", "Peralatan",
+    "Utang Usaha", "Modal Pemilik", "Penjualan", "Pembelian", "Beban Gaji",
+    "Beban Listrik", "Beban Air", "Beban pakan", "Beban Pengiriman", "Prive"
+]
+
+
+LEDGER = ["Jurnal Umum", "Buku Besar", "Neraca Saldo"]
+
+
+class BaganSederhana:
+    """Cukup untuk benchmark: akun Aset / Beban bersaldo normal debit"""
+    def tipe(self, nama):
+        if nama.startswith(("Utang", "Modal", "Penjualan")):
+            return "Pendapatan" if nama == "Penjualan" else "Modal"
+        return "Beban" if nama.startswith(("Beban", "Pembelian")) else "Aset"
+
+    def normal_debit(self, nama):
+        return self.tipe(nama) in ("Aset", "Beban")
+
+    def nominal(self, nama):
+        return self.tipe(nama) in ("Pendapatan", "Beban")
+
+
+def buat_jurnal(jumlah_baris):
+    random.seed(42)
+    transactions = []
+    for _ in range(jumlah_baris // 2):
+        tanggal = f"{random.randint(1, 28):02d} January 2024"
+        nominal = random.randint(1, 5_000_000)
+        akun_debit, akun_kredit = random.sample(AKUN, 2)
+        for akun, debit, kredit in ((akun_debit, nominal, 0), (akun_kredit, 0, nominal)):
+            transactions.append(normalisasi_baris({
+                'tanggal': tanggal, 'akun': akun, 'debit': debit, 'kredit': kredit,
+                'keterangan': "Transaksi harian", 'ref': ""
+            }))
+    return tuple(BarisJurnal.dari_daftar(transactions))
+
+
+def buat_sumber(snapshot):
+    saldo = {}
+    for trans in snapshot:
+        saldo[trans['akun']] = saldo.get(trans['akun'], 0) + trans['debit'] - trans['kredit']
+    bagan = BaganSederhana()
+    saldo = {akun: nilai if bagan.normal_debit(akun) else -nilai for akun, nilai in saldo.items()}
+    data_keuangan = {
+        'pendapatan': {}, 'beban_operasional': {}, 'beban_penyusutan': {}, 'beban_lainnya': {},
+        'aset_lancar': {}, 'aset_tetap': {}, 'akumulasi_penyusutan': {}, 'kewajiban': {}
+    }
+    for kunci in ('total_pendapatan', 'hpp_total', 'laba_kotor', 'total_beban', 'laba_bersih', 'modal_awal',
+                  'modal_akhir', 'total_aset', 'total_kewajiban_modal'):
+        data_keuangan[kunci] = 0
+    return {'snapshot': snapshot, 'bagan': bagan, 'penyesuaian': [],
+            'saldo_penyesuaian': saldo, 'data_keuangan': data_keuangan}
+
+
+def bagian(sumber):
+    for jenis in LEDGER:
+        kolom, baris = EKSPOR_LAPORAN[jenis]
+        yield jenis, kolom, baris(sumber)
+
+
+def ekspor_dataframe(sumber, format_file):
+    output = io.BytesIO()
+    frames = {jenis: pd.DataFrame(list(baris), columns=kolom) for jenis, kolom, baris in bagian(sumber)}
+    if format_file == "CSV":
+        for df in frames.values():
+            output.write(df.to_csv(index=False).encode('utf-8'))
+    else:
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            for jenis, df in frames.items():
+                df.to_excel(writer, sheet_name=jenis, index=False)
+    return output.getbuffer().nbytes
+
+
+def ekspor_stream(sumber, format_file):
+    with tempfile.TemporaryFile() as berkas:
+        if format_file == "CSV":
+            tulis_ekspor_csv(berkas, ["Benchmark"], bagian(sumber))
+        else:
+            tulis_ekspor_excel(berkas, [["Judul Laporan", "Benchmark"]], bagian(sumber))
+        return berkas.tell()
+
+
+def zip_berurutan(sumber, format_file):
+    for jenis in EKSPOR_LAPORAN:
+        render_bagian_ekspor(jenis, format_file, [["Judul Laporan", "Benchmark"]], sumber)
+
+
+def zip_paralel(sumber, format_file):
+    with tempfile.TemporaryFile() as berkas:
+        tulis_zip_laporan(berkas, list(EKSPOR_LAPORAN), format_file, [["Judul Laporan", "Benchmark"]], sumber)
+
+
+def _waktu(fungsi):
+    mulai = time.perf_counter()
+    fungsi()
+    return time.perf_counter() - mulai
+
+
+def ukur(nama, fungsi):
+    tracemalloc.start()
+    mulai = time.perf_counter()
+    ukuran = fungsi()
+    waktu = time.perf_counter() - mulai
+    _, puncak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nama:<30} puncak {puncak / 1024 / 1024:>8.1f} MiB  {waktu:>7.1f} s  file {ukuran / 1024 / 1024:>7.1f} MiB")
+    return puncak
+
+
+def main():
+    jumlah_baris = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    sumber = buat_sumber(buat_jurnal(jumlah_baris))
+    print(f"Jurnal: {len(sumber['snapshot']):,} baris -> Jurnal Umum + Buku Besar + Neraca Saldo")
+
+    for format_file in ("CSV", "Excel"):
+        puncak_df = ukur(f"{format_file}: DataFrame", lambda: ekspor_dataframe(sumber, format_file))
+        puncak_stream = ukur(f"{format_file}: streaming", lambda: ekspor_stream(sumber, format_file))
+        print(f"{format_file}: puncak memori {puncak_df / puncak_stream:.0f}x lebih kecil")
+
+    print(f"\nZIP Semua Siklus ({len(EKSPOR_LAPORAN)} laporan)")
+    # pool_ekspor dibuat sekali per proses server; start pekerja tidak ikut diukur
+    zip_paralel(buat_sumber(buat_jurnal(100)), "CSV")
+    for format_file in ("CSV", "Excel"):
+        waktu_urut = _waktu(lambda: zip_berurutan(sumber, format_file))
+        waktu_paralel = _waktu(lambda: zip_paralel(sumber, format_file))
+        print(f"{format_file}: berurutan {waktu_urut:>6.1f} s  paralel {waktu_paralel:>6.1f} s"
+              f"  ({waktu_urut / waktu_paralel:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark memori Jurnal Umum di session: list of dict (hasil json.load) vs BarisJurnal.
+
+Jalankan: python benchmark_memori.py [jumlah_baris]
+"""
+import json
+import random
+import sys
+import tracemalloc
+
+from app import BarisJurnal, normalisasi_baris
+
+AKUN = [
+    "Kas", "Bank", "Piutang Usaha", "Persediaan", "Perlengkapan", "Peralatan",
+    "Utang Usaha", "Modal Pemilik", "Penjualan", "Pembelian", "Beban Gaji",
+    "Beban Listrik", "Beban Air", "Beban pakan", "Beban Pengiriman", "Prive"
+]
+KETERANGAN = [
+    "Penjualan ayam", "Pembelian pakan", "Bayar listrik", "Bayar air",
+    "Setoran modal", "Gaji karyawan", "Ongkos kirim", "Pembelian vitamin"
+]
+
+
+def buat_json_jurnal(jumlah_baris):
+    """Teks JSON seperti jurnal_umum_transactions.json (string berulang, nominal campuran)"""
+    random.seed(42)
+    transactions = []
+    for _ in range(jumlah_baris // 2):
+        tanggal = f"{random.randint(1, 28):02d} January 2024"
+        keterangan = random.choice(KETERANGAN)
+        nominal = random.randint(1, 5_000_000)
+        akun_debit, akun_kredit = random.sample(AKUN, 2)
+        for akun, debit, kredit in ((akun_debit, nominal, 0), (akun_kredit, 0, nominal)):
+            transactions.append(normalisasi_baris({
+                'tanggal': tanggal, 'akun': akun, 'debit': debit, 'kredit': kredit,
+                'keterangan': keterangan, 'ref': ""
+            }))
+    return json.dumps(transactions)
+
+
+def ukur_memori(nama, buat):
+    tracemalloc.start()
+    hasil = buat()
+    terpakai, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nama:<35} {terpakai / 1024 / 1024:>8.1f} MiB  ({terpakai / len(hasil):>6.0f} byte/baris)")
+    return terpakai, hasil
+
+
+def main():
+    jumlah_baris = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    teks = buat_json_jurnal(jumlah_baris)
+    print(f"Jurnal: {jumlah_baris:,} baris")
+
+    memori_dict, sebagai_dict = ukur_memori("list of dict (json.load)", lambda: json.loads(teks))
+    memori_baris, sebagai_baris = ukur_memori(
+        "list of BarisJurnal", lambda: BarisJurnal.dari_daftar(json.loads(teks))
+    )
+    assert sebagai_baris == sebagai_dict
+
+    print(f"Penghematan: {(1 - memori_baris / memori_dict) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    """Folder kerja kosong; storage memakai nama file default (relatif) di sini"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def entri(tanggal, debit_akun, kredit_akun, jumlah, keterangan=''):
+    """Satu posting seimbang (dua baris) dalam format Jurnal Umum"""
+    return [
+        {'tanggal': tanggal, 'akun': debit_akun, 'debit': jumlah, 'kredit': 0, 'keterangan': keterangan, 'ref': ''},
+        {'tanggal': tanggal, 'akun': kredit_akun, 'debit': 0, 'kredit': jumlah, 'keterangan': keterangan, 'ref': ''},
+    ]
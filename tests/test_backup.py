@@ -0,0 +1,88 @@
+import io
+import json
+import os
+
+import pytest
+
+from app import ArsipBackup
+from conftest import entri
+
+
+def buat_arsip(folder, transactions):
+    arsip = ArsipBackup(str(folder / "backup"))
+    manifest = arsip.buat({'accounts': [{'Kas': {'type': 'Aset', 'balance': 0}}], 'transactions': transactions})
+    berkas = io.BytesIO()
+    arsip.tulis_arsip(manifest, berkas)
+    berkas.seek(0)
+    return berkas
+
+
+def baca_semua(berkas):
+    return {nama: list(records) for nama, records in ArsipBackup.baca_arsip(berkas)}
+
+
+def jumlah_chunk(arsip):
+    return sum(len(berkas) for _, _, berkas in os.walk(arsip.folder_chunk))
+
+
+def test_arsip_backup_bolak_balik(folder):
+    transactions = entri("10 January 2024", "Kas", "Modal Pemilik", 1000) * 3
+    isi = baca_semua(buat_arsip(folder, transactions))
+    assert isi['transactions'] == transactions
+    assert isi['accounts'] == [{'Kas': {'type': 'Aset', 'balance': 0}}]
+
+
+def test_backup_inkremental_memakai_ulang_chunk(folder):
+    arsip = ArsipBackup(str(folder / "backup"), rata_baris_chunk=4, simpan_manifest=2)
+    transactions = []
+    for i in range(100):
+        transactions += entri(f"{i % 28 + 1:02d} January 2024", "Kas", "Pendapatan Jasa", i + 1)
+
+    pertama = arsip.buat({'transactions': transactions})
+    assert pertama['chunk_lama'] == 0
+
+    # Satu posting baru hanya mengubah chunk terakhir
+    kedua = arsip.buat({'transactions': transactions + entri("29 January 2024", "Beban Sewa", "Kas", 5)})
+    assert kedua['chunk_baru'] <= 2 and kedua['chunk_lama'] == pertama['chunk_baru'] - 1
+    assert arsip.terakhir()['id'] == kedua['id']
+
+    # Hanya `simpan_manifest` backup terbaru yang disimpan; chunk yang tidak dirujuk lagi dihapus
+    arsip.buat({'transactions': entri("01 February 2024", "Kas", "Modal Pemilik", 1)})
+    arsip.buat({'transactions': entri("02 February 2024", "Kas", "Modal Pemilik", 2)})
+    assert len(arsip.daftar_manifest()) == 2
+    assert jumlah_chunk(arsip) == 2
+
+
+def test_restore_menolak_checksum_salah(folder):
+    berkas = buat_arsip(folder, entri("10 January 2024", "Kas", "Modal Pemilik", 1000))
+    mentah = ArsipBackup.buka_arsip(berkas).read()
+    rusak = io.BytesIO(mentah.replace(b'"Modal Pemilik"', b'"Modal Pemilyk"'))
+    with pytest.raises(ValueError, match="checksum"):
+        baca_semua(rusak)
+
+
+def test_restore_menolak_arsip_terpotong(folder):
+    mentah = ArsipBackup.buka_arsip(buat_arsip(folder, entri("10 January 2024", "Kas", "Modal Pemilik", 1000))).read()
+    with pytest.raises(ValueError, match="terpotong"):
+        baca_semua(io.BytesIO(mentah[:-10]))
+
+
+def test_restore_menolak_jurnal_tidak_seimbang(folder):
+    transactions = entri("10 January 2024", "Kas", "Modal Pemilik", 1000)
+    transactions[1]['kredit'] = 999
+    with pytest.raises(ValueError, match="tidak seimbang"):
+        baca_semua(buat_arsip(folder, transactions))
+
+
+def test_restore_menolak_backup_lama_tidak_seimbang(folder):
+    transactions = entri("10 January 2024", "Kas", "Modal Pemilik", 1000)
+    transactions[0]['debit'] = 1000.01
+    berkas = io.BytesIO(json.dumps({'transactions': transactions}).encode())
+    with pytest.raises(ValueError, match="tidak seimbang"):
+        baca_semua(berkas)
+
+
+def test_restore_menerima_backup_lama_seimbang(folder):
+    transactions = entri("10 January 2024", "Kas", "Modal Pemilik", 1000)
+    berkas = io.BytesIO(json.dumps({'transactions': transactions, 'users': {'admin': {}}}).encode())
+    assert baca_semua(berkas) == {'transactions': transactions, 'users': [{'admin': {}}]}
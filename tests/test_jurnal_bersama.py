@@ -0,0 +1,28 @@
+from app import JsonStorage, JurnalBersama
+from conftest import entri
+
+
+def test_snapshot_lama_tidak_ikut_berubah(folder):
+    jurnal = JurnalBersama(JsonStorage())
+    jurnal.tambah(entri("10 January 2024", "Kas", "Modal Pemilik", 1000))
+    versi, lama, _ = jurnal.ambil()
+
+    jurnal.tambah(entri("12 January 2024", "Kas", "Pendapatan Jasa", 200))
+    _, baru, _ = jurnal.ambil()
+
+    # Copy-on-write: session yang memegang snapshot lama tetap melihat isi lama
+    assert len(lama) == 2 and len(baru) == 4
+    assert baru[:2] == lama and baru[0] is lama[0]
+    assert jurnal.hanya_tambah_sejak(versi)
+
+    jurnal.hapus_tanggal("10 January 2024")
+    assert not jurnal.hanya_tambah_sejak(versi)
+    assert [b['tanggal'] for b in jurnal.ambil()[1]] == ["12 January 2024"] * 2
+
+
+def test_jurnal_bersama_melihat_tulisan_proses_lain(folder):
+    jurnal = JurnalBersama(JsonStorage())
+    jurnal.tambah(entri("10 January 2024", "Kas", "Modal Pemilik", 1000))
+    # Handle storage lain = worker lain yang menulis file yang sama
+    JurnalBersama(JsonStorage()).tambah(entri("12 January 2024", "Kas", "Pendapatan Jasa", 200))
+    assert len(jurnal.ambil()[1]) == 4
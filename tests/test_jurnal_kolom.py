@@ -0,0 +1,23 @@
+from app import JurnalKolom, SaldoAkunCache, ke_sen, urutan_tanggal
+from conftest import entri
+
+
+def test_jurnal_kolom_eksak_di_atas_2_pangkat_53():
+    besar = 2 ** 53 // 100 * 3 + 0.01
+    transactions = entri("10 January 2024", "Kas", "Modal Pemilik", besar) + entri("11 January 2024", "Kas", "Modal Pemilik", 0.01)
+    kolom = JurnalKolom.dari_transaksi(transactions)
+
+    assert kolom.saldo_per_akun() == {'Kas': ke_sen(besar) + 1, 'Modal Pemilik': -ke_sen(besar) - 1}
+    assert kolom.saldo_per_akun(urutan_tanggal(transactions[0])) == {'Kas': ke_sen(besar), 'Modal Pemilik': -ke_sen(besar)}
+    assert kolom.total() == (ke_sen(besar) + 1, ke_sen(besar) + 1)
+
+
+def test_jurnal_kolom_sama_dengan_cache():
+    transactions = []
+    for i in range(300):
+        transactions += entri(f"{i % 28 + 1:02d} March 2024", "Kas", "Pendapatan Jasa", 12.34 * i)
+        transactions += entri(f"{i % 28 + 1:02d} March 2024", "Beban Listrik", "Kas", 0.07)
+    cache = SaldoAkunCache()
+    for trans in transactions:
+        cache.tambah(trans)
+    assert JurnalKolom.dari_transaksi(transactions).saldo_per_akun() == cache.saldo
@@ -0,0 +1,85 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from app import JsonStorage, JurnalBersama, SqliteStorage
+from conftest import entri
+
+AKHIR_JANUARI = datetime(2024, 1, 31).toordinal()
+
+
+def test_jurnal_lama_dipindah_ke_segmen(folder):
+    with open("jurnal_umum_transactions.json", "w") as f:
+        json.dump(entri("05 January 2024", "Kas", "Modal Pemilik", 1000), f)
+    storage = JsonStorage()
+    basis = storage.get_basis_snapshot()
+    with open("jurnal_umum_transactions.jsonl", "w") as f:
+        f.write(json.dumps(basis) + "\n")
+        for baris in entri("03 February 2024", "Beban Sewa", "Kas", 250):
+            f.write(json.dumps({'op': 'tambah', 'baris': baris}) + "\n")
+        f.write(json.dumps({'op': 'hapus_tanggal', 'tanggal': "05 January 2024"}) + "\n")
+        for baris in entri("06 January 2024", "Kas", "Pendapatan Jasa", 400):
+            f.write(json.dumps({'op': 'tambah', 'baris': baris}) + "\n")
+
+    jurnal = storage.load_jurnal()
+
+    assert storage.daftar_segmen() == ["Jan-2024", "Feb-2024"]
+    assert [(b['tanggal'], b['akun']) for b in jurnal] == [
+        ("06 January 2024", "Kas"), ("06 January 2024", "Pendapatan Jasa"),
+        ("03 February 2024", "Beban Sewa"), ("03 February 2024", "Kas"),
+    ]
+    assert all(b['tanggal_urut'] > 0 for b in jurnal)
+    # Format lama dihapus setelah dipindah; migrasi tidak diulang
+    assert not os.path.exists("jurnal_umum_transactions.json")
+    assert not os.path.exists("jurnal_umum_transactions.jsonl")
+    assert JsonStorage().load_jurnal() == jurnal
+
+
+def test_append_hanya_menyentuh_segmen_periodenya(folder):
+    storage = JsonStorage()
+    storage.append_jurnal(entri("10 January 2024", "Kas", "Modal Pemilik", 1000))
+    versi = storage.versi_jurnal()
+
+    # Append ke segmen terakhir / segmen baru sesudahnya = hanya tambah
+    assert storage.append_jurnal(entri("02 February 2024", "Kas", "Pendapatan Jasa", 300)) is False
+    assert storage.hanya_tambah_sejak(versi)
+
+    # Baris untuk periode sebelumnya masuk ke segmen Januari: urutan di disk berubah
+    versi = storage.versi_jurnal()
+    assert storage.append_jurnal(entri("11 January 2024", "Beban Gaji", "Kas", 100)) is True
+    assert not storage.hanya_tambah_sejak(versi)
+    assert [b['tanggal'] for b in storage.load_jurnal()] == ["10 January 2024"] * 2 + ["11 January 2024"] * 2 + ["02 February 2024"] * 2
+
+    # Hapus menulis ulang segmen (generasi naik), bukan append
+    versi = storage.versi_jurnal()
+    storage.hapus_jurnal_tanggal("11 January 2024")
+    assert not storage.hanya_tambah_sejak(versi)
+    assert len(storage.load_jurnal()) == 4
+
+
+@pytest.mark.parametrize("buat_storage", [JsonStorage, lambda: SqliteStorage("uji.db")], ids=["json", "sqlite"])
+def test_tutup_dan_buka_periode(folder, buat_storage):
+    storage = buat_storage()
+    jurnal = JurnalBersama(storage)
+    jurnal.tambah(entri("10 January 2024", "Kas", "Modal Pemilik", 1000))
+    jurnal.tambah(entri("02 February 2024", "Kas", "Pendapatan Jasa", 300))
+
+    # Tutup Januari: hanya segmen sesudah periode tertutup yang dimuat
+    jurnal.atur_sejak(AKHIR_JANUARI)
+    _, snapshot, versi_storage = jurnal.ambil()
+    assert [b['tanggal'] for b in snapshot] == ["02 February 2024"] * 2
+    assert versi_storage['sejak'] == AKHIR_JANUARI
+    assert len(storage.load_jurnal()) == 4
+
+    versi, _, _ = jurnal.ambil()
+    jurnal.tambah(entri("05 February 2024", "Beban Sewa", "Kas", 50))
+    assert jurnal.hanya_tambah_sejak(versi)
+    assert len(jurnal.ambil()[1]) == 4
+
+    # Buka lagi: seluruh riwayat dimuat ulang, dan itu bukan sekadar tambah baris
+    versi, _, _ = jurnal.ambil()
+    jurnal.atur_sejak(None)
+    assert not jurnal.hanya_tambah_sejak(versi)
+    assert len(jurnal.ambil()[1]) == 6
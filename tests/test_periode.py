@@ -0,0 +1,88 @@
+import pytest
+
+from app import BaganAkun, PeriodeAkuntansi, SaldoAkunCache, urutan_tanggal
+from conftest import entri
+
+BAGAN = BaganAkun({
+    'Kas': {'type': 'Aset'}, 'Modal Pemilik': {'type': 'Modal'}, 'Prive': {'type': 'Modal'},
+    'Pendapatan Jasa': {'type': 'Pendapatan'}, 'Beban Sewa': {'type': 'Beban'},
+})
+
+
+def tutup_sampai(periode, transactions, sampai, tahunan=False):
+    """Tutup periode satu per satu sampai `sampai`, seperti tutup_periode di aplikasi"""
+    while True:
+        nama = periode.pertama_terbuka()
+        awal, akhir = periode.rentang(nama)
+        baris = [trans for trans in transactions if awal <= urutan_tanggal(trans) <= akhir]
+        periode.tutup(nama, baris, tahunan and nama == sampai, BAGAN)
+        if nama == sampai:
+            return
+
+
+TAHUN_2024 = (
+    entri("10 January 2024", "Kas", "Modal Pemilik", 1000)
+    + entri("15 March 2024", "Kas", "Pendapatan Jasa", 400)
+    + entri("20 June 2024", "Beban Sewa", "Kas", 150)
+    + entri("30 December 2024", "Prive", "Kas", 50)
+)
+
+
+def test_bangun_ulang_dari_snapshot_periode():
+    januari = entri("10 January 2024", "Kas", "Modal Pemilik", 1000.55)
+    februari = entri("02 February 2024", "Beban Sewa", "Kas", 250.45)
+    penuh = SaldoAkunCache()
+    penuh.bangun_ulang(januari + februari)
+
+    awal = SaldoAkunCache()
+    awal.bangun_ulang(januari)
+    snapshot = {
+        'akhir': urutan_tanggal(januari[0]) + 21, 'saldo': awal.saldo, 'total_debit': awal.total_debit,
+        'total_kredit': awal.total_kredit, 'jumlah_baris': awal.jumlah_baris,
+    }
+    # Hanya baris periode terbuka yang dijumlah; baris periode tertutup diwakili snapshot
+    lanjutan = SaldoAkunCache()
+    lanjutan.bangun_ulang(februari, awal=snapshot)
+
+    assert lanjutan.saldo == penuh.saldo == {'Kas': 75010, 'Modal Pemilik': -100055, 'Beban Sewa': 25045}
+    assert (lanjutan.total_debit, lanjutan.total_kredit, lanjutan.jumlah_baris) == (125100, 125100, 4)
+
+
+def test_tutup_bulanan_menyimpan_saldo_kumulatif():
+    periode = PeriodeAkuntansi({'periods': ["Jan-2024"]})
+    tutup_sampai(periode, TAHUN_2024, "Jun-2024")
+    snapshot = periode.snapshot_terakhir()
+
+    assert periode.terakhir_ditutup() == "Jun-2024"
+    assert snapshot['saldo'] == {'Kas': 125000, 'Modal Pemilik': -100000, 'Pendapatan Jasa': -40000, 'Beban Sewa': 15000}
+    assert snapshot['jumlah_baris'] == 6
+    assert periode.pertama_terbuka() == "Jul-2024"
+    with pytest.raises(ValueError):
+        periode.tutup("Sep-2024", [], bagan=BAGAN)
+
+
+def test_tutup_tahun_memindahkan_akun_nominal_ke_modal():
+    periode = PeriodeAkuntansi({'periods': ["Jan-2024"]})
+    tutup_sampai(periode, TAHUN_2024, "Des-2024", tahunan=True)
+    snapshot = periode.snapshot_terakhir()
+
+    # Laba 250 dikurangi prive 50 masuk ke modal; tahun berikutnya mulai tanpa saldo nominal
+    assert snapshot['saldo'] == {'Kas': 120000, 'Modal Pemilik': -120000}
+    assert snapshot['tahunan'] and not periode.snapshot["Nov-2024"]['tahunan']
+    assert (snapshot['total_debit'], snapshot['total_kredit'], snapshot['jumlah_baris']) == (160000, 160000, 8)
+
+    # Hitung ulang dari nol (dengan baris nominal dibukukan ke modal) sama dengan snapshot
+    cache = SaldoAkunCache()
+    cache.saldo, cache.total_debit, cache.total_kredit = dict(snapshot['saldo']), 160000, 160000
+    cache.jumlah_baris = 8
+    assert cache.verifikasi(periode.terapkan_tutup_tahun(TAHUN_2024, BAGAN)) == {}
+
+
+def test_buka_kembali_membuang_snapshot_sesudahnya():
+    periode = PeriodeAkuntansi({'periods': ["Jan-2024"]})
+    tutup_sampai(periode, TAHUN_2024, "Des-2024", tahunan=True)
+
+    assert periode.buka("Jun-2024") == ["Jun-2024", "Jul-2024", "Agu-2024", "Sep-2024", "Okt-2024", "Nov-2024", "Des-2024"]
+    assert periode.terakhir_ditutup() == "Mei-2024"
+    assert periode.akhir_tutup_tahun() is None
+    assert periode.terapkan_tutup_tahun(TAHUN_2024, BAGAN) == TAHUN_2024
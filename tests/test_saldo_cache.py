@@ -0,0 +1,25 @@
+from app import SaldoAkunCache
+from conftest import entri
+
+
+def test_cache_saldo_eksak_dalam_sen():
+    transactions = []
+    for _ in range(1000):
+        transactions += entri("10 January 2024", "Kas", "Pendapatan Jasa", 0.1)
+    cache = SaldoAkunCache()
+    for trans in transactions:
+        cache.tambah(trans)
+
+    # Seribu kali 0,1 tepat 100 rupiah, tidak 99.9999...
+    assert cache.saldo == {'Kas': 10000, 'Pendapatan Jasa': -10000}
+    assert cache.total_debit == cache.total_kredit == 10000
+    assert cache.verifikasi(transactions) == {}
+
+    for trans in transactions[:2]:
+        cache.kurangi(trans)
+    assert cache.saldo['Kas'] == 9990
+    assert cache.verifikasi(transactions[2:]) == {}
+    assert cache.verifikasi(transactions) == {
+        'Kas': (99.9, 100), 'Pendapatan Jasa': (-99.9, -100),
+        '(total debit)': (99.9, 100), '(total kredit)': (99.9, 100), '(jumlah baris)': (1998, 2000),
+    }
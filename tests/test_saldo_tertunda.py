@@ -0,0 +1,17 @@
+from app import BaganAkun, SaldoAkunTertunda, ke_sen
+
+
+def test_saldo_tertunda_ikut_saldo_normal_akun():
+    accounts = {
+        'Kas': {'type': 'Aset', 'balance': 0},
+        'Akumulasi Penyusutan Gedung': {'type': 'Aset', 'balance': 0},
+        'Utang Usaha': {'type': 'Kewajiban', 'balance': 100},
+    }
+    SaldoAkunTertunda.terapkan(accounts, {
+        'Kas': (ke_sen(0.1), ke_sen(0.3)),
+        'Akumulasi Penyusutan Gedung': (0, ke_sen(500)),
+        'Utang Usaha': (ke_sen(40.5), 0),
+    }, BaganAkun(accounts))
+    assert accounts['Kas']['balance'] == -0.2
+    assert accounts['Akumulasi Penyusutan Gedung']['balance'] == 500
+    assert accounts['Utang Usaha']['balance'] == 59.5
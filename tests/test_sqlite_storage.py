@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from app import JsonStorage, SqliteStorage
+from conftest import entri
+
+AKHIR_JANUARI = datetime(2024, 1, 31).toordinal()
+
+
+def test_sqlite_setara_dengan_json(folder):
+    json_storage = JsonStorage()
+    json_storage.append_jurnal(entri("10 January 2024", "Kas", "Modal Pemilik", 1000.10))
+    json_storage.append_jurnal(entri("02 February 2024", "Beban Sewa", "Kas", 0.2))
+    json_storage.save_accounts({'Kas': {'type': 'Aset', 'balance': 0}})
+
+    sqlite_storage = SqliteStorage("uji.db")
+    hasil = sqlite_storage.import_dari(json_storage)
+
+    assert hasil['jurnal_umum'] == 4
+    assert sqlite_storage.load_jurnal() == json_storage.load_jurnal()
+    assert sqlite_storage.load_accounts() == {'Kas': {'type': 'Aset', 'balance': 0}}
+    assert sqlite_storage.total_jurnal() == (100030, 100030, 4)
+    assert sqlite_storage.total_jurnal(AKHIR_JANUARI) == (20, 20, 2)
+    assert sqlite_storage.saldo_mentah_per_akun(AKHIR_JANUARI) == {'Kas': -20, 'Beban Sewa': 20}
+    assert sqlite_storage.saldo_mentah_per_akun() == {'Kas': 99990, 'Modal Pemilik': -100010, 'Beban Sewa': 20}
+    sqlite_storage.hapus_jurnal_tanggal("02 February 2024")
+    assert sqlite_storage.total_jurnal() == (100010, 100010, 2)
+
+
+def test_sqlite_penyesuaian_dan_akun(folder):
+    storage = SqliteStorage("uji.db")
+    versi = storage.versi_penyesuaian()
+    storage.perbarui_penyesuaian(lambda daftar: daftar.append({
+        'tanggal': '31 December 2024', 'jenis': 'Penyusutan', 'akun_debit': 'Beban Penyusutan Gedung',
+        'akun_kredit': 'Akumulasi Penyusutan Gedung', 'debit': 500, 'kredit': 500
+    }))
+
+    penyesuaian, = storage.load_penyesuaian()
+    assert penyesuaian['jenis'] == 'Penyusutan' and penyesuaian['tanggal_urut'] == datetime(2024, 12, 31).toordinal()
+    assert 'perhitungan' not in penyesuaian
+    assert storage.versi_penyesuaian() != versi
+
+    assert not storage.accounts_exist()
+    storage.save_accounts({'Kas': {'type': 'Aset', 'balance': 0}})
+    storage.perbarui_accounts(lambda accounts: accounts['Kas'].update(balance=250))
+    assert storage.load_accounts() == {'Kas': {'type': 'Aset', 'balance': 250}}
+
+
+def test_sqlite_buku_terpisah(folder):
+    storage = SqliteStorage("uji.db")
+    storage.append_jurnal(entri("10 January 2024", "Kas", "Modal Pemilik", 1000))
+    storage.save_jurnal_penutup(entri("31 December 2024", "Pendapatan Jasa", "Ikhtisar Laba Rugi", 400))
+
+    assert len(storage.load_jurnal()) == 2
+    assert [b['akun'] for b in storage.load_jurnal_penutup()] == ["Pendapatan Jasa", "Ikhtisar Laba Rugi"]
+    # Jurnal penutup tidak ikut di saldo Jurnal Umum
+    assert storage.saldo_mentah_per_akun() == {'Kas': 100000, 'Modal Pemilik': -100000}
+    assert storage.transaksi_akun("Kas")[0]['debit'] == 1000
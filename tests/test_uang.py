@@ -0,0 +1,16 @@
+from app import dari_sen, ke_sen, normalisasi_baris
+
+
+def test_ke_sen_dan_dari_sen():
+    assert ke_sen(0.1) + ke_sen(0.2) == ke_sen(0.3) == 30
+    assert ke_sen("1250.5") == 125050
+    assert ke_sen(-19710.0) == -1971000
+    assert dari_sen(125000) == 1250 and isinstance(dari_sen(125000), int)
+    assert dari_sen(125050) == 1250.5
+    assert dari_sen(-1971000) == -19710
+
+
+def test_nominal_baris_dinormalisasi_ke_sen():
+    baris = normalisasi_baris({'tanggal': "10 January 2024", 'akun': "Kas", 'debit': 0.1 + 0.2, 'kredit': 0})
+    # 0.30000000000000004 disimpan sebagai nominal kanonik dari sen
+    assert baris['debit'] == 0.3 and baris['kredit'] == 0
@@ -0,0 +1,91 @@
+"""Uji beban penulisan lintas proses: beberapa worker menulis file JSON yang sama bersamaan.
+
+Setiap worker memposting jurnal berselang-seling ke segmen Januari dan Februari (jadi
+sebagian posting masuk ke segmen yang bukan terakhir), menambah jurnal penyesuaian,
+mengubah saldo akun dan mendaftarkan user. Di akhir semua entri dari
+semua worker harus ada, dan setiap file harus tetap JSON yang utuh.
+
+Jalankan: python uji_tulis_bersamaan.py [jumlah_proses] [posting_per_proses]
+"""
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from app import JsonStorage, JurnalBersama, perbarui_json
+
+
+def worker(folder, nomor, jumlah_posting, mulai):
+    os.chdir(folder)
+    storage = JsonStorage()
+    jurnal = JurnalBersama(storage)
+    mulai.wait()
+    for i in range(jumlah_posting):
+        tanggal = f"{i % 28 + 1:02d} {'January' if i % 2 else 'February'} 2024"
+        keterangan = f"worker {nomor} posting {i}"
+        jurnal.tambah([
+            {'tanggal': tanggal, 'akun': 'Kas', 'debit': 1000, 'kredit': 0, 'keterangan': keterangan, 'ref': ''},
+            {'tanggal': tanggal, 'akun': 'Penjualan', 'debit': 0, 'kredit': 1000, 'keterangan': keterangan, 'ref': ''}
+        ])
+        storage.perbarui_penyesuaian(lambda daftar: daftar.append({
+            'tanggal': '31 December', 'jenis': keterangan, 'akun_debit': 'Beban Sewa',
+            'akun_kredit': 'Sewa Dibayar di Muka', 'debit': 1, 'kredit': 1
+        }))
+        storage.perbarui_accounts(lambda accounts: accounts['Kas'].update(balance=accounts['Kas']['balance'] + 1))
+        perbarui_json('users.json', lambda users: users.update({f"kasir{nomor}_{i}": {'password': 'x'}}))
+
+
+def main():
+    jumlah_proses = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    jumlah_posting = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    with tempfile.TemporaryDirectory() as folder:
+        JsonStorage(accounts_file=os.path.join(folder, 'accounts.json')).save_accounts(
+            {'Kas': {'type': 'Aset', 'balance': 0}}
+        )
+        mulai = multiprocessing.Event()
+        proses = [
+            multiprocessing.Process(target=worker, args=(folder, nomor, jumlah_posting, mulai))
+            for nomor in range(jumlah_proses)
+        ]
+        for p in proses:
+            p.start()
+        waktu_mulai = time.perf_counter()
+        mulai.set()
+        for p in proses:
+            p.join()
+        waktu = time.perf_counter() - waktu_mulai
+        assert all(p.exitcode == 0 for p in proses), "ada worker yang gagal"
+
+        os.chdir(folder)
+        storage = JsonStorage()
+        total = jumlah_proses * jumlah_posting
+        jurnal = storage.load_jurnal()
+        penyesuaian = storage.load_penyesuaian()
+        with open('users.json') as f:
+            users = json.load(f)
+        saldo_kas = storage.load_accounts()['Kas']['balance']
+
+        print(f"{jumlah_proses} proses x {jumlah_posting} posting dalam {waktu:.2f} detik")
+        print(f"Baris jurnal      : {len(jurnal):>6} (harus {2 * total})")
+        print(f"Penyesuaian       : {len(penyesuaian):>6} (harus {total})")
+        print(f"User terdaftar    : {len(users):>6} (harus {total})")
+        print(f"Saldo Kas         : {saldo_kas:>6} (harus {total})")
+
+        assert len(jurnal) == 2 * total
+        assert len({trans['keterangan'] for trans in jurnal}) == total
+        assert storage.daftar_segmen() == ['Jan-2024', 'Feb-2024']
+        assert len(penyesuaian) == total
+        assert len(users) == total
+        assert saldo_kas == total
+        sisa_temp = [nama for nama in os.listdir(folder) + os.listdir(storage.jurnal_umum_folder)
+                     if nama.endswith('.tmp')]
+        assert not sisa_temp, f"file temp tertinggal: {sisa_temp}"
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    print("OK: tidak ada entri yang hilang")
+
+
+if __name__ == "__main__":
+    main()